@@ -0,0 +1,160 @@
+"""Concurrency check: parallel /cart/add_cart calls must not lose quantity or duplicate carts.
+
+Run from the repository root:
+
+    python -m Cart.concurrency_check
+    python -m Cart.concurrency_check --adds 500 --products 8
+    python -m Cart.concurrency_check --mongo-uri mongodb://localhost:27017
+
+Without --mongo-uri the check runs in-process on mongomock_motor. Random
+delays are injected around every database call, so the handlers interleave
+the way network round trips make them interleave on a real server. With
+--mongo-uri it uses a scratch database on that server, which is dropped
+afterwards.
+
+Each round fires all adds at once for one phone number. It then compares
+the stored quantity of every product with the sum of the quantities that
+were added. A round starts either with no cart (concurrent upserts of the
+cart itself) or with an existing one. Finally, duplicate carts are seeded to
+check that merge_duplicate_carts folds them together. Exits with status 1 on
+any lost update.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+os.environ.setdefault("SECRET_KEY", "concurrency-check")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from fastapi import HTTPException
+
+import auth.database as database
+from auth.user_cache import user_cache
+from Cart import routes
+from Cart.models import Product
+
+PHONE = "9000000000"
+SCRATCH_DB = "farmerappdb_concurrency_check"
+
+
+class Jittery:
+    """Collection wrapper that yields to the event loop around every call."""
+
+    def __init__(self, collection, max_delay: float):
+        self._collection = collection
+        self._max_delay = max_delay
+
+    def __getattr__(self, attr):
+        method = getattr(self._collection, attr)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(random.random() * self._max_delay)
+            result = await method(*args, **kwargs)
+            await asyncio.sleep(random.random() * self._max_delay)
+            return result
+        return call
+
+
+def product(name: str, quantity: int) -> Product:
+    return Product(name=name, price=100.0, farm="Check Farm", rating="5", image_url="", quantity=quantity)
+
+
+async def setup():
+    db = database.db
+    await db["users"].delete_many({"phone": PHONE})
+    await db["cart"].delete_many({})
+    await db["users"].insert_one({"name": "Concurrency Check", "phone": PHONE})
+    await db["cart"].create_indexes(database.INDEXES["cart"])
+    user_cache.invalidate(PHONE)
+
+
+async def run_round(adds: int, products: int, existing_cart: bool) -> bool:
+    await setup()
+    if existing_cart:
+        await database.db["cart"].insert_one({"phone": PHONE, "items": []})
+
+    names = [f"Product {i}" for i in range(products)]
+    ops = [(random.choice(names), random.randint(1, 5)) for _ in range(adds)]
+    results = await asyncio.gather(*(routes.addCart(PHONE, product(name, quantity)) for name, quantity in ops),
+                                   return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    applied = [op for op, result in zip(ops, results) if not isinstance(result, Exception)]
+
+    expected = {name: 0 for name in names}
+    for name, quantity in applied:
+        expected[name] += quantity
+    carts = await database.db["cart"].find({"phone": PHONE}).to_list(None)
+    stored, rows = {name: 0 for name in names}, 0
+    for cart in carts:
+        for item in cart["items"]:
+            stored[item["name"]] += item["quantity"]
+            rows += 1
+
+    lost = {name: expected[name] - stored[name] for name in names if expected[name] != stored[name]}
+    ok = not errors and not lost and len(carts) == 1 and rows == len([n for n in names if expected[n]])
+    label = "existing cart" if existing_cart else "new cart"
+    print(f"{'✅' if ok else '❌'} {label:<14} {adds} adds: {len(errors)} errors, {len(carts)} cart(s), "
+          f"{rows} item rows, lost quantity {lost or 0}")
+    for error in errors[:3]:
+        print(f"   {type(error).__name__}: {error.detail if isinstance(error, HTTPException) else error}")
+    return ok
+
+
+async def check_merge() -> bool:
+    """Duplicate carts (as left by the old find-then-insert code) are merged by the bootstrap step."""
+    db = database.db
+    await db["cart"].drop_indexes()
+    await db["cart"].delete_many({})
+    await db["cart"].insert_many([
+        {"phone": PHONE, "items": [{"name": "Wheat", "quantity": 2}, {"name": "Rice", "quantity": 1}]},
+        {"phone": PHONE, "items": [{"name": "Wheat", "quantity": 3}]},
+        {"phone": PHONE, "items": [{"name": "Maize", "quantity": 4}]},
+    ])
+    await database.merge_duplicate_carts()
+    carts = await db["cart"].find({"phone": PHONE}).to_list(None)
+    items = {item["name"]: item["quantity"] for cart in carts for item in cart["items"]}
+    ok = len(carts) == 1 and items == {"Wheat": 5, "Rice": 1, "Maize": 4}
+    print(f"{'✅' if ok else '❌'} duplicate carts merged: {len(carts)} cart(s), {items}")
+    return ok
+
+
+async def run(args) -> bool:
+    if args.mongo_uri:
+        database.MONGO_URI = args.mongo_uri
+        database.DB_NAME = SCRATCH_DB
+    else:
+        import mongomock_motor
+        database._client = mongomock_motor.AsyncMongoMockClient()
+        # mongomock answers without yielding; add the interleaving a network would cause
+        routes.cart_items = Jittery(database.cart_items, args.max_delay_ms / 1000)
+    try:
+        ok = True
+        for existing_cart in (False, True):
+            ok &= await run_round(args.adds, args.products, existing_cart)
+        ok &= await check_merge()
+        return ok
+    finally:
+        if args.mongo_uri:
+            await database.connect().drop_database(SCRATCH_DB)
+        database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--adds", type=int, default=200, help="concurrent add_cart calls per round")
+    parser.add_argument("--products", type=int, default=4)
+    parser.add_argument("--max-delay-ms", type=float, default=1.0, help="injected delay (mongomock only)")
+    parser.add_argument("--mongo-uri", help="run against this MongoDB server instead of mongomock")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,3 +14,8 @@ class Product(BaseModel):
         allow_population_by_field_name = True
         arbitrary_types_allowed = True
 
+
+
+class CartQuantity(BaseModel):
+    name: str
+    quantity: int = Field(..., ge=0, le=5)  # 0 removes the item
@@ -1,49 +1,99 @@
 from fastapi import APIRouter, HTTPException
-from Cart.models import Product
-from auth.database import cart_items, users_collection
+from pymongo.errors import DuplicateKeyError
+from Cart.models import Product, CartQuantity
+from auth.database import cart_items, has_unique_index
+from auth.user_cache import user_cache
 
 router = APIRouter()
 
+# Every cart change is one atomic update on the cart document, so concurrent
+# requests (two devices, double taps) cannot overwrite each other's items.
+ADD_ATTEMPTS = 3
+
+_cart_index_checked = False
+
+
+async def require_cart_index():
+    """The $push upsert in addCart only avoids duplicate carts when cart.phone is unique-indexed.
+
+    bootstrap_database creates the index (merging old duplicate carts first);
+    until it exists, adds fail with 503 rather than silently creating a second cart.
+    """
+    global _cart_index_checked
+    if _cart_index_checked:
+        return
+    if not await has_unique_index("cart", "phone"):
+        print("❌ cart.phone unique index missing: refusing cart adds")
+        raise HTTPException(status_code=503, detail="Cart is temporarily unavailable, please retry later")
+    _cart_index_checked = True
+
+
+async def require_user(phone: str):
+    if await user_cache.get(phone) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
 @router.post("/add_cart")
 async def addCart(phone: str, item: Product):
-    existing_user = await users_collection.find_one({"phone": phone})
-    if not existing_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    existing_cart = await cart_items.find_one({"phone": phone})
-    if existing_cart:
-        # Check if product with the same name already exists in cart
-        for cart_item in existing_cart["items"]:
-            if cart_item["name"] == item.name:
-                cart_item["quantity"] += item.quantity
-                await cart_items.update_one(
-                    {"phone": phone},
-                    {"$set": {"items": existing_cart["items"]}}
-                )
-                return {"message": "Cart updated successfully!"}
-        
-        # If not in cart, append new product
-        existing_cart["items"].append(item.model_dump())
-        await cart_items.update_one(
-            {"phone": phone},
-            {"$set": {"items": existing_cart["items"]}}
+    await require_user(phone)
+    await require_cart_index()
+
+    for _ in range(ADD_ATTEMPTS):
+        # Already in the cart: bump its quantity in place
+        result = await cart_items.update_one(
+            {"phone": phone, "items.name": item.name},
+            {"$inc": {"items.$.quantity": item.quantity}}
         )
-        return {"message": f"{item.name} added to cart successfully!"}
-    
-    # Create new cart if not exists
-    new_cart = {
-        "phone": phone,
-        "items": [item.model_dump()]
-    }
-    await cart_items.insert_one(new_cart)
-    return {"message": f"{item.name} added to cart successfully!"}
+        if result.matched_count:
+            return {"message": "Cart updated successfully!"}
+
+        # Not in the cart: append it, creating the cart if there is none
+        try:
+            await cart_items.update_one(
+                {"phone": phone, "items.name": {"$ne": item.name}},
+                {"$push": {"items": item.model_dump()}},
+                upsert=True
+            )
+            return {"message": f"{item.name} added to cart successfully!"}
+        except DuplicateKeyError:
+            # Lost a race: the item was added, or the cart created, by a concurrent
+            # request after the $inc missed. The unique phone index rejected the
+            # upsert, so retry; the $inc now matches.
+            continue
+    raise HTTPException(status_code=409, detail="Cart is being updated concurrently, please retry")
+
+
+@router.post("/set_quantity")
+async def set_quantity(phone: str, item: CartQuantity):
+    await require_user(phone)
+    if item.quantity == 0:
+        return await remove_item(phone, item.name)
+
+    result = await cart_items.update_one(
+        {"phone": phone, "items.name": item.name},
+        {"$set": {"items.$.quantity": item.quantity}}
+    )
+    if not result.matched_count:
+        raise HTTPException(status_code=404, detail=f"{item.name} is not in the cart")
+    return {"message": "Cart updated successfully!"}
+
+
+@router.delete("/remove_item")
+async def remove_item(phone: str, name: str):
+    await require_user(phone)
+    result = await cart_items.update_one(
+        {"phone": phone, "items.name": name},
+        {"$pull": {"items": {"name": name}}}
+    )
+    if not result.matched_count:
+        raise HTTPException(status_code=404, detail=f"{name} is not in the cart")
+    return {"message": f"{name} removed from cart"}
+
 
 @router.get("/get_cart")
 async def get_cart(phone: str):
-    existing_user = await users_collection.find_one({"phone": phone})
-    if not existing_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+    await require_user(phone)
+
     cart = await cart_items.find_one({"phone": phone})
     if not cart or "items" not in cart:
         return {"items": []}
@@ -92,6 +92,18 @@ class CropCalendar:
         root_depth_m = ASSUMED_ROOT_DEPTH_METERS.get(stage_key, ASSUMED_ROOT_DEPTH_METERS['late'])
         return stage_key, kc, stage, root_depth_m
 
+    def get_water_need(self, days_sown, lat=None, lon=None, current_temp_c=None, current_humidity_perc=None):
+        """Stage, daily crop water use (ETc) and soil water limits for a day, without changing the soil state."""
+        weather_data = self._get_weather_data(lat, lon, current_temp_c, current_humidity_perc)
+        et0 = self._calculate_et0(weather_data)
+        stage_key, kc, stage, root_depth_m = self._get_daily_params(days_sown)
+        taw_mm = self._calculate_taw_mm(root_depth_m)
+        return {
+            'stage_key': stage_key, 'stage': stage, 'kc': kc, 'root_depth_m': root_depth_m,
+            'et0_mm': et0, 'etc_mm': et0 * kc,
+            'taw_mm': taw_mm, 'raw_mm': taw_mm * MANAGEMENT_ALLOWED_DEPLETION,
+        }
+
 
     def get_daily_advice(self, days_sown, lat, lon, current_temp_c=None, current_humidity_perc=None):
         """Calculates the irrigation and fertilizer needs for a specific day."""
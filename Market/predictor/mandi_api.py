@@ -3,6 +3,9 @@ import numpy as np
 import math
 from datetime import datetime, timedelta
 import pandas as pd
+from monitoring.metrics import track_upstream
+from replay.transports import upstream_session
+from location_detector.reverse_geocoder import reverse_geocode
 
 class MandiAPI:
     def __init__(self):
@@ -17,8 +20,9 @@ class MandiAPI:
     def get_current_prices(self, state, crop, predictor):
         try:
             url = self.get_api_url(state)
-            response = requests.get(url, timeout=15)
-            response.raise_for_status() 
+            with track_upstream("data_gov_in"):
+                response = upstream_session.get(url, timeout=15)
+                response.raise_for_status() 
             data = response.json()
             parsed_data = self.parse_api_data(data, crop)
             if parsed_data:
@@ -156,24 +160,8 @@ class MandiAPI:
         }
 
     def get_state_from_coords(self, lat, lng):
-        try:
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
-            params = {
-                'latlng': f"{lat},{lng}",
-                'key': self.location_api_key
-            }
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            if data['status'] == 'OK' and data['results']:
-                for component in data['results'][0]['address_components']:
-                    if 'administrative_area_level_1' in component['types']:
-                        state_name = component['long_name']
-                        return state_name
-            return None
-        except Exception as e:
-            print(f"   ⚠️ Error in reverse geocoding: {e}")
-            return None
+        match = reverse_geocode(lat, lng)
+        return match["state"] if match else None
 
     def get_weather_data_for_state(self, state):
         try:
@@ -0,0 +1,93 @@
+"""Parsing and validation for bulk farmer registration (/auth/register/bulk).
+
+Rows come from a CSV file (header row with name and phone columns) or a JSON
+array of {"name", "phone"} objects. Each row is checked with the same
+RegisterUser rules as /auth/register/; the route then inserts the valid rows
+with one unordered insert_many and reports a result for every row.
+"""
+import csv
+import io
+import json
+import os
+from pydantic import ValidationError
+from auth.models import RegisterUser
+
+BULK_REGISTER_MAX_ROWS = int(os.getenv("BULK_REGISTER_MAX_ROWS", "10000"))
+BULK_REGISTER_MAX_BYTES = int(os.getenv("BULK_REGISTER_MAX_BYTES", str(5 * 1024 * 1024)))
+
+# Column names seen in cooperative spreadsheets -> RegisterUser field
+COLUMN_ALIASES = {
+    "name": "name", "farmer_name": "name", "farmer name": "name", "full_name": "name", "full name": "name",
+    "phone": "phone", "phone_number": "phone", "phone number": "phone", "mobile": "phone",
+    "mobile_number": "phone", "mobile number": "phone", "mobile no": "phone",
+}
+
+
+class BulkFormatError(ValueError):
+    """The upload as a whole cannot be read (not one bad row)."""
+
+
+def _normalize_row(row: dict) -> dict:
+    normalized = {}
+    for key, value in row.items():
+        field = COLUMN_ALIASES.get(str(key or "").strip().lower())
+        if field and field not in normalized:
+            normalized[field] = value.strip() if isinstance(value, str) else value
+    return normalized
+
+
+def parse_rows(content: bytes, content_type: str = None, filename: str = None) -> list:
+    """Rows of the upload as dicts with name/phone keys; JSON when it looks like JSON, else CSV."""
+    if len(content) > BULK_REGISTER_MAX_BYTES:
+        raise BulkFormatError(f"Upload too large (max {BULK_REGISTER_MAX_BYTES // (1024 * 1024)} MB)")
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BulkFormatError("Upload must be UTF-8 encoded")
+
+    is_json = "json" in (content_type or "") or (filename or "").lower().endswith(".json") \
+        or text.lstrip().startswith("[")
+    if is_json:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BulkFormatError(f"Invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise BulkFormatError("JSON body must be an array of farmers")
+        rows = [row if isinstance(row, dict) else {} for row in rows]
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames:
+            raise BulkFormatError("CSV needs a header row with name and phone columns")
+        fields = {COLUMN_ALIASES.get(name.strip().lower()) for name in reader.fieldnames}
+        if not {"name", "phone"} <= fields:
+            raise BulkFormatError("CSV needs a header row with name and phone columns")
+        rows = list(reader)
+
+    if len(rows) > BULK_REGISTER_MAX_ROWS:
+        raise BulkFormatError(f"Too many rows ({len(rows)}); at most {BULK_REGISTER_MAX_ROWS} per upload")
+    return [_normalize_row(row) for row in rows]
+
+
+def validate_rows(rows: list) -> tuple:
+    """(documents to insert with their row numbers, results for rejected rows).
+
+    Row numbers are 1-based positions in the upload (CSV data rows, not
+    counting the header). The first row wins when a phone appears twice.
+    """
+    documents, rejected = [], []
+    seen = {}
+    for number, row in enumerate(rows, start=1):
+        try:
+            user = RegisterUser(**row)
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+            rejected.append({"row": number, "phone": row.get("phone"), "status": "invalid", "errors": errors})
+            continue
+        if user.phone in seen:
+            rejected.append({"row": number, "phone": user.phone, "status": "duplicate",
+                             "errors": [f"same phone as row {seen[user.phone]}"]})
+            continue
+        seen[user.phone] = number
+        documents.append((number, {"name": user.name, "phone": user.phone}))
+    return documents, rejected
@@ -1,7 +1,12 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from passlib.context import CryptContext
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
+from monitoring.mongo import command_listener, pool_listener
 
 # Password hashing
 # pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -10,11 +15,22 @@ load_dotenv()
 # MongoDB connection (local or Atlas)
 # Prefer environment variables; fall back to sensible local defaults
 MONGO_URI = os.getenv("MONGO_DB_URI")
+# Validator action for the collection schemas below: warn (log only), error (reject) or off
+MONGO_SCHEMA_VALIDATION = os.getenv("MONGO_SCHEMA_VALIDATION", "warn")
+
+# Connection pool, per worker process. Size it so workers x MONGO_MAX_POOL_SIZE stays
+# below the server's connection limit; /health/db shows how much of it is in use.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", "2"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+# How long a request waits for a free pooled connection before failing
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_PING_TIMEOUT_SECONDS = float(os.getenv("MONGO_PING_TIMEOUT_SECONDS", "2"))
 
-client = AsyncIOMotorClient(MONGO_URI)
 DB_NAME = "farmerappdb"
-# client = AsyncIOMotorClient(MONGO_URI)
-db = client[DB_NAME]
 
 # Enable TLS only for Atlas (mongodb+srv) or when explicitly requested
 # use_tls = MONGO_URI.startswith("mongodb+srv://") or os.getenv("MONGO_TLS", "false").lower() == "true"
@@ -24,12 +40,263 @@ db = client[DB_NAME]
 # else:
 #     client = AsyncIOMotorClient(MONGO_URI)
 
+_client = None
+
+
+def connect() -> AsyncIOMotorClient:
+    """The shared Motor client, created on first use (normally by the app lifespan)."""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxConnecting=MONGO_MAX_CONNECTING,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            event_listeners=[command_listener, pool_listener],
+        )
+        print(f"✅ MongoDB client created (maxPoolSize={MONGO_MAX_POOL_SIZE})")
+    return _client
+
+
+def close():
+    """Close the client and its pool (app shutdown). A later use reconnects."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+        print("✅ MongoDB client closed")
+
+
+class _Collection:
+    """A collection of the current client's database, resolved on each use."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._bound = (None, None)
+
+    def _collection(self):
+        client = connect()
+        if self._bound[0] is not client:
+            self._bound = (client, client[DB_NAME][self.name])
+        return self._bound[1]
+
+    def __getattr__(self, attr):
+        return getattr(self._collection(), attr)
+
+
+class _Database:
+    """Module-level handle on the app database, so importers need not wait for the lifespan."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> _Collection:
+        if name not in self._collections:
+            self._collections[name] = _Collection(name)
+        return self._collections[name]
+
+    def __getattr__(self, attr):
+        return getattr(connect()[DB_NAME], attr)
+
+
+db = _Database()
 
 users_collection = db["users"]
 cart_items = db["cart"]
 soil_data = db["soil_data"]
 
 
+async def health() -> dict:
+    """Ping latency and pool utilization of the current client."""
+    pools = pool_listener.snapshot()
+    in_use = sum(pool["in_use"] for pool in pools.values())
+    report = {
+        "status": "ok",
+        "ping_ms": None,
+        "pool": {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "in_use": in_use,
+            "waiting": sum(pool["waiting"] for pool in pools.values()),
+            "open": sum(pool["open"] for pool in pools.values()),
+            # Of the busiest server's pool (the limit applies per server)
+            "utilization": round(max((pool["in_use"] for pool in pools.values()), default=0) / MONGO_MAX_POOL_SIZE, 3),
+            "servers": pools,
+        },
+    }
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(connect().admin.command("ping"), MONGO_PING_TIMEOUT_SECONDS)
+        report["ping_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    except Exception as e:
+        report["status"] = "unavailable"
+        report["error"] = str(e) or type(e).__name__
+    return report
+
+
+# Every query and sort the app runs, by collection. Partial filters keep documents
+# without the field (e.g. crop records that only have phone_number) out of unique indexes.
+INDEXES = {
+    "users": [
+        # Login, registration and the auth dependency
+        IndexModel([("phone", ASCENDING)], name="phone_unique", unique=True,
+                   partialFilterExpression={"phone": {"$type": "string"}}),
+        # Crop management records. Deliberately NOT unique: crop records are upserted
+        # by phone_number, and nothing may rely on it being unique
+        IndexModel([("phone_number", ASCENDING)], name="phone_number",
+                   partialFilterExpression={"phone_number": {"$type": "string"}}),
+    ],
+    "cart": [
+        IndexModel([("phone", ASCENDING)], name="phone_unique", unique=True),
+    ],
+    "image_analyses": [
+        # Dashboard: keyset pagination on (timestamp, _id), optionally per class; retention GC
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)], name="timestamp_desc"),
+        IndexModel([("analysis_result.predicted_class", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                   name="predicted_class_timestamp_desc"),
+    ],
+    "chat_history": [
+        # Chat memory and session history: recent turns of one user's session
+        IndexModel([("phone", ASCENDING), ("session_id", ASCENDING), ("timestamp", DESCENDING)],
+                   name="phone_session_timestamp"),
+        # Voice chat: late requests for a streamed reply are redirected to the stored file
+        IndexModel([("voice_reply_id", ASCENDING)], name="voice_reply_id", sparse=True),
+        # Retention GC and the language benchmark sample
+        IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
+    ],
+    # soil_data is only read newest-first by _id, which the default index covers
+    "soil_data": [],
+}
+
+# Loose $jsonSchema validators: the fields queries depend on must have the right type
+SCHEMAS = {
+    "users": {
+        "bsonType": "object",
+        "properties": {
+            "phone": {"bsonType": "string"},
+            "phone_number": {"bsonType": "string"},
+            "name": {"bsonType": "string"},
+            "location": {"bsonType": "object"},
+            "crops": {"bsonType": "array"},
+        },
+    },
+    "cart": {
+        "bsonType": "object",
+        "required": ["phone", "items"],
+        "properties": {
+            "phone": {"bsonType": "string"},
+            "items": {
+                "bsonType": "array",
+                "items": {
+                    "bsonType": "object",
+                    "required": ["name", "quantity"],
+                    "properties": {"name": {"bsonType": "string"}, "quantity": {"bsonType": ["int", "long"], "minimum": 1}},
+                },
+            },
+        },
+    },
+    "image_analyses": {
+        "bsonType": "object",
+        "required": ["timestamp"],
+        "properties": {"timestamp": {"bsonType": "date"}, "filename": {"bsonType": "string"}},
+    },
+    "chat_history": {
+        "bsonType": "object",
+        "required": ["type", "timestamp"],
+        "properties": {
+            "type": {"bsonType": "string"},
+            "phone": {"bsonType": ["string", "null"]},
+            "session_id": {"bsonType": "string"},
+            "timestamp": {"bsonType": "date"},
+        },
+    },
+    "soil_data": {"bsonType": "object"},
+}
+
+
+async def ensure_indexes():
+    """Create the declared indexes (idempotent, safe on every startup).
+
+    Indexes are created one at a time so a conflict (an existing index with
+    the same keys but other options, or duplicates blocking a unique index)
+    is logged without blocking the rest.
+    """
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                await db[collection].create_indexes([index])
+            except OperationFailure as e:
+                print(f"❌ Index {collection}.{name} not created: {e.details.get('errmsg', e) if e.details else e}")
+    print(f"✅ Indexes checked for {len(INDEXES)} collections")
+
+
+async def has_unique_index(collection: str, field: str) -> bool:
+    """Whether `field` alone is unique-indexed on the collection."""
+    indexes = await db[collection].index_information()
+    return any(index.get("unique") and list(index["key"]) == [(field, 1)] for index in indexes.values())
+
+
+async def merge_duplicate_carts():
+    """Fold duplicate carts of one phone into its oldest cart, so cart.phone_unique can be built.
+
+    Carts written before cart updates were atomic could be duplicated by
+    concurrent first adds. Quantities of the same product are summed.
+    """
+    duplicates = db["cart"].aggregate([
+        {"$group": {"_id": "$phone", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    merged = 0
+    async for group in duplicates:
+        carts = await db["cart"].find({"_id": {"$in": group["ids"]}}).sort("_id", ASCENDING).to_list(None)
+        items = {}
+        for cart in carts:
+            for item in cart.get("items") or []:
+                if item.get("name") in items:
+                    items[item["name"]]["quantity"] += item.get("quantity", 0)
+                else:
+                    items[item.get("name")] = dict(item)
+        await db["cart"].update_one({"_id": carts[0]["_id"]}, {"$set": {"items": list(items.values())}})
+        await db["cart"].delete_many({"_id": {"$in": [cart["_id"] for cart in carts[1:]]}})
+        merged += len(carts) - 1
+    if merged:
+        print(f"⚠️ Merged {merged} duplicate carts into their owners' oldest cart")
+
+
+async def ensure_schemas():
+    """Attach the SCHEMAS validators (validationLevel moderate: existing invalid documents stay editable)."""
+    if MONGO_SCHEMA_VALIDATION == "off":
+        return
+    existing = set(await db.list_collection_names())
+    for collection, schema in SCHEMAS.items():
+        options = {
+            "validator": {"$jsonSchema": schema},
+            "validationLevel": "moderate",
+            "validationAction": MONGO_SCHEMA_VALIDATION,
+        }
+        try:
+            if collection in existing:
+                await db.command("collMod", collection, **options)
+            else:
+                await db.create_collection(collection, **options)
+        except (OperationFailure, CollectionInvalid) as e:
+            print(f"❌ Schema for {collection} not applied: {e}")
+
+
+async def bootstrap_database():
+    """Startup: validators first (create_collection needs the collection absent), then indexes.
+
+    Duplicate carts are merged before the indexes, or cart.phone_unique could not be built.
+    """
+    await ensure_schemas()
+    await merge_duplicate_carts()
+    await ensure_indexes()
+
+
 # Helper to format MongoDB user document
 # def user_helper(user) -> dict:
 #     return {
@@ -3,13 +3,20 @@ from jose import jwt, JWTError
 from typing import Optional
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from cachetools import LRUCache
+from monitoring.metrics import AUTH_CACHE_REQUESTS
 import os
+import time
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHMS = os.getenv("ALGORITHM")
 EXPIRE_TIME = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+# Verified token -> (phone, exp). Tokens are immutable, so a decode stays valid until exp.
+_verified = LRUCache(maxsize=TOKEN_CACHE_SIZE)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -19,13 +26,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str):
+    cached = _verified.get(token)
+    if cached is not None:
+        phone, expires = cached
+        if expires is not None and time.time() >= expires:
+            _verified.pop(token, None)
+            raise HTTPException(status_code=401, detail="Token expired")
+        AUTH_CACHE_REQUESTS.inc(cache="token", result="hit")
+        return phone
+
+    AUTH_CACHE_REQUESTS.inc(cache="token", result="miss")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHMS)
         phone: str = payload.get("sub")
         if phone is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return phone
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    # Only verified tokens are remembered, so bad tokens cannot flush the cache
+    _verified[token] = (phone, payload.get("exp"))
+    return phone
@@ -1,21 +1,13 @@
-# load_states.py
-import json
-import requests
-from pathlib import Path
+# States and districts come from the bundled index (location_detector/regions.py); no network at import
+from enum import Enum
+from location_detector.regions import regions
+
 
 def load_states_districts() -> dict:
-    local = Path("states-and-districts.json")
-    if local.exists():
-        with local.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    url = "https://raw.githubusercontent.com/sab99r/Indian-States-And-Districts/master/states-and-districts.json"
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return resp.json()
+    return regions.states_and_districts
 
-states_and_districts = load_states_districts()
 
-from enum import Enum
+states_and_districts = load_states_districts()
 
 # Dynamically create Enum for States
 StateEnum = Enum(
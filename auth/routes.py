@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi import APIRouter, HTTPException, Header, Depends, Request
+from pymongo.errors import BulkWriteError
 from auth.models import RegisterUser, LoginUser, UserProfile, Location
-from auth.database import users_collection
+from auth.database import users_collection, has_unique_index
+from auth.bulk_register import BulkFormatError, parse_rows, validate_rows
 from auth.jwt import create_access_token, verify_token
+from auth.user_cache import user_cache
 from typing import Optional
 router = APIRouter()
 
@@ -17,6 +20,44 @@ async def check_existing_user(phone: str) -> None:
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists.")
 
+async def has_unique_phone_index() -> bool:
+    """Whether users.phone is unique-indexed (created at startup by bootstrap_database)."""
+    return await has_unique_index("users", "phone")
+
+
+async def insert_new_users(documents: list) -> list:
+    """Insert (row number, user document) pairs in one unordered batch; a result per row.
+
+    Phones that are already registered are rejected by the unique phone
+    index, which reports them without stopping the rest of the batch.
+    """
+    results = []
+    if not await has_unique_phone_index():
+        # Without the index duplicates would be inserted silently: filter them first
+        phones = [doc["phone"] for _, doc in documents]
+        existing = set(await users_collection.distinct("phone", {"phone": {"$in": phones}}))
+        results = [{"row": number, "phone": doc["phone"], "status": "exists"}
+                   for number, doc in documents if doc["phone"] in existing]
+        documents = [(number, doc) for number, doc in documents if doc["phone"] not in existing]
+    if not documents:
+        return results
+
+    failed = {}
+    try:
+        await users_collection.insert_many([doc for _, doc in documents], ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+    for index, (number, doc) in enumerate(documents):
+        error = failed.get(index)
+        if error is None:
+            results.append({"row": number, "phone": doc["phone"], "status": "created", "id": str(doc["_id"])})
+        elif error.get("code") == 11000:
+            results.append({"row": number, "phone": doc["phone"], "status": "exists"})
+        else:
+            results.append({"row": number, "phone": doc["phone"], "status": "error", "errors": [error.get("errmsg")]})
+    return results
+
 async def get_current_user(authorization: Optional[str] = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
@@ -29,11 +70,17 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
         raise HTTPException(status_code=401, detail="Invalid Authorization header format")
     
     phone = verify_token(token)
-    user = await users_collection.find_one({"phone": phone})
+    user = await user_cache.get(phone)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+async def get_optional_user(authorization: Optional[str] = Header(None)):
+    """Like get_current_user, but callers without an Authorization header get None."""
+    if not authorization:
+        return None
+    return await get_current_user(authorization)
+
 # -------------------------
 # Routes
 # -------------------------
@@ -52,6 +99,40 @@ async def register(user: RegisterUser):
     return {"message": "User registered successfully", "id": str(result.inserted_id)}
 
 
+@router.post("/register/bulk")
+async def register_bulk(request: Request):
+    """Register many farmers at once (FPO / cooperative onboarding).
+
+    Send a CSV (header row with name and phone) or a JSON array of
+    {"name", "phone"} objects, either as the request body or as a multipart
+    upload in the "file" field. Every row is validated like /register/ and
+    gets a result: created, exists, duplicate (repeated in the upload),
+    invalid or error.
+    """
+    content_type = request.headers.get("content-type", "")
+    filename = None
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload the CSV or JSON file in the 'file' field")
+        content, content_type, filename = await upload.read(), upload.content_type, upload.filename
+    else:
+        content = await request.body()
+
+    try:
+        rows = parse_rows(content, content_type, filename)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    documents, rejected = validate_rows(rows)
+    results = sorted(rejected + await insert_new_users(documents), key=lambda result: result["row"])
+    summary = {status: 0 for status in ("created", "exists", "duplicate", "invalid", "error")}
+    for result in results:
+        summary[result["status"]] += 1
+    return {"message": f"{summary['created']} of {len(rows)} farmers registered", "summary": summary, "results": results}
+
+
 @router.post("/login")
 async def login(user: LoginUser):
     existing_user = await users_collection.find_one({"phone": user.phone})
@@ -0,0 +1,75 @@
+"""Short-lived cache of authenticated users, so protected requests skip the users lookup.
+
+get_current_user resolves a verified phone number to a small projection of
+the user document. Entries expire after AUTH_USER_CACHE_TTL_SECONDS and are
+dropped as soon as this process changes the document (`invalidate`). With
+AUTH_USER_CACHE_WATCH=1 a MongoDB change stream (replica set / Atlas only)
+also drops entries changed by other workers or by hand.
+"""
+import asyncio
+import os
+from cachetools import TTLCache
+from auth.database import users_collection
+from monitoring.metrics import AUTH_CACHE_REQUESTS, AUTH_CACHE_INVALIDATIONS
+
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL_SECONDS = int(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+AUTH_USER_CACHE_WATCH = os.getenv("AUTH_USER_CACHE_WATCH", "0") == "1"
+WATCH_RETRY_SECONDS = 30
+
+# Everything request handlers read from the current user
+USER_PROJECTION = {"name": 1, "phone": 1, "location": 1}
+
+
+class UserCache:
+    def __init__(self, maxsize: int = AUTH_USER_CACHE_SIZE, ttl: int = AUTH_USER_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Bumped on every invalidation; a lookup that raced one does not store its result
+        self._generation = 0
+
+    async def get(self, phone: str):
+        """The user's projection (a copy), or None when no such user exists."""
+        user = self._cache.get(phone)
+        if user is not None:
+            AUTH_CACHE_REQUESTS.inc(cache="user", result="hit")
+            return dict(user)
+
+        AUTH_CACHE_REQUESTS.inc(cache="user", result="miss")
+        generation = self._generation
+        user = await users_collection.find_one({"phone": phone}, USER_PROJECTION)
+        if user is not None and generation == self._generation:
+            self._cache[phone] = user
+        return dict(user) if user is not None else None
+
+    def invalidate(self, phone: str = None, source: str = "local"):
+        """Drop one user, or everyone when the changed phone number is unknown."""
+        self._generation += 1
+        if phone is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(phone, None)
+        AUTH_CACHE_INVALIDATIONS.inc(source=source)
+
+    async def watch(self):
+        """Invalidate on every change to the users collection (runs until cancelled)."""
+        while True:
+            try:
+                async with users_collection.watch(full_document="updateLookup") as stream:
+                    print("✅ Watching users collection for auth cache invalidation")
+                    async for change in stream:
+                        if change["operationType"] == "insert":
+                            continue  # unknown users are never cached
+                        updated = (change.get("updateDescription") or {}).get("updatedFields") or {}
+                        # A changed or deleted phone number leaves the old key unknown: drop everyone
+                        phone = None if "phone" in updated else (change.get("fullDocument") or {}).get("phone")
+                        self.invalidate(phone, source="change_stream")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Standalone servers have no change streams; TTL expiry still applies
+                print(f"❌ Users change stream failed: {e}")
+                self._cache.clear()
+                await asyncio.sleep(WATCH_RETRY_SECONDS)
+
+
+user_cache = UserCache()
@@ -0,0 +1,138 @@
+"""Cache of Gemini answers for frequently asked farmer questions.
+
+Prompts are reduced to a normalized key (Devanagari/Gurmukhi transliterated
+to Latin, lower-cased, vowel spellings folded, punctuation and filler words
+dropped) and stored per response language in a TTL + LRU cache. With
+ANSWER_CACHE_SIMILARITY set (e.g. 0.8), a miss on the exact key falls back to
+the closest cached question in the same language by token overlap.
+"""
+import os
+import re
+from collections import defaultdict
+from cachetools import TTLCache
+from indic_transliteration import sanscript
+from monitoring.metrics import ANSWER_CACHE_REQUESTS, ANSWER_CACHE_HIT_RATIO
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2048"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(12 * 3600)))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))  # 0 disables similarity lookups
+
+# Filler words only; question words (when/how/kab/kitna) change the answer and are kept
+STOP_WORDS = {
+    # English
+    "a", "an", "the", "is", "are", "am", "be", "of", "for", "to", "in", "on", "at", "my", "me", "i",
+    "we", "our", "you", "your", "do", "does", "should", "can", "could", "would", "will", "please",
+    "tell", "about", "and", "or", "it", "this", "that", "there", "sir", "madam", "hi", "hello",
+    # Hinglish / Punjabi (romanized, after folding)
+    "hai", "hain", "ha", "ka", "ki", "ke", "ko", "se", "men", "me", "mein", "par", "pe", "aur", "bhi",
+    "ji", "bhai", "yar", "yaar", "kripya", "krpya", "batao", "bataiye", "btao", "bataen", "bolo",
+    "mujhe", "muje", "hamen", "hame", "apne", "mera", "meri", "mere", "nu", "da", "di", "de", "ne",
+    "kya", "ky", "hota", "hoti", "hote", "chahiye", "chahie", "chaiye", "sakte", "sakta", "liye", "lie",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SCHWA_RE = re.compile(r"(?<=[bcdfghjklmnpqrstvwxyzBCDFGHJKLNPQRSTVWXYZ])a\b")
+_VOWEL_FOLDS = (("aa", "a"), ("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"))
+
+
+def _transliterate(text: str) -> str:
+    if re.search(r"[ऀ-ॿ]", text):
+        text = _SCHWA_RE.sub("", sanscript.transliterate(text, sanscript.DEVANAGARI, sanscript.ITRANS))
+    if re.search(r"[਀-੿]", text):
+        text = _SCHWA_RE.sub("", sanscript.transliterate(text, sanscript.GURMUKHI, sanscript.ITRANS))
+    # ITRANS anusvara / chandrabindu carry no meaning once romanized
+    return text.replace("M", "").replace(".N", "")
+
+
+def _fold(word: str) -> str:
+    for src, dst in _VOWEL_FOLDS:
+        word = word.replace(src, dst)
+    return re.sub(r"(.)\1+", r"\1", word)  # "paaani" / "dhanna" → single letters
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a question used as the cache key."""
+    # Lower-case Latin first so the ITRANS capitals below only come from Indic script
+    words = _WORD_RE.findall(_transliterate(prompt.lower()).lower())
+    tokens = [_fold(w) for w in words]
+    kept = [t for t in tokens if t not in STOP_WORDS]
+    return " ".join(kept or tokens)
+
+
+class AnswerCache:
+    def __init__(self, maxsize: int = ANSWER_CACHE_SIZE, ttl: int = ANSWER_CACHE_TTL_SECONDS,
+                 similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.maxsize = maxsize
+        self.similarity = similarity
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # (language, token) → cached keys, for similarity lookups; pruned lazily
+        self._index = defaultdict(set)
+        self._indexed = 0
+
+    def _key(self, prompt: str, language: str) -> tuple:
+        return language, normalize_prompt(prompt)
+
+    def _similar(self, language: str, normalized: str):
+        tokens = set(normalized.split())
+        if not tokens:
+            return None
+        best_key, best_score = None, 0.0
+        for token in tokens:
+            bucket = self._index.get((language, token), ())
+            for key in list(bucket):
+                if key not in self._cache:
+                    bucket.discard(key)
+                    continue
+                other = set(key[1].split())
+                score = len(tokens & other) / len(tokens | other)
+                if score > best_score:
+                    best_key, best_score = key, score
+        return best_key if best_score >= self.similarity else None
+
+    def get(self, prompt: str, language: str):
+        key = self._key(prompt, language)
+        answer = self._cache.get(key)
+        if answer is not None:
+            ANSWER_CACHE_REQUESTS.inc(result="hit")
+            return answer
+        if self.similarity > 0:
+            similar = self._similar(*key)
+            if similar is not None:
+                answer = self._cache.get(similar)
+                if answer is not None:
+                    ANSWER_CACHE_REQUESTS.inc(result="similar_hit")
+                    return answer
+        ANSWER_CACHE_REQUESTS.inc(result="miss")
+        return None
+
+    def put(self, prompt: str, language: str, answer: str):
+        key = self._key(prompt, language)
+        if not key[1]:
+            return
+        self._cache[key] = answer
+        if self.similarity > 0:
+            for token in set(key[1].split()):
+                self._index[(language, token)].add(key)
+            self._indexed += 1
+            if self._indexed > 4 * self.maxsize:
+                self._rebuild_index()
+
+    def _rebuild_index(self):
+        self._index = defaultdict(set)
+        for key in list(self._cache.keys()):
+            for token in set(key[1].split()):
+                self._index[(key[0], token)].add(key)
+        self._indexed = len(self._cache)
+
+
+def hit_ratio() -> float:
+    counts = ANSWER_CACHE_REQUESTS.values()
+    total = sum(counts.values())
+    if not total:
+        return 0.0
+    return (counts.get(("hit",), 0) + counts.get(("similar_hit",), 0)) / total
+
+
+ANSWER_CACHE_HIT_RATIO.set_function(hit_ratio)
+
+answer_cache = AnswerCache()
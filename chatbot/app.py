@@ -1,17 +1,25 @@
 import requests
 import json
+import asyncio
 from google.cloud import speech_v1p1beta1 as speech
-from langdetect import detect, DetectorFactory
 import os
 from dotenv import load_dotenv
+from monitoring.metrics import track_upstream
+from replay.transports import upstream_session
+from replay.google_clients import SpeechStandIn, stand_in
+from chatbot.answer_cache import answer_cache
+from chatbot.audio_chunks import prepare_chunks, STT_SAMPLE_RATE
+from chatbot.language import response_language
+from chatbot.gemini_client import (
+    gemini_client, GeminiError, extract_text, GEMINI_BASE_URL, GEMINI_CONNECT_TIMEOUT, GEMINI_DEADLINE_SECONDS
+)
 
 load_dotenv()
 
-# Ensure consistent language detection
-DetectorFactory.seed = 0
-
 API_KEY = os.getenv("CHATBOT_API")
-API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={API_KEY}"
+API_URL = f"{GEMINI_BASE_URL}:generateContent?key={API_KEY}"
+MP3_SAMPLE_RATE = int(os.getenv("STT_MP3_SAMPLE_RATE", "44100"))
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", "8"))
 
 def get_system_instruction(response_language):
     """
@@ -25,46 +33,100 @@ def get_system_instruction(response_language):
         }]
     }
 
-def get_gemini_response(user_query):
+def detect_response_language(user_query):
     """
-    Sends the user's query to the Gemini API and retrieves the response in the detected language.
+    Picks the language Gemini should answer in, based on the user's query.
     """
-    # Detect the language of the user query
-    try:
-        detected_lang = detect(user_query)
-    except:
-        detected_lang = "en"  # Fallback to English if detection fails
-
-    # Map detected language codes to human-readable language names
-    lang_map = {
-        "en": "English",
-        "hi": "Hindi",
-        "pa": "Punjabi",
-        # Add more mappings as needed
-    }
-    
-    # Handle Hinglish (often detected as Hindi or English)
-    if "hinglish" in user_query.lower() or (detected_lang in ["hi", "en"] and any(word in user_query.lower() for word in ["bhai", "yaar", "mix", "bol"])):
-        response_language = "Hinglish"
-    else:
-        response_language = lang_map.get(detected_lang, "English")  # Default to English if language not in map
-
-    payload = {
-        "contents": [{
+    return response_language(user_query)
+
+def build_gemini_payload(user_query, response_language=None, history=None, context=None):
+    """
+    history: earlier turns as Gemini `contents` entries (see chatbot.memory).
+    context: knowledge-base snippets relevant to the query (see chatbot.knowledge_base).
+    """
+    if response_language is None:
+        response_language = detect_response_language(user_query)
+    system_instruction = get_system_instruction(response_language)
+    if context:
+        notes = "\n".join(f"- {snippet}" for snippet in context)
+        system_instruction["parts"].append({
+            "text": f"Reference notes from our agronomy database. Use them where they answer the question:\n{notes}"
+        })
+    return {
+        "contents": (history or []) + [{
+            "role": "user",
             "parts": [{
                 "text": user_query
             }]
         }],
-        "systemInstruction": get_system_instruction(response_language)
+        "systemInstruction": system_instruction
     }
 
+async def get_gemini_response_async(user_query, history=None, context=None):
+    """
+    Async version of get_gemini_response for request handlers: pooled connection,
+    deadline, bounded retries and coalescing of identical in-flight prompts.
+    Stand-alone questions (no history) are served from the answer cache when possible.
+    """
+    response_language = detect_response_language(user_query)
+    if not history:
+        cached = answer_cache.get(user_query, response_language)
+        if cached is not None:
+            return cached
+
     try:
-        response = requests.post(API_URL, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        response.raise_for_status()  # Check for HTTP errors
+        result = await gemini_client.generate(build_gemini_payload(user_query, response_language, history, context))
+    except GeminiError as e:
+        print(f"❌ Gemini call failed: {e}")
+        return "Sorry, the AI service is not responding right now. Please try again in a moment."
+    except ValueError as e:
+        return f"An error occurred while parsing the API response: {e}"
+
+    bot_response_text = extract_text(result)
+    if bot_response_text:
+        if not history:
+            answer_cache.put(user_query, response_language, bot_response_text)
+        return bot_response_text
+    return "Sorry, I couldn't get a response. Please try again."
+
+async def stream_gemini_response(user_query, history=None, context=None):
+    """
+    Yields the answer in chunks as Gemini generates it (streamGenerateContent).
+    A cached answer is yielded as a single chunk. Raises GeminiError if the
+    stream cannot be completed.
+    """
+    response_language = detect_response_language(user_query)
+    if not history:
+        cached = answer_cache.get(user_query, response_language)
+        if cached is not None:
+            yield cached
+            return
+
+    chunks = []
+    async for chunk in gemini_client.stream(build_gemini_payload(user_query, response_language, history, context)):
+        chunks.append(chunk)
+        yield chunk
+    if chunks and not history:
+        answer_cache.put(user_query, response_language, "".join(chunks))
+
+def get_gemini_response(user_query):
+    """
+    Sends the user's query to the Gemini API and retrieves the response in the detected language.
+    Blocking; used by the command-line loop below. Request handlers use get_gemini_response_async.
+    """
+    payload = build_gemini_payload(user_query)
+
+    try:
+        with track_upstream("gemini"):
+            response = upstream_session.post(
+                API_URL, headers={'Content-Type': 'application/json'}, data=json.dumps(payload),
+                timeout=(GEMINI_CONNECT_TIMEOUT, GEMINI_DEADLINE_SECONDS)
+            )
+            response.raise_for_status()  # Check for HTTP errors
 
         result = response.json()
         
-        bot_response_text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text')
+        bot_response_text = extract_text(result)
         
         if bot_response_text:
             return bot_response_text
@@ -76,37 +138,66 @@ def get_gemini_response(user_query):
     except (json.JSONDecodeError, KeyError) as e:
         return f"An error occurred while parsing the API response: {e}"
 
-def transcribe_audio(audio_content: bytes, lang: str = None) -> tuple[str, str]:
-    """
-    Transcribes audio to text using Google Cloud Speech-to-Text.
-    Returns (transcript, detected_language).
-    """
-    client = speech.SpeechClient()
+_speech_async_client = None
+_stt_slots = asyncio.Semaphore(STT_MAX_CONCURRENCY)
 
-    # Configure recognition with Hindi optimization
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,  # Adjust for MP3 if needed
-        sample_rate_hertz=16000,  # Standard rate
+def get_speech_async_client():
+    """Shared SpeechAsyncClient, created on first use inside the event loop."""
+    global _speech_async_client
+    if _speech_async_client is None:
+        _speech_async_client = stand_in(SpeechStandIn, speech.SpeechAsyncClient)
+    return _speech_async_client
+
+def build_recognition_config(content_type: str = None) -> speech.RecognitionConfig:
+    is_mp3 = content_type in ("audio/mpeg", "audio/mp3")
+    return speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding.MP3 if is_mp3 else speech.RecognitionConfig.AudioEncoding.LINEAR16,
+        sample_rate_hertz=MP3_SAMPLE_RATE if is_mp3 else STT_SAMPLE_RATE,
         language_code='hi-IN',  # Explicitly set Hindi
         enable_automatic_punctuation=True,
         use_enhanced=True,  # Use enhanced model for better accuracy
         model='latest_long'  # Switch to long model for better context
     )
 
-    audio = speech.RecognitionAudio(content=audio_content)
+async def recognize_async(audio_content: bytes, config: speech.RecognitionConfig) -> tuple[str, str]:
+    """One synchronous-recognize call; returns (transcript, language) with '' for silence."""
+    async with _stt_slots:
+        with track_upstream("stt"):
+            response = await get_speech_async_client().recognize(
+                config=config, audio=speech.RecognitionAudio(content=audio_content)
+            )
+    transcript = " ".join(result.alternatives[0].transcript for result in response.results if result.alternatives)
+    detected_lang = response.results[0].language_code if response.results else None
+    return transcript.strip(), detected_lang
+
+async def transcribe_audio_async(audio_content: bytes, content_type: str = None) -> tuple[str, str]:
+    """
+    Transcribes audio with Google Cloud Speech-to-Text: the uploaded bytes go
+    straight to the API without touching disk or blocking the event loop.
+    Async only: the client and the concurrency semaphore belong to the app's loop.
 
+    WAV voice notes are resampled to 16 kHz mono and split at pauses in-process;
+    the chunks are recognized concurrently and stitched back in order, so a long
+    note takes about as long as its slowest chunk. Other formats are sent as-is.
+    Returns (transcript, detected_language).
+    """
     try:
-        response = client.recognize(config=config, audio=audio)
-        if response.results:
-            transcript = response.results[0].alternatives[0].transcript
-            detected_lang = response.results[0].language_code
-            return transcript, detected_lang
+        chunks = await asyncio.to_thread(prepare_chunks, audio_content)
+        if chunks:
+            config = build_recognition_config()
+            results = await asyncio.gather(*(recognize_async(chunk, config) for chunk in chunks))
         else:
-            return "No speech detected.", 'en-US'  # Fallback
+            results = [await recognize_async(audio_content, build_recognition_config(content_type))]
     except Exception as e:
         print(f"STT failed: {e}")
         return "Transcription failed.", 'en-US'
 
+    transcript = " ".join(text for text, _ in results if text)
+    if not transcript:
+        return "No speech detected.", 'en-US'  # Fallback
+    detected_lang = next((lang for text, lang in results if text and lang), 'hi-IN')
+    return transcript, detected_lang
+
 def main():
     """
     Runs the main loop for the chatbot.
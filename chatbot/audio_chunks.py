@@ -0,0 +1,112 @@
+"""Split long voice notes into recognizer-sized chunks, in-process.
+
+WAV uploads are decoded with the standard `wave` module, mixed to mono,
+resampled to 16 kHz (scipy.signal.resample_poly) and cut at pauses, so each
+chunk can go to Speech-to-Text's synchronous recognize (about a minute max)
+concurrently. Chunks come back as raw LINEAR16 bytes.
+"""
+import io
+import os
+import wave
+from math import gcd
+import numpy as np
+from scipy.signal import resample_poly
+
+STT_SAMPLE_RATE = 16000
+CHUNK_TARGET_SECONDS = float(os.getenv("STT_CHUNK_TARGET_SECONDS", "15"))  # start looking for a pause
+CHUNK_MAX_SECONDS = float(os.getenv("STT_CHUNK_MAX_SECONDS", "50"))        # hard cut, below the sync limit
+FRAME_SECONDS = 0.02
+MIN_SILENCE_SECONDS = 0.3
+SILENCE_MARGIN_DB = 12  # frames this far below the clip's speech level count as silence
+
+
+def decode_wav(data: bytes):
+    """(mono float32 samples in [-1, 1], sample rate) for a PCM WAV, or None if not one."""
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        return None
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def resample(samples: np.ndarray, rate: int, target: int = STT_SAMPLE_RATE) -> np.ndarray:
+    if rate == target:
+        return samples
+    divisor = gcd(rate, target)
+    return resample_poly(samples, target // divisor, rate // divisor).astype(np.float32)
+
+
+def split_on_silence(samples: np.ndarray, rate: int = STT_SAMPLE_RATE) -> list:
+    """(start, end) sample ranges, each at most CHUNK_MAX_SECONDS, cut at pauses where possible."""
+    frame = int(rate * FRAME_SECONDS)
+    total = len(samples)
+    if total <= int(CHUNK_TARGET_SECONDS * rate) or frame == 0:
+        return [(0, total)]
+
+    n_frames = total // frame
+    rms = np.sqrt(np.mean(samples[: n_frames * frame].reshape(n_frames, frame) ** 2, axis=1) + 1e-12)
+    level_db = 20 * np.log10(rms)
+    threshold = np.percentile(level_db, 90) - SILENCE_MARGIN_DB
+    silent = level_db < threshold
+
+    min_silent_frames = max(1, int(MIN_SILENCE_SECONDS / FRAME_SECONDS))
+    target_frames = int(CHUNK_TARGET_SECONDS / FRAME_SECONDS)
+    max_frames = int(CHUNK_MAX_SECONDS / FRAME_SECONDS)
+
+    cuts = []
+    start = 0
+    while n_frames - start > target_frames:
+        # Look for a pause after the target length, without leaving a tiny tail
+        window_end = min(start + max_frames, n_frames - target_frames // 3)
+        cut = None
+        run = 0
+        for i in range(start + target_frames, window_end):
+            run = run + 1 if silent[i] else 0
+            if run >= min_silent_frames:
+                cut = i - run // 2  # middle of the pause
+                break
+        if cut is None:
+            if n_frames - start <= max_frames:
+                break
+            # No pause long enough: cut at the quietest frame between target and max
+            lo = start + target_frames
+            cut = lo + int(np.argmin(level_db[lo:start + max_frames]))
+        cuts.append(cut)
+        start = cut
+
+    bounds = [0] + [c * frame for c in cuts] + [total]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def to_linear16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def prepare_chunks(data: bytes):
+    """LINEAR16 16 kHz mono chunks for a WAV upload, or None when it is not a PCM WAV."""
+    decoded = decode_wav(data)
+    if decoded is None:
+        return None
+    samples = resample(*decoded)
+    return [to_linear16(samples[a:b]) for a, b in split_on_silence(samples)]
@@ -0,0 +1,116 @@
+"""Benchmark: script-based language detection vs langdetect on real chat prompts.
+
+Run from the repository root:
+
+    python -m chatbot.benchmark_language --limit 5000          # prompts from chat_history
+    python -m chatbot.benchmark_language --file prompts.txt    # one prompt per line (or JSONL with "prompt")
+
+Reports per-prompt latency for both detectors, how often the fast path had to
+fall back to langdetect, and where the two disagree on the response language.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import numpy as np
+
+from chatbot import language
+
+
+def legacy_response_language(text: str) -> str:
+    """The previous per-request logic: langdetect plus the Hinglish substring check."""
+    from langdetect import detect, DetectorFactory
+    DetectorFactory.seed = 0
+    try:
+        detected_lang = detect(text)
+    except Exception:
+        detected_lang = "en"
+    lang_map = {"en": "English", "hi": "Hindi", "pa": "Punjabi"}
+    if "hinglish" in text.lower() or (detected_lang in ["hi", "en"] and any(word in text.lower() for word in ["bhai", "yaar", "mix", "bol"])):
+        return "Hinglish"
+    return lang_map.get(detected_lang, "English")
+
+
+def load_file(path: str) -> list:
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                doc = json.loads(line)
+                line = doc.get("prompt") or doc.get("transcript") or ""
+            if line:
+                prompts.append(line)
+    return prompts
+
+
+async def load_chat_history(limit: int) -> list:
+    from auth.database import db
+    cursor = db["chat_history"].find({}, {"_id": 0, "prompt": 1, "transcript": 1}).sort("timestamp", -1).limit(limit)
+    return [doc.get("prompt") or doc.get("transcript") async for doc in cursor if doc.get("prompt") or doc.get("transcript")]
+
+
+def time_each(fn, prompts: list) -> tuple:
+    results, timings = [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        results.append(fn(prompt))
+        timings.append(time.perf_counter() - start)
+    return results, np.array(timings) * 1e6
+
+
+def report(name: str, timings_us: np.ndarray):
+    print(f"{name:<24} p50 {np.percentile(timings_us, 50):9.1f} µs   p95 {np.percentile(timings_us, 95):9.1f} µs   "
+          f"max {timings_us.max():10.1f} µs   total {timings_us.sum() / 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", help="prompts file instead of chat_history")
+    parser.add_argument("--limit", type=int, default=5000, help="chat_history documents to read")
+    args = parser.parse_args()
+
+    prompts = load_file(args.file) if args.file else asyncio.run(load_chat_history(args.limit))
+    if not prompts:
+        raise SystemExit("No prompts found")
+    print(f"{len(prompts)} prompts")
+
+    # First call pays langdetect's profile loading; report it separately
+    start = time.perf_counter()
+    legacy_response_language(prompts[0])
+    print(f"langdetect cold start: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    legacy, legacy_us = time_each(legacy_response_language, prompts)
+
+    fallbacks = Counter()
+    original = language._langdetect
+
+    def counting_langdetect(text):
+        fallbacks["langdetect"] += 1
+        return original(text)
+
+    language._langdetect = counting_langdetect
+    try:
+        fast, fast_us = time_each(language.response_language, prompts)
+    finally:
+        language._langdetect = original
+
+    report("langdetect (before)", legacy_us)
+    report("script detector (after)", fast_us)
+    print(f"fell back to langdetect: {fallbacks['langdetect']} / {len(prompts)}")
+
+    distribution = Counter(fast)
+    print("response languages:", dict(distribution.most_common()))
+    disagreements = Counter((old, new) for old, new in zip(legacy, fast) if old != new)
+    print(f"disagreements: {sum(disagreements.values())}")
+    for (old, new), count in disagreements.most_common(10):
+        example = next(p for p, o, n in zip(prompts, legacy, fast) if (o, n) == (old, new))
+        print(f"  {old:>8} -> {new:<8} x{count}  e.g. {example[:70]!r}")
+
+
+if __name__ == "__main__":
+    main()
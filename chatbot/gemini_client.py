@@ -0,0 +1,209 @@
+"""Shared async client for the Gemini generateContent / streamGenerateContent APIs.
+
+One pooled httpx.AsyncClient for the whole process, a hard deadline per call,
+a small number of retries (with jittered exponential backoff) on timeouts,
+429 and 5xx, and single-flight coalescing: concurrent calls with an identical
+payload share one upstream request instead of each paying for it.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import httpx
+from dotenv import load_dotenv
+from monitoring.metrics import UPSTREAM_ERRORS, UPSTREAM_REQUEST_SECONDS, GEMINI_COALESCED
+from replay.transports import async_transport
+
+load_dotenv()
+
+API_KEY = os.getenv("CHATBOT_API")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_BASE_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}"
+
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "20"))
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_BACKOFF_BASE = 0.5
+GEMINI_BACKOFF_MAX = 4.0
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """Gemini could not produce an answer within the deadline / retry budget."""
+
+
+class GeminiClient:
+    def __init__(self, api_key: str = API_KEY, base_url: str = GEMINI_BASE_URL,
+                 deadline: float = GEMINI_DEADLINE_SECONDS, max_retries: int = GEMINI_MAX_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self._client = None
+        self._inflight = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+            )
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.deadline, connect=GEMINI_CONNECT_TIMEOUT),
+                limits=limits,
+                transport=async_transport(limits),  # record/replay stand-in when UPSTREAM_MODE is set
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _payload_key(payload: dict) -> str:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), GEMINI_BACKOFF_MAX)
+            except ValueError:
+                pass
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt))
+
+    async def _post_with_retries(self, payload: dict) -> dict:
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise GeminiError("Gemini deadline exceeded")
+
+            start = time.perf_counter()
+            retry_after = None
+            try:
+                response = await asyncio.wait_for(
+                    self.client.post(
+                        f"{self.base_url}:generateContent",
+                        params={"key": self.api_key},
+                        json=payload,
+                    ),
+                    timeout=remaining,
+                )
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                retry_after = response.headers.get("Retry-After")
+                error = GeminiError(f"Gemini returned HTTP {response.status_code}")
+            except (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError) as e:
+                error = GeminiError(f"Gemini request failed: {e!r}")
+            except httpx.HTTPStatusError as e:
+                # 4xx other than 429: retrying will not help
+                UPSTREAM_ERRORS.inc(upstream="gemini")
+                raise GeminiError(f"Gemini returned HTTP {e.response.status_code}") from e
+            finally:
+                UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - start, upstream="gemini")
+
+            UPSTREAM_ERRORS.inc(upstream="gemini")
+            if attempt >= self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            if time.monotonic() + delay >= deadline:
+                raise error
+            print(f"⚠️ {error}; retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _finish(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    async def generate(self, payload: dict) -> dict:
+        """POST one generateContent payload; identical concurrent payloads share a request."""
+        key = self._payload_key(payload)
+        task = self._inflight.get(key)
+        if task is not None:
+            GEMINI_COALESCED.inc()
+        else:
+            task = asyncio.ensure_future(self._post_with_retries(payload))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # shield: one caller disconnecting must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def stream(self, payload: dict):
+        """Yield text chunks from streamGenerateContent (SSE) as Gemini produces them.
+
+        Retries only happen before the first chunk; once text has been handed
+        to the caller a failure is raised as GeminiError.
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            started = False
+            retry_after = None
+            try:
+                async with self.client.stream(
+                    "POST",
+                    f"{self.base_url}:streamGenerateContent",
+                    params={"key": self.api_key, "alt": "sse"},
+                    json=payload,
+                ) as response:
+                    if response.status_code in RETRYABLE_STATUS:
+                        retry_after = response.headers.get("Retry-After")
+                        error = GeminiError(f"Gemini returned HTTP {response.status_code}")
+                    else:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if time.monotonic() > deadline:
+                                raise GeminiError("Gemini deadline exceeded")
+                            if not line.startswith("data:"):
+                                continue
+                            text = extract_text(json.loads(line[5:]))
+                            if text:
+                                started = True
+                                yield text
+                        return
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                error = GeminiError(f"Gemini stream failed: {e!r}")
+            except httpx.HTTPStatusError as e:
+                UPSTREAM_ERRORS.inc(upstream="gemini")
+                raise GeminiError(f"Gemini returned HTTP {e.response.status_code}") from e
+            except (GeminiError, ValueError):
+                UPSTREAM_ERRORS.inc(upstream="gemini")
+                raise
+            finally:
+                UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - start, upstream="gemini")
+
+            UPSTREAM_ERRORS.inc(upstream="gemini")
+            if started or attempt >= self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            if time.monotonic() + delay >= deadline:
+                raise error
+            print(f"⚠️ {error}; retrying stream in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def extract_text(result: dict):
+    """First candidate's text from a generateContent response, or None."""
+    try:
+        parts = result["candidates"][0]["content"]["parts"]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return "".join(part.get("text", "") for part in parts) or None
+
+
+gemini_client = GeminiClient()
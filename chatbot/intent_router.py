@@ -0,0 +1,489 @@
+"""Answer structured price, weather and irrigation questions without Gemini.
+
+A keyword classifier picks at most one intent and extracts slots (crop,
+state, growth stage, soil) from English, Hinglish, Hindi and Punjabi
+prompts. When the intent is unambiguous and its slots are filled, the
+answer comes from our own engines:
+
+    price       PricePredictor (latest reference price and 8-week trend)
+    weather     fetch_weather_by_coords (user's saved location, else the state)
+    irrigation  CropCalendar (water use and irrigation depth for the stage)
+
+and is formatted in the user's language. Everything else (open-ended
+questions, ambiguous or incomplete ones) returns None and goes to Gemini.
+Hit ratio and the latency saved against the observed Gemini latency are
+exported on /metrics.
+"""
+import asyncio
+import os
+import re
+import time
+from chatbot.language import response_language
+from location_detector.location import with_region
+from monitoring.metrics import (
+    INTENT_ROUTER_REQUESTS, INTENT_ROUTER_HIT_RATIO, INTENT_ROUTER_SECONDS_SAVED,
+    UPSTREAM_REQUEST_SECONDS
+)
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "1") == "1"
+INTENT_ROUTER_MAX_WORDS = int(os.getenv("INTENT_ROUTER_MAX_WORDS", "25"))
+INTENT_ROUTER_ENGINE_TIMEOUT = float(os.getenv("INTENT_ROUTER_ENGINE_TIMEOUT", "4"))
+# Assumed Gemini latency until real calls have been observed
+LLM_BASELINE_SECONDS = float(os.getenv("INTENT_ROUTER_LLM_BASELINE_SECONDS", "2.0"))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+|[ऀ-ॿ]+|[਀-੿]+")
+
+# Canonical crop (PricePredictor / MASTER_CROP_DATABASE key) -> aliases. The
+# second entry, when romanized, is the Hinglish display name; the first
+# Devanagari / Gurmukhi alias is the Hindi / Punjabi one.
+CROP_ALIASES = {
+    "Wheat": ["wheat", "gehun", "gehu", "gehoon", "kanak", "गेहूं", "गेहू", "ਕਣਕ"],
+    "Paddy (Rice)": ["paddy", "dhan", "rice", "dhaan", "chawal", "jhona", "धान", "चावल", "ਝੋਨਾ", "ਚੌਲ"],
+    "Maize": ["maize", "makka", "corn", "makki", "मक्का", "ਮੱਕੀ"],
+    "Bajra": ["bajra", "बाजरा", "ਬਾਜਰਾ", "pearl millet"],
+    "Jowar": ["jowar", "ज्वार", "ਜਵਾਰ", "sorghum"],
+    "Cotton": ["cotton", "kapas", "narma", "कपास", "ਨਰਮਾ", "ਕਪਾਹ"],
+    "Sugarcane": ["sugarcane", "ganna", "गन्ना", "ਗੰਨਾ"],
+    "Mustard": ["mustard", "sarson", "सरसों", "ਸਰ੍ਹੋਂ"],
+    "Soyabean": ["soyabean", "सोयाबीन", "ਸੋਇਆਬੀਨ", "soybean", "soya"],
+    "Sunflower": ["sunflower", "surajmukhi", "सूरजमुखी", "ਸੂਰਜਮੁਖੀ"],
+    "Potato": ["potato", "aloo", "aalu", "alu", "आलू", "ਆਲੂ"],
+    "Onion": ["onion", "pyaz", "pyaaz", "pyaj", "प्याज", "ਪਿਆਜ"],
+    "Tomato": ["tomato", "tamatar", "टमाटर", "ਟਮਾਟਰ"],
+    "Cabbage": ["cabbage", "patta gobhi", "band gobhi", "bandh gobhi", "पत्ता गोभी", "बंद गोभी", "ਬੰਦ ਗੋਭੀ"],
+    "Cauliflower": ["cauliflower", "phool gobhi", "phool gobi", "gobhi", "gobi", "फूलगोभी", "फूल गोभी", "गोभी", "ਫੁੱਲ ਗੋਭੀ", "ਗੋਭੀ"],
+    "Brinjal": ["brinjal", "baingan", "eggplant", "bengan", "बैंगन", "ਬੈਂਗਣ"],
+    "Okra": ["okra", "bhindi", "lady finger", "भिंडी", "ਭਿੰਡੀ"],
+    "Peas": ["peas", "matar", "pea", "मटर", "ਮਟਰ"],
+    "Green Chilli": ["green chilli", "hari mirch", "chilli", "chili", "mirch", "हरी मिर्च", "मिर्च", "ਹਰੀ ਮਿਰਚ", "ਮਿਰਚ"],
+    "Cucumber": ["cucumber", "kheera", "khira", "खीरा", "ਖੀਰਾ"],
+    "Garlic": ["garlic", "lahsun", "lehsun", "लहसुन", "ਲਸਣ"],
+    "Ginger": ["ginger", "adrak", "अदरक", "ਅਦਰਕ"],
+    "Mango": ["mango", "aam", "आम", "ਅੰਬ"],
+    "Banana": ["banana", "kela", "केला", "ਕੇਲਾ"],
+    "Guava": ["guava", "amrood", "amrud", "अमरूद", "ਅਮਰੂਦ"],
+    "Orange": ["orange", "santra", "kinnow", "kinnu", "संतरा", "ਸੰਤਰਾ", "ਕਿੰਨੂ"],
+    "Lemon": ["lemon", "nimbu", "neembu", "नींबू", "ਨਿੰਬੂ"],
+    "Watermelon": ["watermelon", "tarbooz", "tarbuj", "तरबूज", "ਤਰਬੂਜ"],
+}
+
+STATE_ALIASES = {
+    "Punjab": ["punjab", "पंजाब", "ਪੰਜਾਬ"],
+    "Haryana": ["haryana", "हरियाणा", "ਹਰਿਆਣਾ"],
+    "Uttar Pradesh": ["uttar pradesh", "उत्तर प्रदेश", "यूपी", "ਉੱਤਰ ਪ੍ਰਦੇਸ਼", "uttarpradesh"],
+    "Madhya Pradesh": ["madhya pradesh", "मध्य प्रदेश", "एमपी", "ਮੱਧ ਪ੍ਰਦੇਸ਼", "madhyapradesh"],
+    "Bihar": ["bihar", "बिहार", "ਬਿਹਾਰ"],
+    "Rajasthan": ["rajasthan", "राजस्थान", "ਰਾਜਸਥਾਨ"],
+    "Gujarat": ["gujarat", "गुजरात", "ਗੁਜਰਾਤ"],
+    "Maharashtra": ["maharashtra", "महाराष्ट्र", "ਮਹਾਰਾਸ਼ਟਰ"],
+    "Karnataka": ["karnataka", "कर्नाटक", "ਕਰਨਾਟਕ"],
+    "Andhra Pradesh": ["andhra pradesh", "आंध्र प्रदेश", "ਆਂਧਰਾ ਪ੍ਰਦੇਸ਼", "andhra"],
+    "Telangana": ["telangana", "तेलंगाना", "ਤੇਲੰਗਾਨਾ"],
+    "West Bengal": ["west bengal", "पश्चिम बंगाल", "बंगाल", "ਪੱਛਮੀ ਬੰਗਾਲ", "bengal"],
+}
+
+# Uppercase-only abbreviations ("up" and "mp" are ordinary English words)
+STATE_ABBREVIATIONS = {"UP": "Uttar Pradesh", "MP": "Madhya Pradesh", "AP": "Andhra Pradesh", "WB": "West Bengal"}
+
+# Representative coordinates (state capital or main farming belt) for weather by state
+STATE_COORDS = {
+    "Punjab": (30.7333, 76.7794), "Haryana": (29.0588, 76.0856), "Uttar Pradesh": (26.8467, 80.9462),
+    "Madhya Pradesh": (23.2599, 77.4126), "Bihar": (25.5941, 85.1376), "Rajasthan": (26.9124, 75.7873),
+    "Gujarat": (23.0225, 72.5714), "Maharashtra": (18.5204, 73.8567), "Karnataka": (12.9716, 77.5946),
+    "Andhra Pradesh": (16.5062, 80.6480), "Telangana": (17.3850, 78.4867), "West Bengal": (22.5726, 88.3639),
+}
+
+STAGE_ALIASES = {
+    "initial": ["initial", "sowing", "seedling", "germination", "early", "bijai", "buvai", "buwai", "ropai",
+                "shuru", "बुवाई", "बोवाई", "रोपाई", "अंकुरण", "ਬਿਜਾਈ"],
+    "mid": ["mid", "middle", "vegetative", "tillering", "flowering", "booting", "heading", "phool", "kalle",
+            "futav", "फूल", "फुटाव", "कल्ले", "ਫੁੱਲ"],
+    "late": ["late", "ripening", "maturity", "harvest", "harvesting", "katai", "pakna", "pakne",
+             "कटाई", "पकने", "ਕਟਾਈ", "ਪੱਕਣ"],
+}
+
+SOIL_ALIASES = {
+    "loamy": ["loamy", "loam", "domat", "दोमट", "ਦੋਮਟ"],
+    "sandy": ["sandy", "sand", "retili", "balui", "बलुई", "रेतीली", "ਰੇਤਲੀ"],
+    "clayey": ["clayey", "clay", "chikni", "चिकनी", "ਚੀਕਣੀ"],
+    "black soil": ["black soil", "black cotton", "kali mitti", "काली मिट्टी", "ਕਾਲੀ ਮਿੱਟੀ"],
+    "alluvial": ["alluvial", "jalodh", "जलोढ़", "जलोढ"],
+    "red and yellow": ["red soil", "lal mitti", "लाल मिट्टी"],
+    "laterite": ["laterite", "लेटराइट"],
+    "arid": ["arid", "desert", "marusthali", "मरुस्थली"],
+}
+
+INTENT_KEYWORDS = {
+    "price": ["price", "prices", "msp", "mandi", "market", "sell", "selling", "bhav", "bhaav",
+              "daam", "dam", "keemat", "kimat", "bechna", "bechu", "bechen",
+              "भाव", "दाम", "कीमत", "मंडी", "बेचना", "ਭਾਅ", "ਕੀਮਤ", "ਮੰਡੀ"],
+    "weather": ["weather", "forecast", "temperature", "mausam", "mosam", "tapman", "barish", "baarish", "rain",
+                "rainfall", "मौसम", "बारिश", "तापमान", "वर्षा", "ਮੌਸਮ", "ਮੀਂਹ", "ਤਾਪਮਾਨ"],
+    "irrigation": ["irrigation", "irrigate", "irrigating", "watering", "sinchai", "sichai",
+                   "सिंचाई", "ਸਿੰਚਾਈ"],
+}
+
+# Words that name an intent only next to a cue: "rate" is also a seed or dose rate,
+# "water" is also waterlogging or water quality. intent -> (words, cues)
+CUED_INTENT_KEYWORDS = {
+    "price": (["rate", "rates", "रेट", "ਰੇਟ"],
+              ["today", "aaj", "quintal", "qtl", "rs", "rupees", "current", "latest",
+               "आज", "क्विंटल", "रुपये", "ਅੱਜ", "ਕੁਇੰਟਲ"]),
+    "irrigation": (["water", "paani", "pani", "पानी", "ਪਾਣੀ"],
+                   ["when", "how often", "how much", "schedule", "interval", "give", "apply", "kab", "kitna",
+                    "kitne din", "dena", "dein", "lagana", "कब", "कितना", "कितने दिन", "देना", "दें",
+                    "ਕਦੋਂ", "ਕਿੰਨਾ", "ਦੇਣਾ"]),
+}
+
+# Explanations, diagnoses and how-tos need the LLM even when an intent word appears
+OPEN_ENDED_MARKERS = [
+    "why", "how to", "explain", "disease", "pest", "pests", "insect", "treatment", "cure", "symptom",
+    "kyon", "kyun", "kyu", "kaise", "bimari", "rog", "keeda", "keede", "ilaj", "upay", "dawai",
+    "क्यों", "कैसे", "बीमारी", "रोग", "कीड़ा", "कीडा", "इलाज", "उपाय", "दवाई",
+    "ਕਿਉਂ", "ਕਿਵੇਂ", "ਬਿਮਾਰੀ", "ਰੋਗ", "ਕੀੜਾ", "ਇਲਾਜ",
+    # Agronomy rates and water problems, not mandi prices or irrigation schedules
+    "seed rate", "application rate", "fertilizer rate", "fertiliser rate", "dose", "dosage", "waterlogging",
+    "water logging", "waterlogged", "water logged", "water quality", "beej dar", "khurak", "jal bharav",
+    "बीज दर", "खुराक", "जलभराव", "ਬੀਜ ਦਰ", "ਖੁਰਾਕ",
+]
+
+DAYS_RE = re.compile(r"(\d{1,3})\s*(?:days?|din|दिन|ਦਿਨ)")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, fold nukta/chandrabindu spelling variants and keep word tokens only."""
+    text = text.lower().replace("़", "").replace("਼", "").replace("ँ", "ं")
+    return " " + " ".join(TOKEN_RE.findall(text)) + " "
+
+
+def _build_lexicon(aliases: dict) -> list:
+    """(normalized alias, canonical) pairs, longest first so 'phool gobhi' wins over 'gobhi'."""
+    pairs = [(normalize_text(alias), canonical) for canonical, names in aliases.items() for alias in names]
+    return sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+
+CROP_LEXICON = _build_lexicon(CROP_ALIASES)
+STATE_LEXICON = _build_lexicon(STATE_ALIASES)
+STAGE_LEXICON = _build_lexicon(STAGE_ALIASES)
+SOIL_LEXICON = _build_lexicon(SOIL_ALIASES)
+INTENT_LEXICON = _build_lexicon(INTENT_KEYWORDS)
+OPEN_ENDED_LEXICON = [normalize_text(marker) for marker in OPEN_ENDED_MARKERS]
+CUED_INTENT_LEXICON = {
+    intent: ([normalize_text(word) for word in words], [normalize_text(cue) for cue in cues])
+    for intent, (words, cues) in CUED_INTENT_KEYWORDS.items()
+}
+
+
+def _find_all(text: str, lexicon: list) -> tuple:
+    """(canonical values in order of first match, text with matches blanked out)."""
+    found = []
+    for alias, canonical in lexicon:
+        if alias in text:
+            text = text.replace(alias, " ")
+            if canonical not in found:
+                found.append(canonical)
+    return found, text
+
+
+def extract_slots(prompt: str) -> dict:
+    """Crop, state, stage, soil and days since sowing mentioned in the prompt (None when absent)."""
+    text = normalize_text(prompt)
+    crops, text = _find_all(text, CROP_LEXICON)
+    states, text = _find_all(text, STATE_LEXICON)
+    stages, text = _find_all(text, STAGE_LEXICON)
+    soils, text = _find_all(text, SOIL_LEXICON)
+    if not states:
+        states = [state for abbr, state in STATE_ABBREVIATIONS.items() if re.search(rf"\b{abbr}\b", prompt)]
+    days = DAYS_RE.search(prompt.lower())
+    return {
+        "crop": crops[0] if len(crops) == 1 else None,
+        "crops": crops,
+        "state": states[0] if len(states) == 1 else None,
+        "stage": stages[0] if len(stages) == 1 else None,
+        "soil": soils[0] if soils else None,
+        "days_sown": int(days.group(1)) if days else None,
+    }
+
+
+def classify(prompt: str):
+    """The single intent a prompt asks for, or None when it is open-ended or ambiguous."""
+    text = normalize_text(prompt)
+    if len(text.split()) > INTENT_ROUTER_MAX_WORDS:
+        return None
+    if any(marker in text for marker in OPEN_ENDED_LEXICON):
+        return None
+    intents, rest = _find_all(text, INTENT_LEXICON)
+    for intent, (words, cues) in CUED_INTENT_LEXICON.items():
+        if intent not in intents and any(word in rest for word in words) and any(cue in text for cue in cues):
+            intents.append(intent)
+    return intents[0] if len(intents) == 1 else None
+
+
+# -------------------------
+# Answer templates
+# -------------------------
+LANG_CODES = {"English": "en", "Hindi": "hi", "Hinglish": "hinglish", "Punjabi": "pa"}
+
+TEMPLATES = {
+    "price": {
+        "en": "{crop} in {state}: latest reference price ₹{price:,.0f} per quintal. {trend}",
+        "hinglish": "{state} mein {crop} ka latest bhav ₹{price:,.0f} prati quintal hai. {trend}",
+        "hi": "{state} में {crop} का ताज़ा भाव ₹{price:,.0f} प्रति क्विंटल है। {trend}",
+        "pa": "{state} ਵਿੱਚ {crop} ਦਾ ਤਾਜ਼ਾ ਭਾਅ ₹{price:,.0f} ਪ੍ਰਤੀ ਕੁਇੰਟਲ ਹੈ। {trend}",
+    },
+    "price_trend": {
+        "en": "Outlook for the next 8 weeks: {trend} (average {change:+.1f}%). {recommendation}.",
+        "hinglish": "Agle 8 hafton ka andaza: {trend} (average {change:+.1f}%). {recommendation}.",
+        "hi": "अगले 8 हफ्तों का अनुमान: {trend} (औसत {change:+.1f}%)। {recommendation}।",
+        "pa": "ਅਗਲੇ 8 ਹਫ਼ਤਿਆਂ ਦਾ ਅੰਦਾਜ਼ਾ: {trend} (ਔਸਤ {change:+.1f}%)। {recommendation}।",
+    },
+    "weather": {
+        "en": "Weather in {place} now: {temp}°C, {condition}, humidity {humidity}%, wind {wind} km/h.",
+        "hinglish": "{place} mein abhi mausam: {temp}°C, {condition}, nami {humidity}%, hawa {wind} km/h.",
+        "hi": "{place} में अभी मौसम: {temp}°C, {condition}, नमी {humidity}%, हवा {wind} km/h।",
+        "pa": "{place} ਵਿੱਚ ਹੁਣ ਮੌਸਮ: {temp}°C, {condition}, ਨਮੀ {humidity}%, ਹਵਾ {wind} km/h।",
+    },
+    "weather_day": {
+        "en": " {date}: {tmin}–{tmax}°C.",
+        "hinglish": " {date}: {tmin}–{tmax}°C.",
+        "hi": " {date}: {tmin}–{tmax}°C।",
+        "pa": " {date}: {tmin}–{tmax}°C।",
+    },
+    "irrigation": {
+        "en": ("{crop}, {stage} stage ({soil} soil): the crop uses about {etc:.1f} mm of water a day. "
+               "Irrigate every {interval} days with about {depth:.0f} mm (≈{litres:,.0f} litres per acre); "
+               "skip an irrigation after good rain."),
+        "hinglish": ("{crop}, {stage} stage ({soil} mitti): fasal roz lagbhag {etc:.1f} mm paani leti hai. "
+                     "Har {interval} din mein lagbhag {depth:.0f} mm (≈{litres:,.0f} litre prati acre) sinchai karein; "
+                     "achhi barish ke baad ek sinchai chhod dein."),
+        "hi": ("{crop}, {stage} अवस्था ({soil} मिट्टी): फसल रोज़ लगभग {etc:.1f} mm पानी लेती है। "
+               "हर {interval} दिन में लगभग {depth:.0f} mm (≈{litres:,.0f} लीटर प्रति एकड़) सिंचाई करें; "
+               "अच्छी बारिश के बाद एक सिंचाई छोड़ दें।"),
+        "pa": ("{crop}, {stage} ਪੜਾਅ ({soil} ਮਿੱਟੀ): ਫਸਲ ਰੋਜ਼ ਲਗਭਗ {etc:.1f} mm ਪਾਣੀ ਲੈਂਦੀ ਹੈ। "
+               "ਹਰ {interval} ਦਿਨਾਂ ਬਾਅਦ ਲਗਭਗ {depth:.0f} mm (≈{litres:,.0f} ਲੀਟਰ ਪ੍ਰਤੀ ਏਕੜ) ਸਿੰਚਾਈ ਕਰੋ; "
+               "ਚੰਗੇ ਮੀਂਹ ਤੋਂ ਬਾਅਦ ਇੱਕ ਸਿੰਚਾਈ ਛੱਡ ਦਿਓ।"),
+    },
+    "paddy_irrigation": {
+        "en": "Paddy (Rice), {stage} stage: keep about 5 cm of standing water; top up every {usual} days, when the water has just soaked in.",
+        "hinglish": "Dhaan, {stage} stage: khet mein lagbhag 5 cm paani khada rakhein; har {usual} din mein, paani sookhte hi dobara bharein.",
+        "hi": "धान, {stage} अवस्था: खेत में लगभग 5 सेमी पानी खड़ा रखें; हर {usual} दिन में, पानी सूखते ही दोबारा भरें।",
+        "pa": "ਝੋਨਾ, {stage} ਪੜਾਅ: ਖੇਤ ਵਿੱਚ ਲਗਭਗ 5 ਸੈਂਟੀਮੀਟਰ ਪਾਣੀ ਖੜ੍ਹਾ ਰੱਖੋ; ਹਰ {usual} ਦਿਨਾਂ ਬਾਅਦ, ਪਾਣੀ ਸੁੱਕਦੇ ਹੀ ਮੁੜ ਭਰੋ।",
+    },
+}
+
+# PricePredictor's trend and recommendation strings
+PRICE_PHRASES = {
+    "hinglish": {
+        "STRONG UPWARD 📈": "tezi se upar 📈", "UPWARD ↗️": "upar ↗️", "STABLE ↔️": "sthir ↔️",
+        "DOWNWARD ↘️": "neeche ↘️", "STRONG DOWNWARD 📉": "tezi se neeche 📉",
+        "SELL NOW - Best prices expected": "Abhi bechein - sabse achha bhav milne ki ummeed",
+        "Good time to sell in coming weeks": "Agle kuch hafton mein bechna achha rahega",
+        "Prices stable - Plan accordingly": "Bhav sthir hain - usi hisaab se yojana banayein",
+        "Monitor closely - Prices may drop": "Nazar rakhein - bhav gir sakte hain",
+        "HOLD - Wait for market recovery": "Abhi rokein - bazaar sudharne ka intezaar karein",
+    },
+    "hi": {
+        "STRONG UPWARD 📈": "तेज़ी से ऊपर 📈", "UPWARD ↗️": "ऊपर ↗️", "STABLE ↔️": "स्थिर ↔️",
+        "DOWNWARD ↘️": "नीचे ↘️", "STRONG DOWNWARD 📉": "तेज़ी से नीचे 📉",
+        "SELL NOW - Best prices expected": "अभी बेचें - सबसे अच्छे भाव की उम्मीद",
+        "Good time to sell in coming weeks": "आने वाले हफ्तों में बेचना अच्छा रहेगा",
+        "Prices stable - Plan accordingly": "भाव स्थिर हैं - उसी हिसाब से योजना बनाएं",
+        "Monitor closely - Prices may drop": "नज़र रखें - भाव गिर सकते हैं",
+        "HOLD - Wait for market recovery": "अभी रोकें - बाज़ार सुधरने का इंतज़ार करें",
+    },
+    "pa": {
+        "STRONG UPWARD 📈": "ਤੇਜ਼ੀ ਨਾਲ ਉੱਪਰ 📈", "UPWARD ↗️": "ਉੱਪਰ ↗️", "STABLE ↔️": "ਸਥਿਰ ↔️",
+        "DOWNWARD ↘️": "ਹੇਠਾਂ ↘️", "STRONG DOWNWARD 📉": "ਤੇਜ਼ੀ ਨਾਲ ਹੇਠਾਂ 📉",
+        "SELL NOW - Best prices expected": "ਹੁਣੇ ਵੇਚੋ - ਸਭ ਤੋਂ ਵਧੀਆ ਭਾਅ ਦੀ ਉਮੀਦ",
+        "Good time to sell in coming weeks": "ਆਉਣ ਵਾਲੇ ਹਫ਼ਤਿਆਂ ਵਿੱਚ ਵੇਚਣਾ ਚੰਗਾ ਰਹੇਗਾ",
+        "Prices stable - Plan accordingly": "ਭਾਅ ਸਥਿਰ ਹਨ - ਉਸੇ ਹਿਸਾਬ ਨਾਲ ਯੋਜਨਾ ਬਣਾਓ",
+        "Monitor closely - Prices may drop": "ਨਜ਼ਰ ਰੱਖੋ - ਭਾਅ ਡਿੱਗ ਸਕਦੇ ਹਨ",
+        "HOLD - Wait for market recovery": "ਹੁਣ ਰੋਕੋ - ਮੰਡੀ ਸੁਧਰਨ ਦੀ ਉਡੀਕ ਕਰੋ",
+    },
+}
+
+STAGE_NAMES = {
+    "en": {"initial": "initial", "mid": "mid", "late": "late"},
+    "hinglish": {"initial": "shuruaati", "mid": "beech ki", "late": "aakhri"},
+    "hi": {"initial": "शुरुआती", "mid": "मध्य", "late": "अंतिम"},
+    "pa": {"initial": "ਸ਼ੁਰੂਆਤੀ", "mid": "ਵਿਚਕਾਰਲਾ", "late": "ਆਖਰੀ"},
+}
+
+SCRIPT_RE = {"hi": re.compile(r"[ऀ-ॿ]"), "pa": re.compile(r"[਀-੿]")}
+LATIN_RE = re.compile(r"^[a-z ]+$")
+
+
+def display_name(canonical: str, aliases: dict, lang: str) -> str:
+    """Name of a crop/state in the answer's language, else the English name."""
+    names = aliases.get(canonical, [])
+    if lang == "hinglish":
+        if len(names) > 1 and LATIN_RE.match(names[1]):
+            return names[1].title()
+    elif lang in SCRIPT_RE:
+        for name in names:
+            if SCRIPT_RE[lang].search(name):
+                return name
+    return canonical
+
+
+# -------------------------
+# Engines
+# -------------------------
+_price_predictor = None
+
+
+def get_price_predictor():
+    global _price_predictor
+    if _price_predictor is None:
+        from Market.predictor.price_predictor import PricePredictor
+        _price_predictor = PricePredictor()
+    return _price_predictor
+
+
+async def answer_price(slots: dict, user: dict, lang: str):
+    state = slots["state"] or (user_location(user).get("state") if user else None)
+    if not slots["crop"] or not state:
+        return None
+    predictor = get_price_predictor()
+    price = await asyncio.to_thread(predictor.get_latest_price, state, slots["crop"])
+    if price is None or price != price:  # missing or NaN
+        return None
+
+    trend = ""
+    try:
+        forecast = await asyncio.wait_for(
+            asyncio.to_thread(predictor.ml_price_prediction, state, slots["crop"]),
+            timeout=INTENT_ROUTER_ENGINE_TIMEOUT,
+        )
+        if "error" not in forecast:
+            weeks = [week["change_percent"] for week in forecast["weekly_forecast"].values()]
+            phrases = PRICE_PHRASES.get(lang, {})
+            trend = TEMPLATES["price_trend"][lang].format(
+                trend=phrases.get(forecast["trend"], forecast["trend"]),
+                change=sum(weeks) / len(weeks),
+                recommendation=phrases.get(forecast["recommendation"], forecast["recommendation"]),
+            )
+    except asyncio.TimeoutError:
+        pass  # the latest price alone still answers the question
+
+    return TEMPLATES["price"][lang].format(
+        crop=display_name(slots["crop"], CROP_ALIASES, lang),
+        state=display_name(state, STATE_ALIASES, lang),
+        price=float(price),
+        trend=trend,
+    ).strip()
+
+
+def user_location(user: dict) -> dict:
+    return with_region((user or {}).get("location"))
+
+
+async def answer_weather(slots: dict, user: dict, lang: str):
+    from weather.services import fetch_weather_by_coords
+    location = user_location(user)
+    if slots["state"]:
+        lat, lon = STATE_COORDS[slots["state"]]
+        place = display_name(slots["state"], STATE_ALIASES, lang)
+    elif location.get("lat") is not None and location.get("lon") is not None:
+        lat, lon = location["lat"], location["lon"]
+        place = location.get("district") or location.get("state") or f"{lat:.2f}, {lon:.2f}"
+    else:
+        return None
+
+    weather = await asyncio.wait_for(asyncio.to_thread(fetch_weather_by_coords, lat, lon),
+                                     timeout=INTENT_ROUTER_ENGINE_TIMEOUT)
+    if "error" in weather or weather.get("temperature_c") is None:
+        return None
+    answer = TEMPLATES["weather"][lang].format(
+        place=place, temp=weather["temperature_c"], condition=weather["condition"],
+        humidity=weather["humidity"], wind=weather["wind_speed_kmh"],
+    )
+    for day in weather.get("forecast", [])[:3]:
+        answer += TEMPLATES["weather_day"][lang].format(date=day["date"], tmin=day["temp_min_c"], tmax=day["temp_max_c"])
+    return answer
+
+
+async def answer_irrigation(slots: dict, user: dict, lang: str):
+    from Crop_management.water_calender.config import MM_TO_LITERS_PER_ACRE
+    from Crop_management.water_calender.crop_models import CropCalendar
+    if not slots["crop"]:
+        return None
+    soil = slots["soil"] or "loamy"
+    calendar = CropCalendar(slots["crop"], soil, area_acres=1.0)
+
+    if slots["days_sown"]:
+        day = min(max(slots["days_sown"], 1), calendar.total_days)
+    else:
+        # Representative day for the stage; mid-season when none is given
+        day = {"initial": 1, "late": int(calendar.total_days * 0.9)}.get(slots["stage"], calendar.total_days // 2)
+    need = calendar.get_water_need(day)
+    stage = STAGE_NAMES[lang][need["stage_key"]]
+    usual = calendar.crop_data["watering_interval_days"]
+    crop = display_name(slots["crop"], CROP_ALIASES, lang)
+
+    if slots["crop"] == "Paddy (Rice)":
+        return TEMPLATES["paddy_irrigation"][lang].format(stage=stage, usual=usual)
+
+    # The crop's usual interval, shortened if the soil would dry past the allowed depletion first
+    etc_mm = need["etc_mm"]
+    interval = max(1, min(usual, int(need["raw_mm"] // etc_mm))) if etc_mm > 0 else usual
+    depth_mm = etc_mm * interval / calendar.irrigation_efficiency
+    return TEMPLATES["irrigation"][lang].format(
+        crop=crop, stage=stage, soil=soil, etc=etc_mm, interval=interval,
+        depth=depth_mm, litres=depth_mm * MM_TO_LITERS_PER_ACRE,
+    )
+
+
+ENGINES = {"price": answer_price, "weather": answer_weather, "irrigation": answer_irrigation}
+
+
+# -------------------------
+# Routing
+# -------------------------
+def llm_baseline_seconds() -> float:
+    """Mean observed Gemini latency, or LLM_BASELINE_SECONDS before any call."""
+    count, total = UPSTREAM_REQUEST_SECONDS.summary(upstream="gemini")
+    return total / count if count else LLM_BASELINE_SECONDS
+
+
+def _record(intent: str, outcome: str):
+    INTENT_ROUTER_REQUESTS.inc(intent=intent, outcome=outcome)
+
+
+async def route(prompt: str, user: dict = None):
+    """{"intent", "slots", "answer"} when our own engines can answer the prompt, else None."""
+    if not INTENT_ROUTER_ENABLED or not prompt:
+        return None
+    started = time.perf_counter()
+    intent = classify(prompt)
+    if intent is None:
+        _record("none", "llm")
+        return None
+
+    slots = extract_slots(prompt)
+    lang = LANG_CODES.get(response_language(prompt), "en")
+    try:
+        answer = await ENGINES[intent](slots, user, lang)
+    except Exception as e:
+        print(f"❌ Intent router {intent} engine failed: {e}")
+        _record(intent, "engine_error")
+        return None
+    if not answer:
+        _record(intent, "missing_slot")
+        return None
+
+    elapsed = time.perf_counter() - started
+    _record(intent, "answered")
+    INTENT_ROUTER_SECONDS_SAVED.inc(max(0.0, llm_baseline_seconds() - elapsed))
+    print(f"✅ Intent router answered {intent} in {elapsed * 1000:.0f} ms: {slots['crop']}, {slots['state']}")
+    return {"intent": intent, "slots": slots, "answer": answer}
+
+
+def hit_ratio() -> float:
+    counts = INTENT_ROUTER_REQUESTS.values()
+    total = sum(counts.values())
+    answered = sum(value for (intent, outcome), value in counts.items() if outcome == "answered")
+    return answered / total if total else 0.0
+
+
+INTENT_ROUTER_HIT_RATIO.set_function(hit_ratio)
@@ -0,0 +1,292 @@
+"""In-process retrieval over the agronomy data we already ship.
+
+Documents are built once at import from:
+
+    MASTER_CROP_DATABASE     water / calendar and fertilizer schedule per crop (per acre)
+    FERTILIZER_COMPOSITION   nutrient content of urea, DAP and MOP
+    CropAdvisor.crop_db      NPK requirement (per hectare) and Kc per crop
+    disease_info.data        cause and cure per disease-model class,
+    plant_disease.json       merged with the above by class name
+
+and indexed with BM25. Crop names in the query are mapped to the canonical
+names through the intent router's alias table, and common Hinglish / Hindi /
+Punjabi farming words to their English equivalents, so "gehun mein khad"
+finds the wheat fertilizer schedule.
+
+`lookup(prompt)` returns a direct answer when one document clearly covers
+the whole question (English answers only, since the documents are English)
+and otherwise the top snippets to put in the Gemini prompt.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from chatbot.intent_router import CROP_LEXICON, normalize_text
+from chatbot.language import response_language
+from monitoring.metrics import KNOWLEDGE_BASE_LOOKUPS
+
+KNOWLEDGE_BASE_ENABLED = os.getenv("KNOWLEDGE_BASE_ENABLED", "1") == "1"
+KB_TOP_K = int(os.getenv("KB_TOP_K", "3"))
+KB_CONTEXT_MAX_CHARS = int(os.getenv("KB_CONTEXT_MAX_CHARS", "1200"))
+# Direct answer: share of query terms the best document must contain...
+KB_DIRECT_MIN_COVERAGE = float(os.getenv("KB_DIRECT_MIN_COVERAGE", "0.8"))
+# ...the runner-up must match fewer of them and score at least this much lower
+KB_DIRECT_MIN_MARGIN = float(os.getenv("KB_DIRECT_MIN_MARGIN", "1.1"))
+KB_DIRECT_MAX_TERMS = int(os.getenv("KB_DIRECT_MAX_TERMS", "8"))
+# Context needs the best document to contain at least this share of the query terms;
+# snippets scoring below KB_CONTEXT_MIN_RELATIVE_SCORE of it are not worth the prompt space
+KB_CONTEXT_MIN_COVERAGE = float(os.getenv("KB_CONTEXT_MIN_COVERAGE", "0.5"))
+KB_CONTEXT_MIN_RELATIVE_SCORE = 0.5
+
+# Questions that want reasoning rather than a stored fact always go to Gemini
+OPEN_QUESTION_WORDS = {"why", "explain", "compare", "difference", "better", "kyon", "kyun", "kyu", "क्यों", "ਕਿਉਂ"}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9.]+|[ऀ-ॿ]+|[਀-੿]+")
+
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "of", "for", "to", "in", "on", "at", "my", "me", "i",
+    "we", "our", "you", "your", "do", "does", "should", "can", "could", "would", "will", "please",
+    "tell", "about", "and", "or", "it", "this", "that", "there", "what", "which", "much", "many",
+    "give", "use", "with", "by", "from", "crop", "field", "per", "need", "best", "kg", "how", "why",
+    "when", "often", "get", "put", "apply", "dalna", "dalni", "daalna", "dale", "lagana", "karna", "karein",
+    "hai", "hain", "ka", "ki", "ke", "ko", "se", "mein", "me", "par", "pe", "aur", "kya", "kitna",
+    "kitni", "kaun", "konsa", "kab", "chahiye", "batao", "bataiye", "fasal", "nu", "da", "di", "de",
+    "है", "हैं", "का", "की", "के", "को", "से", "में", "पर", "और", "क्या", "कितना", "कौन", "फसल",
+    "ਹੈ", "ਦਾ", "ਦੀ", "ਦੇ", "ਨੂੰ", "ਵਿੱਚ", "ਕੀ", "ਫਸਲ",
+}
+
+# Farming vocabulary -> the English word used in the documents
+SYNONYMS = {
+    "fertiliser": "fertilizer", "khad": "fertilizer", "khaad": "fertilizer",
+    "खाद": "fertilizer", "उर्वरक": "fertilizer", "ਖਾਦ": "fertilizer",
+    "sinchai": "irrigation", "irrigate": "irrigation", "सिंचाई": "irrigation", "ਸਿੰਚਾਈ": "irrigation",
+    "paani": "water", "pani": "water", "पानी": "water", "ਪਾਣੀ": "water",
+    "rog": "disease", "bimari": "disease", "रोग": "disease", "बीमारी": "disease", "ਰੋਗ": "disease", "ਬਿਮਾਰੀ": "disease",
+    "ilaj": "cure", "ilaaj": "cure", "dawai": "cure", "dawa": "cure", "treatment": "cure", "treat": "cure",
+    "control": "cure", "इलाज": "cure", "दवाई": "cure", "दवा": "cure", "ਇਲਾਜ": "cure", "ਦਵਾਈ": "cure",
+    "karan": "cause", "wajah": "cause", "कारण": "cause", "ਕਾਰਨ": "cause",
+    "dhoop": "sunlight", "dhup": "sunlight", "धूप": "sunlight", "ਧੁੱਪ": "sunlight",
+    "nitrogen": "n", "phosphorus": "p", "potassium": "k", "potash": "k",
+    "jhulsa": "blight", "झुलसा": "blight", "ਝੁਲਸ": "blight",
+}
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens without stop words, plural 's' stripped, synonyms mapped."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.strip(".")
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        token = SYNONYMS.get(token, token)
+        if token and token not in STOP_WORDS:
+            tokens.append(token)
+    return tokens
+
+
+def query_terms(prompt: str) -> list:
+    """Distinct query tokens, with crop aliases (gehun, धान, ਕਣਕ ...) replaced by the canonical crop name."""
+    text = normalize_text(prompt)
+    for alias, canonical in CROP_LEXICON:
+        if alias in text:
+            text = text.replace(alias, f" {canonical} ")
+    return list(dict.fromkeys(tokenize(text)))
+
+
+class Document:
+    def __init__(self, title: str, text: str, source: str):
+        self.title = title
+        self.text = text
+        self.source = source
+
+    @property
+    def snippet(self) -> str:
+        return f"{self.title}: {self.text}"
+
+
+class KnowledgeBase:
+    """BM25 (Okapi) over an inverted index of short documents."""
+
+    def __init__(self, documents: list):
+        self.documents = documents
+        self.postings = defaultdict(list)  # term -> [(doc index, term frequency)]
+        self.lengths = []
+        for index, document in enumerate(documents):
+            counts = Counter(tokenize(f"{document.title} {document.title} {document.text}"))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((index, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, terms: list, k: int = KB_TOP_K) -> list:
+        """[(score, document, matched terms)] for the k best documents, best first."""
+        scores = defaultdict(float)
+        matched = defaultdict(set)
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, tf in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[index] / self.avg_length)
+                scores[index] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matched[index].add(term)
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [(scores[i], self.documents[i], matched[i]) for i in best]
+
+
+# -------------------------
+# Documents
+# -------------------------
+def _crop_documents() -> list:
+    from Crop_management.water_calender.config import MASTER_CROP_DATABASE
+    documents = []
+    for crop, info in MASTER_CROP_DATABASE.items():
+        kc = info["kc"]
+        documents.append(Document(
+            f"{crop} water and crop calendar",
+            f"irrigate about every {info['watering_interval_days']} days; crop duration about "
+            f"{info['total_days']} days; needs {info['sunlight_hours']} of sunlight; crop coefficient (Kc) "
+            f"{kc['initial']} initial, {kc['mid']} mid season, {kc['late']} late season.",
+            "crop_calendar",
+        ))
+        doses = "; ".join(
+            f"day {day}: N {dose['n']} kg, P {dose['p']} kg, K {dose['k']} kg ({dose['note']})"
+            for day, dose in sorted(info["npk_schedule_per_acre"].items())
+        )
+        total = info["npk_total"]
+        documents.append(Document(
+            f"{crop} fertilizer schedule per acre",
+            f"{doses}. Total per acre: N {total['n']} kg, P {total['p']} kg, K {total['k']} kg.",
+            "crop_calendar",
+        ))
+    return documents
+
+
+def _fertilizer_documents() -> list:
+    from Crop_management.water_calender.config import FERTILIZER_COMPOSITION
+    names = {"n": "nitrogen (N)", "p": "phosphorus (P)", "k": "potassium (K)"}
+    documents = []
+    for fertilizer, content in FERTILIZER_COMPOSITION.items():
+        parts = [f"{share * 100:g}% {names[nutrient]}" for nutrient, share in content.items() if share]
+        main = max(content, key=content.get)
+        documents.append(Document(
+            f"{fertilizer.upper()} fertilizer nutrient content",
+            f"{' and '.join(parts)}; {1 / content[main]:.2f} kg of {fertilizer.upper()} supplies 1 kg of {main.upper()}.",
+            "fertilizer",
+        ))
+    return documents
+
+
+def _nutrient_documents() -> list:
+    from micro_calculator.crop_advisor import CropAdvisor
+    documents = []
+    for crop, info in CropAdvisor().crop_db.items():
+        kc = info["kc"]
+        documents.append(Document(
+            f"{crop.title()} nutrient requirement per hectare",
+            f"N {info['n']} kg, P {info['p']} kg, K {info['k']} kg per hectare; crop coefficient (Kc) "
+            f"{kc['initial']} initial, {kc['mid']} mid season, {kc['late']} late season.",
+            "crop_advisor",
+        ))
+    return documents
+
+
+def _class_key(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def _disease_documents() -> list:
+    from image_analysis.disease_info import data
+    notes = {_class_key(name): dict(name=name, **info) for name, info in data.items()}
+    try:
+        with open("plant_disease.json", "r", encoding="utf-8") as file:
+            for entry in json.load(file):
+                note = notes.setdefault(_class_key(entry["name"]), {"name": entry["name"], "cause": "", "cure": ""})
+                for field in ("cause", "cure"):
+                    if entry.get(field) and entry[field] not in note[field]:
+                        note[field] = f"{note[field]} {entry[field]}".strip()
+    except Exception as e:
+        print(f"❌ Knowledge base could not read plant_disease.json: {e}")
+
+    documents = []
+    for key, note in notes.items():
+        if key.startswith("background"):
+            continue
+        crop, _, disease = key.partition(" ")
+        disease = disease.removeprefix(f"{crop} ")
+        title = f"{crop.title()} {disease} disease" if disease != "healthy" else f"Healthy {crop} plant"
+        documents.append(Document(title, f"Cause: {note['cause']} Cure: {note['cure']}", "disease"))
+    return documents
+
+
+def build_knowledge_base() -> KnowledgeBase:
+    documents = []
+    for source in (_crop_documents, _fertilizer_documents, _nutrient_documents, _disease_documents):
+        try:
+            documents.extend(source())
+        except Exception as e:
+            print(f"❌ Knowledge base source {source.__name__} failed: {e}")
+    print(f"✅ Knowledge base indexed {len(documents)} documents")
+    return KnowledgeBase(documents)
+
+
+knowledge_base = build_knowledge_base() if KNOWLEDGE_BASE_ENABLED else None
+
+
+# -------------------------
+# Lookup
+# -------------------------
+def _direct_answer(prompt: str, terms: list, results: list):
+    """The best document's text when it alone covers the question."""
+    if response_language(prompt) != "English" or not 2 <= len(terms) <= KB_DIRECT_MAX_TERMS:
+        return None
+    if OPEN_QUESTION_WORDS & set(TOKEN_RE.findall(prompt.lower())):
+        return None
+    score, document, matched = results[0]
+    if len(matched) / len(terms) < KB_DIRECT_MIN_COVERAGE:
+        return None
+    if len(results) > 1:
+        runner_up_score, _, runner_up_matched = results[1]
+        if len(runner_up_matched) >= len(matched) or score < runner_up_score * KB_DIRECT_MIN_MARGIN:
+            return None
+    return document.snippet
+
+
+def _context(results: list) -> list:
+    """Snippets for the Gemini prompt, best first, within KB_CONTEXT_MAX_CHARS."""
+    snippets, size = [], 0
+    for score, document, _ in results:
+        if score < results[0][0] * KB_CONTEXT_MIN_RELATIVE_SCORE:
+            break
+        snippet = document.snippet
+        if snippets and size + len(snippet) > KB_CONTEXT_MAX_CHARS:
+            break
+        snippets.append(snippet[:KB_CONTEXT_MAX_CHARS])
+        size += len(snippet)
+    return snippets
+
+
+def lookup(prompt: str) -> dict:
+    """{"answer": str or None, "context": [snippets]}; both empty when nothing relevant is indexed."""
+    if knowledge_base is None or not prompt:
+        return {"answer": None, "context": []}
+    terms = query_terms(prompt)
+    results = knowledge_base.search(terms)
+    if not results or len(results[0][2]) / len(terms) < KB_CONTEXT_MIN_COVERAGE:
+        KNOWLEDGE_BASE_LOOKUPS.inc(outcome="none")
+        return {"answer": None, "context": []}
+    answer = _direct_answer(prompt, terms, results)
+    if answer:
+        KNOWLEDGE_BASE_LOOKUPS.inc(outcome="direct")
+        return {"answer": answer, "context": []}
+    KNOWLEDGE_BASE_LOOKUPS.inc(outcome="grounded")
+    return {"answer": None, "context": _context(results)}
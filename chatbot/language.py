@@ -0,0 +1,94 @@
+"""Fast language detection for chat prompts (Hindi, Punjabi, English, Hinglish).
+
+A single regex pass splits the text into Devanagari, Gurmukhi and Latin runs.
+Indic script decides directly; Latin text is scored against small Hinglish
+and English word lists. langdetect is only consulted for Latin text that
+neither list explains (and is imported lazily, so most requests never load
+its profiles).
+"""
+import re
+
+DETECT_RE = re.compile(
+    r"(?P<deva>[ऀ-ॿ]+)|(?P<guru>[਀-੿]+)|(?P<latin>[A-Za-z]+)"
+)
+
+# Romanized Hindi/Punjabi function words and farming vocabulary seen in chats
+HINGLISH_WORDS = frozenset("""
+hai hain ho tha thi the hota hoti hote kya kyu kyun kyon kaise kaisa kaisi kab kahan kaha kitna kitni kitne
+kaun kon konsa kuch koi mein mai me mujhe muje hum ham hame hamara mera meri mere tum tera tumhara aap apna
+apni apne ka ki ke ko se par pe aur ya bhi nahi nahin na mat haan ji bhai yaar yar dost bol bolo batao bataye
+bataiye btao batayein chahiye chahie chaiye karna karo kare karen karein kar karke lagana lagaye lagao dalna
+dalo daalna daale dena do dijiye lena lo milega milta milti sakta sakte sakti raha rahi rahe gaya gayi gaye
+wala wali wale abhi jab tab agar lekin phir fir bahut bohot jyada zyada kam accha acha achha theek thik
+khet kheti kisan fasal fasl beej bij paani pani sinchai khad khaad dawai dawa keeda keede kida rog bimari
+gehu gehun gehoon dhaan dhan makka bajra chana sarson ganna kapas aloo pyaaz pyaj tamatar mitti zameen
+barish baarish mausam garmi sardi din mahina hafta ekad acre bigha kilo quintal daam bhav mandi
+nu da di de ne vich kiven kidda kinna kado ki hega haiga tussi asi sanu tuhanu
+""".split())
+
+ENGLISH_WORDS = frozenset("""
+the a an is are was were be been am do does did what when where which who why how much many should can could
+would will shall to of in on at for from with by about and or not no yes my your our their this that these
+those it its i we you they he she please tell me give best time crop crops soil water irrigation irrigate
+fertilizer fertiliser dose seed seeds sowing harvest yield pest pests disease diseases leaf leaves plant
+plants rain weather price prices market farm farming field acre wheat rice paddy maize cotton sugarcane
+tomato potato onion mustard use used using need control treatment spray apply after before per kg day days
+""".split())
+
+# Words valid in both (e.g. "do", "the") say nothing about the language
+HINGLISH_WORDS = HINGLISH_WORDS - ENGLISH_WORDS
+
+# Latin text is Hinglish when at least this share of its words are Hinglish
+HINGLISH_MIN_SHARE = 0.3
+# ...and is trusted as English without langdetect when this share of words are English
+ENGLISH_MIN_SHARE = 0.4
+
+RESPONSE_LANGUAGES = {
+    "en": "English",
+    "hi": "Hindi",
+    "pa": "Punjabi",
+    "hinglish": "Hinglish",
+}
+
+
+def _langdetect(text: str) -> str:
+    from langdetect import detect, DetectorFactory
+    DetectorFactory.seed = 0  # Ensure consistent language detection
+    try:
+        return detect(text)
+    except Exception:
+        return "en"  # Fallback to English if detection fails
+
+
+def detect_language(text: str) -> str:
+    """Return 'hi', 'pa', 'en', 'hinglish' or, for unexplained Latin text, langdetect's code."""
+    deva = guru = 0
+    latin_words = hinglish = english = 0
+    for match in DETECT_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "latin":
+            word = match.group().lower()
+            latin_words += 1
+            if word in HINGLISH_WORDS:
+                hinglish += 1
+            elif word in ENGLISH_WORDS:
+                english += 1
+        elif kind == "deva":
+            deva += len(match.group())
+        else:
+            guru += len(match.group())
+
+    if deva or guru:
+        return "pa" if guru > deva else "hi"
+    if not latin_words:
+        return "en"
+    if "hinglish" in text.lower() or hinglish / latin_words >= HINGLISH_MIN_SHARE:
+        return "hinglish"
+    if english / latin_words >= ENGLISH_MIN_SHARE:
+        return "en"
+    return _langdetect(text)
+
+
+def response_language(text: str) -> str:
+    """Human-readable language Gemini should answer in."""
+    return RESPONSE_LANGUAGES.get(detect_language(text), "English")
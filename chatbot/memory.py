@@ -0,0 +1,70 @@
+"""Session-scoped conversation memory backed by chat_history.
+
+Each turn is stored with the user's phone (None for anonymous callers) and a
+session id. Before calling Gemini only the most recent turns of the session
+that fit in CHAT_CONTEXT_TOKEN_BUDGET are loaded, via the
+(phone, session_id, timestamp) index, so payloads stay small however long the
+session gets.
+"""
+import os
+import uuid
+from auth.database import db
+from storage.write_behind import write_behind
+
+CHAT_CONTEXT_MAX_TURNS = int(os.getenv("CHAT_CONTEXT_MAX_TURNS", "8"))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1200"))
+
+TURN_PROJECTION = {"_id": 0, "prompt": 1, "transcript": 1, "response": 1, "timestamp": 1}
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-bound token estimate (~4 UTF-8 bytes per token; Indic scripts count heavier)."""
+    return len((text or "").encode("utf-8")) // 4 + 1
+
+
+def session_filter(phone, session_id: str) -> dict:
+    return {"phone": phone, "session_id": session_id}
+
+
+async def load_recent_turns(phone, session_id: str, budget: int = CHAT_CONTEXT_TOKEN_BUDGET) -> list:
+    """Newest-first scan of the session, trimmed to the token budget, returned oldest-first."""
+    if not session_id:
+        return []
+    cursor = (
+        db["chat_history"]
+        .find(session_filter(phone, session_id), TURN_PROJECTION)
+        .sort("timestamp", -1)
+        .limit(CHAT_CONTEXT_MAX_TURNS)
+    )
+    # Turns still waiting in the write-behind buffer are newer than anything stored
+    docs = write_behind.pending("chat_history", session_filter(phone, session_id))
+    docs.reverse()
+    docs += await cursor.to_list(length=CHAT_CONTEXT_MAX_TURNS)
+
+    turns = []
+    used = 0
+    for doc in docs[:CHAT_CONTEXT_MAX_TURNS]:
+        question = doc.get("prompt") or doc.get("transcript")
+        answer = doc.get("response")
+        if not question or not answer:
+            continue
+        cost = estimate_tokens(question) + estimate_tokens(answer)
+        if used + cost > budget:
+            break
+        used += cost
+        turns.append({"prompt": question, "response": answer})
+    turns.reverse()
+    return turns
+
+
+def build_history_contents(turns: list) -> list:
+    """Gemini `contents` entries (alternating user/model) for earlier turns."""
+    contents = []
+    for turn in turns:
+        contents.append({"role": "user", "parts": [{"text": turn["prompt"]}]})
+        contents.append({"role": "model", "parts": [{"text": turn["response"]}]})
+    return contents
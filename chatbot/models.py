@@ -4,6 +4,7 @@ from fastapi import UploadFile
 
 class ChatRequest(BaseModel):
     prompt: str
+    session_id: Optional[str] = None  # omit to start a new session
 
 
 class DashboardResponse(BaseModel):
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi.responses import StreamingResponse, RedirectResponse
 import traceback
+import asyncio
+import json
+import time
 from chatbot.models import ChatRequest
 from auth.database import db  
 import datetime
-import shutil
-import uuid
 import os
-from chatbot.app import get_gemini_response, transcribe_audio
-from image_analysis.voice_helper import generate_voice  
+from typing import Optional
+from auth.routes import get_optional_user
+from chatbot.memory import (
+    new_session_id, load_recent_turns, build_history_contents, session_filter, TURN_PROJECTION
+)
+from chatbot.app import get_gemini_response_async, stream_gemini_response, transcribe_audio_async
+from storage.write_behind import write_behind
+from chatbot.voice_stream import new_reply_id, start_voice_reply, get_reply
+from chatbot.intent_router import route as route_intent
+from chatbot.knowledge_base import lookup as kb_lookup
+from monitoring.metrics import stage_timer, CHAT_TTFT_SECONDS
 
 # -------------------------
 # Setup
@@ -24,61 +35,166 @@ os.makedirs(UPLOAD_VOICE_DIR, exist_ok=True)
 # -------------------------
 # Helpers
 # -------------------------
-def get_general_ai_response(prompt: str) -> str:
+async def get_general_ai_response(prompt: str, history: list = None, context: list = None) -> str:
     """Call Gemini API and return AI response text."""
-    return get_gemini_response(prompt)
+    return await get_gemini_response_async(prompt, history, context)
 
 
-async def save_chat_to_db(chat_data: dict):
-    """Save chat history into MongoDB."""
-    try:
-        await db["chat_history"].insert_one(chat_data)
-        print("✅ Chat saved to DB")
-    except Exception as e:
-        print(f"❌ DB save error: {e}")
+async def local_answer(prompt: str, user: dict) -> tuple:
+    """(answer, answered_by, context) from our own engines and knowledge base.
+
+    answer is None when Gemini has to answer; context then holds the
+    knowledge-base snippets to ground it with.
+    """
+    routed = await route_intent(prompt, user)
+    if routed:
+        return routed["answer"], routed["intent"], []
+    found = kb_lookup(prompt)
+    if found["answer"]:
+        return found["answer"], "knowledge_base", []
+    return None, None, found["context"]
+
+
+async def answer_prompt(prompt: str, user: dict, history: list = None) -> tuple:
+    """(response, answered_by): see local_answer; Gemini answers whatever it cannot."""
+    answer, answered_by, context = await local_answer(prompt, user)
+    if answer:
+        return answer, answered_by
+    return await get_general_ai_response(prompt, history, context), None
+
+
+def user_phone(user):
+    return user.get("phone") if user else None
+
+
+async def session_history(phone, session_id):
+    """Gemini contents for the recent, token-budgeted part of this session."""
+    return build_history_contents(await load_recent_turns(phone, session_id))
+
+
+def save_chat_to_db(chat_data: dict):
+    """Queue a chat turn for chat_history (written in batches, off the response path)."""
+    write_behind.enqueue("chat_history", chat_data)
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    """Format one Server-Sent Events message."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 # -------------------------
 # Routes
 # -------------------------
 @router.post("/general")
-async def general_chat(request: ChatRequest):
+async def general_chat(request: ChatRequest, user: dict = Depends(get_optional_user)):
     
     try:
-        response = get_general_ai_response(request.prompt)
+        phone = user_phone(user)
+        session_id = request.session_id or new_session_id()
+        history = await session_history(phone, request.session_id)
+        response, answered_by = await answer_prompt(request.prompt, user, history)
 
         # Save chat history
-        await db["chat_history"].insert_one({
+        save_chat_to_db({
             "type": "general",
+            "phone": phone,
+            "session_id": session_id,
             "prompt": request.prompt,
             "response": response,
+            "answered_by": answered_by,
             "timestamp": datetime.datetime.now()
         })
 
-        return {"response": response}
+        return {"response": response, "session_id": session_id}
     except Exception:
         print(f"Error in /chat/general: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/general/stream")
+async def general_chat_stream(request: ChatRequest, user: dict = Depends(get_optional_user)):
+    """Same as /general, but tokens are sent as Server-Sent Events as Gemini produces them.
+
+    Events: `data: {"text": ...}` per chunk, then `event: done` with the session id and timings,
+    or `event: error` if the stream fails. The full answer is saved to
+    chat_history once the stream completes.
+    """
+    started = time.perf_counter()
+    phone = user_phone(user)
+    session_id = request.session_id or new_session_id()
+    history = await session_history(phone, request.session_id)
+
+    answer, answered_by, context = await local_answer(request.prompt, user)
+
+    async def answer_chunks():
+        if answer:
+            # Answered by our own engines or the knowledge base: one chunk, no Gemini call
+            yield answer
+            return
+        async for chunk in stream_gemini_response(request.prompt, history, context):
+            yield chunk
+
+    async def events():
+        chunks = []
+        ttft = None
+        try:
+            async for chunk in answer_chunks():
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    CHAT_TTFT_SECONDS.observe(ttft, endpoint="general_stream")
+                chunks.append(chunk)
+                yield sse_event({"text": chunk})
+        except Exception as e:
+            print(f"Error in /chat/general/stream: {e}")
+            yield sse_event({"message": "Sorry, the AI service is not responding right now. Please try again."}, event="error")
+            return
+
+        total = time.perf_counter() - started
+        response = "".join(chunks)
+        save_chat_to_db({
+            "type": "general",
+            "phone": phone,
+            "session_id": session_id,
+            "prompt": request.prompt,
+            "response": response,
+            "answered_by": answered_by,
+            "streamed": True,
+            "ttft_ms": round(ttft * 1000) if ttft is not None else None,
+            "timestamp": datetime.datetime.now()
+        })
+        yield sse_event({
+            "session_id": session_id,
+            "ttft_ms": round(ttft * 1000) if ttft is not None else None,
+            "total_ms": round(total * 1000),
+        }, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/voice_chat")
-async def voice_chat(audio: UploadFile = File(..., description="Audio file (WAV/MP3, <60s)")):
-    """Voice chat: speech → text → AI response → speech."""
+async def voice_chat(
+    audio: UploadFile = File(..., description="Audio file (WAV of any length, or MP3 <60s)"),
+    session_id: Optional[str] = Form(None, description="Continue an existing chat session"),
+    user: dict = Depends(get_optional_user)
+):
+    """Voice chat: speech → text → AI response → speech.
+
+    Returns once the text reply is ready; voice_url streams the MP3 reply
+    while it is being synthesized.
+    """
     try:
         if audio.content_type not in ["audio/wav", "audio/mpeg", "audio/mp3"]:
             raise HTTPException(status_code=400, detail="Only WAV/MP3 audio supported")
 
-        # Save uploaded audio temporarily
-        filename = f"temp_audio_{uuid.uuid4().hex}.{audio.filename.split('.')[-1]}"
-        audio_path = os.path.join(UPLOAD_AUDIO_DIR, filename)
-
-        with open(audio_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
-
-        # Transcribe audio
-        with open(audio_path, "rb") as f:
-            audio_content = f.read()
-        transcript, detected_lang = transcribe_audio(audio_content)
+        # Upload buffer goes straight to Speech-to-Text, no temp file
+        audio_content = await audio.read()
+        with stage_timer("voice_chat", "stt"):
+            transcript, detected_lang = await transcribe_audio_async(audio_content, audio.content_type)
 
         if not transcript or "failed" in transcript.lower():
             raise HTTPException(status_code=400, detail="Audio transcription failed. Please try clearer speech.")
@@ -86,43 +202,95 @@ async def voice_chat(audio: UploadFile = File(..., description="Audio file (WAV/
         print(f"🔍 Transcribed: '{transcript}' (Detected lang: {detected_lang})")
 
         # AI response
-        response = get_general_ai_response(transcript)
-
-        # Generate voice reply
-        voice_filename = generate_voice(
-            response,
-            lang=detected_lang.split('-')[0],
-            use_ssml=True,
-            custom_rate=0.95
-        )
+        phone = user_phone(user)
+        history = await session_history(phone, session_id)
+        session_id = session_id or new_session_id()
 
-        # Move generated file into static folder
-        voice_file_path = os.path.join(UPLOAD_VOICE_DIR, voice_filename)
-        if os.path.exists(voice_filename):
-            shutil.move(voice_filename, voice_file_path)
+        with stage_timer("voice_chat", "gemini"):
+            response, answered_by = await answer_prompt(transcript, user, history)
 
-        # Save chat history
+        # Save chat history; voice_file is filled in when synthesis completes
+        reply_id = new_reply_id()
         chat_data = {
             "type": "voice_chat",
+            "phone": phone,
+            "session_id": session_id,
             "transcript": transcript,
             "detected_lang": detected_lang,
             "response": response,
-            "voice_file": voice_filename,
+            "answered_by": answered_by,
+            "voice_reply_id": reply_id,
+            "voice_file": None,
             "timestamp": datetime.datetime.now()
         }
-        await save_chat_to_db(chat_data)
+        save_chat_to_db(chat_data)
 
-        # Clean up temp audio
-        os.remove(audio_path)
+        # Voice reply is synthesized in the background and streamed from voice_url
+        start_voice_reply(
+            reply_id,
+            response,
+            lang=detected_lang.split('-')[0].lower(),
+            use_ssml=True,
+            custom_rate=0.95
+        )
 
         return {
+            "session_id": session_id,
             "transcript": transcript,
             "detected_language": detected_lang,
             "response_text": response,
-            "voice_url": f"/uploadvoices/{voice_filename}" if voice_filename else None,
+            "voice_url": f"/chat/voice_chat/reply/{reply_id}",
             "timestamp": str(datetime.datetime.now())
         }
 
+    except HTTPException:
+        raise
     except Exception:
         print(f"Error in /voice_chat: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/voice_chat/reply/{reply_id}")
+async def voice_chat_reply(reply_id: str):
+    """MP3 voice reply, streamed sentence by sentence while it is synthesized."""
+    reply = get_reply(reply_id)
+    if reply is None:
+        # Finished (or served by another worker): fall back to the stored file
+        chat = await db["chat_history"].find_one({"voice_reply_id": reply_id}, {"voice_file": 1})
+        if chat and chat.get("voice_file"):
+            return RedirectResponse(f"/uploadvoices/{chat['voice_file']}")
+        raise HTTPException(status_code=404, detail="Voice reply not found")
+    if reply.filename:
+        return RedirectResponse(f"/uploadvoices/{reply.filename}")
+    return StreamingResponse(reply.iter_audio(), media_type="audio/mpeg", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/sessions/{session_id}")
+async def get_chat_session(session_id: str, limit: int = 50, user: dict = Depends(get_optional_user)):
+    """Turns of one chat session, oldest first (the caller's own sessions only)."""
+    try:
+        limit = max(1, min(limit, 200))
+        cursor = (
+            db["chat_history"]
+            .find(session_filter(user_phone(user), session_id), {**TURN_PROJECTION, "type": 1, "voice_file": 1})
+            .sort("timestamp", -1)
+            .limit(limit)
+        )
+        turns = await cursor.to_list(length=limit)
+        # Newest turns may still be in the write-behind buffer
+        pending = [
+            {field: doc.get(field) for field in ("type", "prompt", "transcript", "response", "voice_file", "timestamp")}
+            for doc in write_behind.pending("chat_history", session_filter(user_phone(user), session_id))
+        ]
+        turns = (pending[::-1] + turns)[:limit]
+        if not turns:
+            raise HTTPException(status_code=404, detail="Session not found")
+        turns.reverse()
+        for turn in turns:
+            turn["timestamp"] = str(turn["timestamp"])
+        return {"session_id": session_id, "turns": turns}
+    except HTTPException:
+        raise
+    except Exception:
+        print(f"Error in /chat/sessions: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,94 @@
+"""Voice replies that can be played while they are still being synthesized.
+
+/chat/voice_chat answers as soon as Gemini has replied and hands back a
+voice_url pointing at GET /chat/voice_chat/reply/{reply_id}. A background task
+synthesizes all sentences of the reply concurrently; the GET streams each MP3
+segment, in order, the moment it exists (MP3 frames concatenate cleanly). When
+the reply is complete it is stored in uploadvoices/ and the chat_history turn
+is updated, so late requests are redirected to the static file.
+
+The registry is in-process: the reply URL must be served by the worker that
+created it (true for the single-worker deployment).
+"""
+import asyncio
+import uuid
+from cachetools import TTLCache
+from storage.write_behind import write_behind
+from image_analysis.voice_helper import iter_reply_audio
+from storage.blobs import UPLOAD_VOICE_DIR, store_blob
+
+REPLY_TTL_SECONDS = 300
+
+
+class VoiceReply:
+    def __init__(self):
+        self.segments = []
+        self.done = False
+        self.filename = None
+        self._changed = asyncio.Condition()
+
+    async def append(self, segment: bytes):
+        async with self._changed:
+            self.segments.append(segment)
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def iter_audio(self):
+        """Yield segments as they are produced until the reply is complete."""
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.done or len(self.segments) > sent)
+                pending = self.segments[sent:]
+                done = self.done
+            for segment in pending:
+                yield segment
+            sent += len(pending)
+            if done and sent == len(self.segments):
+                return
+
+
+_replies = TTLCache(maxsize=1024, ttl=REPLY_TTL_SECONDS)
+_tasks = set()
+
+
+def get_reply(reply_id: str):
+    return _replies.get(reply_id)
+
+
+async def _synthesize(reply_id: str, reply: VoiceReply, text: str, lang: str, options: dict):
+    try:
+        async for segment in iter_reply_audio(text, lang, **options):
+            await reply.append(segment)
+        if reply.segments:
+            audio = b"".join(reply.segments)
+            reply.filename = await asyncio.to_thread(store_blob, UPLOAD_VOICE_DIR, audio, ".mp3")
+            await write_behind.update_one(
+                "chat_history", {"voice_reply_id": reply_id}, {"voice_file": reply.filename}
+            )
+            print(f"✅ Voice reply stored: {UPLOAD_VOICE_DIR}/{reply.filename}")
+    except Exception as e:
+        print(f"❌ Voice reply failed: {e}")
+    finally:
+        await reply.finish()
+
+
+def new_reply_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_voice_reply(reply_id: str, text: str, lang: str, **options):
+    """Begin synthesizing `text` in the background under `reply_id`.
+
+    Queue the chat_history turn (with voice_reply_id) first so the stored
+    file name can be attached to it once synthesis completes.
+    """
+    reply = VoiceReply()
+    _replies[reply_id] = reply
+    task = asyncio.create_task(_synthesize(reply_id, reply, text, lang, options))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
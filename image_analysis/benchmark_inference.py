@@ -0,0 +1,74 @@
+"""Micro-benchmark: model.predict() vs the compiled inference function on CPU.
+
+Run from the repository root:
+
+    python -m image_analysis.benchmark_inference --runs 50
+    python -m image_analysis.benchmark_inference --xla --batch 16
+
+Uses the deployed .keras model when it is present; otherwise an untrained
+EfficientNetB0 with the same input shape and class count stands in, which
+is enough to compare per-call overhead.
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")  # CPU numbers only
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import tensorflow as tf
+
+from image_analysis import prediction
+
+
+def load_benchmark_model():
+    if prediction.model is not None:
+        return prediction.model, "deployed model"
+    stand_in = tf.keras.applications.EfficientNetB0(
+        weights=None, input_shape=(*prediction.IMG_SIZE, 3), classes=len(prediction.label)
+    )
+    return stand_in, "untrained EfficientNetB0 stand-in"
+
+
+def time_calls(fn, batch, runs: int, warmup: int = 3) -> np.ndarray:
+    for _ in range(warmup):
+        fn(batch)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(batch)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1000
+
+
+def report(name: str, timings_ms: np.ndarray, batch_size: int):
+    per_image = timings_ms / batch_size
+    print(f"{name:<28} p50 {np.percentile(per_image, 50):8.2f} ms/img   "
+          f"p95 {np.percentile(per_image, 95):8.2f} ms/img   "
+          f"mean {per_image.mean():8.2f} ms/img")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=1, help="images per call")
+    parser.add_argument("--xla", action="store_true", help="also time the XLA-compiled variant")
+    args = parser.parse_args()
+
+    keras_model, source = load_benchmark_model()
+    batch = np.random.default_rng(0).uniform(0, 255, (args.batch, *prediction.IMG_SIZE, 3)).astype(np.float32)
+    print(f"{source}, batch={args.batch}, runs={args.runs}, TF {tf.__version__}")
+
+    report("model.predict (before)", time_calls(lambda b: keras_model.predict(b, verbose=0), batch, args.runs), args.batch)
+
+    compiled = prediction.build_inference_fn(keras_model, jit_compile=False)
+    report("tf.function (after)", time_calls(lambda b: compiled(b).numpy(), batch, args.runs), args.batch)
+
+    if args.xla:
+        compiled_xla = prediction.build_inference_fn(keras_model, jit_compile=True)
+        report("tf.function + XLA (after)", time_calls(lambda b: compiled_xla(b).numpy(), batch, args.runs), args.batch)
+
+
+if __name__ == "__main__":
+    main()
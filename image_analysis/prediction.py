@@ -1,10 +1,18 @@
 import numpy as np
 import json
+import os
 import tensorflow as tf
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
+from monitoring.metrics import MODEL_BATCH_SIZE
+from image_analysis.disease_info import data
 
 # Global setup (loads on import)
 IMG_SIZE = (224, 224)
+BATCH_SIZE = int(os.getenv("MODEL_BATCH_SIZE", "16"))
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "4"))
+MODEL_XLA = os.getenv("MODEL_XLA", "0") == "1"
 
 label = [
     'Apple__Apple_scab', 'Apple_Black_rot', 'Apple_Cedar_apple_rust', 'Apple__healthy',
@@ -21,165 +29,6 @@ label = [
     'Tomato__Tomato_Yellow_Leaf_Curl_Virus', 'Tomato_Tomato_mosaic_virus', 'Tomato__healthy'
 ]
 
-data = {
-    'Apple__Apple_scab': {
-        'cause': 'Caused by the fungus Venturia inaequalis, which overwinters in infected leaves and spreads via spores in wet spring conditions.',
-        'cure': 'Apply fungicides (e.g., captan) during bud break; rake and destroy fallen leaves; choose resistant varieties like Liberty.'
-    },
-    'Apple_Black_rot': {
-        'cause': 'Caused by the fungus Diplodia seriata (syn. Botryosphaeria obtusa), entering through wounds and thriving in warm, humid conditions.',
-        'cure': 'Sanitation: Remove infected fruit and cankers; apply copper-based fungicides early season; prune for air circulation.'
-    },
-    'Apple_Cedar_apple_rust': {
-        'cause': 'Caused by the fungus Gymnosporangium juniperi-virginianae, requiring alternating hosts (apple and cedar/juniper) for its life cycle.',
-        'cure': 'Remove nearby cedars/juniper galls; apply myclobutanil fungicide at bud break; plant resistant apples like Enterprise.'
-    },
-    'Apple__healthy': {
-        'cause': 'No disease detected; healthy leaves indicate proper care and resistance.',
-        'cure': 'Maintain with balanced fertilizer, regular watering, and pruning; monitor for early signs of issues.'
-    },
-    'Background_without_leaves': {
-        'cause': 'Not a disease; this class represents images without plant leaves (e.g., empty backgrounds in dataset).',
-        'cure': 'Upload a clear image of plant leaves for analysis; ensure good lighting and focus on foliage.'
-    },
-    'Blueberry__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Continue good practices: acidic soil (pH 4.5-5.5), mulch, and net against birds.'
-    },
-    'Cherry_Powdery_mildew': {
-        'cause': 'Caused by the fungus Podosphaera clandestina, favoring cool, dry conditions on young leaves.',
-        'cure': 'Apply sulfur-based fungicides; improve air flow by pruning; water at base to keep foliage dry.'
-    },
-    'Cherry__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Prune annually for shape; fertilize in spring; ensure full sun and well-drained soil.'
-    },
-    'Corn__Cercospora_leaf_spot Gray_leaf_spot': {
-        'cause': 'Caused by the fungus Cercospora zeae-maydis, spreading in warm, humid weather via spores on debris.',
-        'cure': 'Rotate crops; apply fungicides like azoxystrobin; remove infected residue post-harvest.'
-    },
-    'Corn_Common_rust': {
-        'cause': 'Caused by the fungus Puccinia sorghi, with spores overwintering on alternate hosts like oxalis.',
-        'cure': 'Plant resistant hybrids (e.g., DKC 62-08); apply triazoles early; destroy volunteer corn.'
-    },
-    'Corn_Northern_Leaf_Blight': {
-        'cause': 'Caused by the fungus Exserohilum turcicum, thriving in moderate temps (60-80°F) and high humidity.',
-        'cure': 'Use resistant varieties; apply propiconazole at tasseling; rotate with non-host crops.'
-    },
-    'Corn__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Maintain fertility with NPK; space plants for air flow; irrigate evenly.'
-    },
-    'Grape__Black_rot': {
-        'cause': 'Caused by the fungus Guignardia bidwellii, spores spread by rain from infected debris.',
-        'cure': 'Apply mancozeb pre-bloom; prune for canopy openness; sanitize tools.'
-    },
-    'Grape_Esca(Black_Measles)': {
-        'cause': 'Caused by a complex of fungi (e.g., Phaeomoniella), entering via pruning wounds.',
-        'cure': 'Delay pruning until dry weather; apply aramid fungicides to cuts; remove infected vines.'
-    },
-    'Grape__Leaf_blight(Isariopsis_Leaf_Spot)': {
-        'cause': 'Caused by the fungus Septoria leaf spot (Isariopsis), splashing from soil in wet conditions.',
-        'cure': 'Fungicides like chlorothalonil; mulch to reduce splash; remove lower leaves.'
-    },
-    'Grape___healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Trellis for sun exposure; balanced pruning; monitor soil moisture.'
-    },
-    'Orange__Haunglongbing(Citrus_greening)': {
-        'cause': 'Caused by the bacterium Liberibacter asiaticus, transmitted by Asian citrus psyllid.',
-        'cure': 'Remove infected trees; control psyllids with imidacloprid; no cure—focus on prevention.'
-    },
-    'Peach__Bacterial_spot': {
-        'cause': 'Caused by the bacterium Xanthomonas arboricola pv. pruni, spread by rain/splashing.',
-        'cure': 'Copper sprays at bud swell; choose resistant varieties like Contender; avoid overhead watering.'
-    },
-    'Peach__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Thin fruit for size; fertilize post-harvest; ensure good drainage.'
-    },
-    'Pepper,bell_Bacterial_spot': {
-        'cause': 'Caused by Xanthomonas spp., entering via wounds in warm, wet conditions.',
-        'cure': 'Fixed copper bactericides; rotate crops; use disease-free seeds.'
-    },
-    'Pepper,_bell__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Stake for air flow; consistent watering; mulch to suppress weeds.'
-    },
-    'Potato__Early_blight': {
-        'cause': 'Caused by the fungus Alternaria solani, spores from debris in warm, wet weather.',
-        'cure': 'Apply chlorothalonil every 7-10 days; rotate 3 years; hill soil for protection.'
-    },
-    'Potato_Late_blight': {
-        'cause': 'Caused by Phytophthora infestans, spreading rapidly in cool, moist conditions.',
-        'cure': 'Fungicides like mefenoxam; destroy volunteers; plant certified seed.'
-    },
-    'Potato__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Fertilize balanced; space 12" apart; harvest when vines yellow.'
-    },
-    'Raspberry__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Trellis canes; thin annually; acidic soil pH 5.5-6.5.'
-    },
-    'Soybean_healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Inoculate seeds; row spacing 30"; weed control.'
-    },
-    'Squash__Powdery_mildew': {
-        'cause': 'Caused by Podosphaera xanthii, in warm, dry days with cool nights.',
-        'cure': 'Sulfur dust; reflective mulch; resistant varieties like Silver Queen.'
-    },
-    'Strawberry__Leaf_scorch': {
-        'cause': 'Caused by the fungus Diplocarpon earliae, spores in wet foliage.',
-        'cure': 'Fungicides like captan; improve drainage; remove old leaves post-harvest.'
-    },
-    'Strawberry__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Mulch with straw; renovate after fruiting; pH 5.5-6.5.'
-    },
-    'Tomato__Bacterial_spot': {
-        'cause': 'Caused by Xanthomonas spp., via seeds or transplants in warm, wet weather.',
-        'cure': 'Copper + mancozeb; fixed copper sprays; rotate 2-3 years.'
-    },
-    'Tomato_Early_blight': {
-        'cause': 'Caused by Alternaria solani, from soil splash in humid conditions.',
-        'cure': 'Chlorothalonil weekly; stake for air flow; mulch heavily.'
-    },
-    'Tomato_Late_blight': {
-        'cause': 'Caused by Phytophthora infestans, rapid spread in cool, moist nights.',
-        'cure': 'Mefenoxam at first symptoms; destroy debris; greenhouse ventilation.'
-    },
-    'Tomato__Leaf_Mold': {
-        'cause': 'Caused by Passalora fulva, high humidity in enclosed spaces.',
-        'cure': 'Improve ventilation; potassium phosphite sprays; resistant varieties.'
-    },
-    'Tomato__Septoria_leaf_spot': {
-        'cause': 'Caused by Septoria lycopersici, spores from debris in wet weather.',
-        'cure': 'Mancozeb every 7 days; rotate crops; lower leaves removed.'
-    },
-    'Tomato_Spider_mites Two-spotted_spider_mite': {
-        'cause': 'Caused by Tetranychus urticae mites, thriving in hot, dry conditions.',
-        'cure': 'Insecticidal soap or miticides; increase humidity; release predators like ladybugs.'
-    },
-    'Tomato__Target_Spot': {
-        'cause': 'Caused by Corynespora cassiicola, warm, humid greenhouses.',
-        'cure': 'Azoxystrobin; sanitize pots; avoid overhead irrigation.'
-    },
-    'Tomato__Tomato_Yellow_Leaf_Curl_Virus': {
-        'cause': 'Transmitted by whiteflies (Bemisia tabaci), persistent virus.',
-        'cure': 'Control whiteflies with imidacloprid; reflective mulch; remove infected plants.'
-    },
-    'Tomato_Tomato_mosaic_virus': {
-        'cause': 'Caused by Tobacco mosaic virus (TMV), spread by handling/tools.',
-        'cure': 'No cure—destroy plants; sanitize tools with 10% bleach; resistant varieties like Big Beef.'
-    },
-    'Tomato__healthy': {
-        'cause': 'No disease detected.',
-        'cure': 'Full sun; even watering; support with cages.'
-    }
-}
-
 
 # Now len(label) == 39—wait, still 39? Wait, count again.
 # Actually, standard is 39 for some splits, but your model has 40. Check model summary.
@@ -204,18 +53,79 @@ except Exception as e:
     print(f"❌ Error loading model: {e}")
     model = None
 
+# Compiled inference: one traced graph for every batch size instead of
+# model.predict(), which rebuilds its data adapter and callbacks per call.
+_infer_fn = None
+_infer_model = None
+
+def build_inference_fn(keras_model, jit_compile: bool = MODEL_XLA):
+    """Wrap a Keras model in a tf.function with a fixed [None, 224, 224, 3] float32 signature."""
+    @tf.function(
+        input_signature=[tf.TensorSpec(shape=[None, IMG_SIZE[0], IMG_SIZE[1], 3], dtype=tf.float32)],
+        jit_compile=jit_compile,
+    )
+    def infer(images):
+        return keras_model(images, training=False)
+    return infer
+
+def get_inference_fn():
+    """Compiled function for the currently loaded model (rebuilt if the model is swapped)."""
+    global _infer_fn, _infer_model
+    if _infer_model is not model:
+        _infer_fn = build_inference_fn(model) if model is not None else None
+        _infer_model = model
+    return _infer_fn
+
+def run_model(batch: np.ndarray) -> np.ndarray:
+    """Run one batch of preprocessed images through the compiled model."""
+    MODEL_BATCH_SIZE.observe(len(batch))
+    return get_inference_fn()(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
+if model is not None:
+    try:
+        run_model(np.zeros((1, IMG_SIZE[0], IMG_SIZE[1], 3), dtype=np.float32))  # trace once at startup
+        print(f"✅ Inference function compiled (XLA: {MODEL_XLA})")
+    except Exception as e:
+        print(f"❌ Error compiling inference function: {e}")
+
+def load_image_array(source):
+    """Decode and preprocess one image (file path or raw bytes) to a (224, 224, 3) float32 array."""
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    img = Image.open(source).convert('RGB')
+    img = img.resize(IMG_SIZE)
+    img_array = np.asarray(img, dtype=np.float32)
+    return tf.keras.applications.efficientnet.preprocess_input(img_array)
+
 def extract_features(image_path: str):
     try:
-        img = Image.open(image_path).convert('RGB')
-        img = img.resize(IMG_SIZE)
-        img_array = np.array(img)
-        img_array = tf.keras.applications.efficientnet.preprocess_input(img_array)
+        img_array = load_image_array(image_path)
         img_array = np.expand_dims(img_array, axis=0)
         return img_array
     except Exception as e:
         print(f"❌ Error extracting features: {e}")
         return None
 
+def decode_prediction(probabilities):
+    """Map one row of model output to the response dict used by the API."""
+    idx = int(np.argmax(probabilities))
+
+    num_classes = len(label)
+    if idx >= num_classes:
+        print(f"⚠️ Warning: Predicted index {idx} exceeds label count {num_classes}. Clamping to {num_classes-1}.")
+        idx = num_classes - 1  # Clamp to last valid label (or raise error)
+
+    predicted_class_name = label[idx]
+    confidence = probabilities[idx]
+
+    prediction_info = disease_dict.get(predicted_class_name, {})
+    return {
+        "predicted_class": predicted_class_name,
+        "confidence": float(confidence),
+        "cause": prediction_info.get('cause', 'Information not available'),
+        "cure": prediction_info.get('cure', 'Information not available')
+    }
+
 def model_predict(image_path: str):
     if model is None:
         return {"cause": "Model not loaded properly.", "cure": "Please check the model file."}
@@ -225,31 +135,51 @@ def model_predict(image_path: str):
         return {"cause": "Could not process the image.", "cure": "Please try with a different image."}
     
     try:
-        prediction = model.predict(img_array)
-        print(f"🔍 Prediction shape: {prediction.shape}")  # Debug: Should be (1, 40)
-        print(f"🔍 Raw probabilities: {prediction[0]}")  # Debug: See all 40 values
-        
-        idx = np.argmax(prediction[0])
-        print(f"🔍 Argmax index: {idx}")  # Debug: What index is chosen?
-        
-        num_classes = len(label)
-        if idx >= num_classes:
-            print(f"⚠️ Warning: Predicted index {idx} exceeds label count {num_classes}. Clamping to {num_classes-1}.")
-            idx = num_classes - 1  # Clamp to last valid label (or raise error)
-        
-        predicted_class_name = label[idx]
-        confidence = prediction[0][idx]
-        print(f"🔍 Predicted: {predicted_class_name}, Confidence: {confidence:.4f}")
-        
-        prediction_info = disease_dict.get(predicted_class_name, {})
-        return {
-            "predicted_class": predicted_class_name,
-            "confidence": float(confidence),
-            "cause": prediction_info.get('cause', 'Information not available'),
-            "cure": prediction_info.get('cure', 'Information not available')
-        }
+        prediction = run_model(img_array)
+        return decode_prediction(prediction[0])
     except Exception as e:
         print(f"❌ Error during prediction: {e}")
         import traceback
         print(traceback.format_exc())  # Full stack trace for debugging
-        return {"cause": f"Error during prediction: {e}", "cure": "Please try again."}
\ No newline at end of file
+        return {"cause": f"Error during prediction: {e}", "cure": "Please try again."}
+
+def model_predict_batch(sources: list) -> list:
+    """Predict many images (paths or raw bytes) at once.
+
+    Images are decoded/resized in a thread pool (PIL releases the GIL) and then
+    pushed through the model in chunks of BATCH_SIZE instead of one call per
+    image. Returns one result dict per input, in input order; entries that could
+    not be processed carry the same error dict as model_predict.
+    """
+    if model is None:
+        return [{"cause": "Model not loaded properly.", "cure": "Please check the model file."} for _ in sources]
+
+    def _load(source):
+        try:
+            return load_image_array(source)
+        except Exception as e:
+            print(f"❌ Error extracting features: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS) as pool:
+        arrays = list(pool.map(_load, sources))
+
+    results = [
+        {"cause": "Could not process the image.", "cure": "Please try with a different image."}
+        for _ in sources
+    ]
+    valid = [i for i, arr in enumerate(arrays) if arr is not None]
+
+    for start in range(0, len(valid), BATCH_SIZE):
+        chunk = valid[start:start + BATCH_SIZE]
+        batch = np.stack([arrays[i] for i in chunk])
+        try:
+            prediction = run_model(batch)
+            for row, i in enumerate(chunk):
+                results[i] = decode_prediction(prediction[row])
+        except Exception as e:
+            print(f"❌ Error during batch prediction: {e}")
+            for i in chunk:
+                results[i] = {"cause": f"Error during prediction: {e}", "cure": "Please try again."}
+
+    return results
@@ -0,0 +1,136 @@
+"""Cheap screening stage that runs before the disease model.
+
+Works on a small downscaled copy of the upload and rejects photos that are
+obviously not a leaf (almost no plant-coloured pixels, a flat surface) or are
+too dark, washed out or blurry to classify. Only images that pass go on to
+EfficientNet, Gemini and TTS. Thresholds are deliberately loose: the goal is
+to drop obvious junk in a few milliseconds, not to second-guess the model.
+"""
+import os
+import numpy as np
+from io import BytesIO
+from PIL import Image
+from monitoring.metrics import PREFILTER_DECISIONS, PREFILTER_SHORT_CIRCUIT_RATIO
+
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "1") == "1"
+SCREEN_SIZE = 160                                                # longest side of the working copy
+MIN_PLANT_FRACTION = float(os.getenv("PREFILTER_MIN_PLANT_FRACTION", "0.10"))
+MIN_SHARPNESS = float(os.getenv("PREFILTER_MIN_SHARPNESS", "15"))  # variance of the Laplacian
+MIN_BRIGHTNESS = 25
+MAX_BRIGHTNESS = 240
+MIN_CONTRAST = 8                                                 # std-dev of the most varied RGB channel
+
+# PIL HSV channels are 0-255; hue 10..120 covers orange-brown through yellow
+# and green to teal (~14°-170°), i.e. healthy and diseased leaf tissue.
+PLANT_HUE_RANGE = (10, 120)
+PLANT_MIN_SATURATION = 40
+PLANT_MIN_VALUE = 40
+
+REJECTION_MESSAGES = {
+    "unreadable": {
+        "en": "We could not open this image. Please upload a JPEG or PNG photo.",
+        "hi": "Yeh photo khul nahi rahi. Kripya JPEG ya PNG photo bhejein.",
+    },
+    "too_dark": {
+        "en": "The photo is too dark. Please retake it in daylight.",
+        "hi": "Photo bahut andheri hai. Kripya din ki roshni mein dobara photo lein.",
+    },
+    "too_bright": {
+        "en": "The photo is overexposed. Please avoid direct glare and retake it.",
+        "hi": "Photo mein roshni bahut zyada hai. Seedhi dhoop se bachkar dobara photo lein.",
+    },
+    "no_texture": {
+        "en": "The photo looks like a plain surface. Please photograph a single leaf up close.",
+        "hi": "Photo mein sirf saada surface dikh raha hai. Kripya ek patti ki paas se photo lein.",
+    },
+    "no_leaf": {
+        "en": "No leaf was found in this photo. Please photograph a single leaf so it fills most of the frame.",
+        "hi": "Is photo mein patti nahi dikh rahi. Kripya ek patti ki photo lein jo frame ka zyada hissa bhare.",
+    },
+    "blurry": {
+        "en": "The photo is too blurry. Hold the phone steady, tap to focus on the leaf and retake it.",
+        "hi": "Photo dhundhli hai. Phone sthir rakhein, patti par focus karke dobara photo lein.",
+    },
+}
+
+
+def rejection_message(reason: str, lang: str = "en") -> str:
+    messages = REJECTION_MESSAGES.get(reason, REJECTION_MESSAGES["no_leaf"])
+    if lang in ("hi", "hinglish", "pa"):
+        return messages["hi"]
+    return messages["en"]
+
+
+def _downscale(data: bytes) -> Image.Image:
+    img = Image.open(BytesIO(data))
+    # JPEG can decode straight at 1/2..1/8 scale, which is most of the saving
+    img.draft("RGB", (SCREEN_SIZE * 2, SCREEN_SIZE * 2))
+    img = img.convert("RGB")
+    img.thumbnail((SCREEN_SIZE, SCREEN_SIZE))
+    return img
+
+
+def _laplacian_variance(gray: np.ndarray) -> float:
+    lap = (4 * gray[1:-1, 1:-1] - gray[:-2, 1:-1] - gray[2:, 1:-1]
+           - gray[1:-1, :-2] - gray[1:-1, 2:])
+    return float(lap.var())
+
+
+def screen_image(data: bytes) -> dict:
+    """Score one upload. Returns {"ok", "reason", "scores"}; reason is None when ok."""
+    try:
+        img = _downscale(data)
+    except Exception as e:
+        print(f"❌ Prefilter could not decode image: {e}")
+        return {"ok": False, "reason": "unreadable", "scores": {}}
+
+    rgb = np.asarray(img, dtype=np.float32)
+    gray = np.asarray(img.convert("L"), dtype=np.float32)
+    hsv = np.asarray(img.convert("HSV"))
+    hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+
+    plant = (
+        (hue >= PLANT_HUE_RANGE[0]) & (hue <= PLANT_HUE_RANGE[1])
+        & (sat >= PLANT_MIN_SATURATION) & (val >= PLANT_MIN_VALUE)
+    )
+    scores = {
+        "brightness": round(float(gray.mean()), 1),
+        "contrast": round(float(rgb.reshape(-1, 3).std(axis=0).max()), 1),
+        "plant_fraction": round(float(plant.mean()), 3),
+        "sharpness": round(_laplacian_variance(gray), 1) if min(gray.shape) >= 3 else 0.0,
+    }
+
+    if scores["brightness"] < MIN_BRIGHTNESS:
+        reason = "too_dark"
+    elif scores["brightness"] > MAX_BRIGHTNESS:
+        reason = "too_bright"
+    elif scores["contrast"] < MIN_CONTRAST:
+        reason = "no_texture"
+    elif scores["plant_fraction"] < MIN_PLANT_FRACTION:
+        reason = "no_leaf"
+    elif scores["sharpness"] < MIN_SHARPNESS:
+        reason = "blurry"
+    else:
+        reason = None
+    return {"ok": reason is None, "reason": reason, "scores": scores}
+
+
+def prefilter(data: bytes) -> dict:
+    """screen_image() plus bookkeeping; a no-op pass when PREFILTER_ENABLED is off."""
+    if not PREFILTER_ENABLED:
+        return {"ok": True, "reason": None, "scores": {}}
+    verdict = screen_image(data)
+    PREFILTER_DECISIONS.inc(outcome="passed" if verdict["ok"] else verdict["reason"])
+    return verdict
+
+
+def short_circuit_ratio() -> float:
+    """Share of screened images that never reached the disease model."""
+    counts = PREFILTER_DECISIONS.values()
+    total = sum(counts.values())
+    if not total:
+        return 0.0
+    return 1 - counts.get(("passed",), 0) / total
+
+
+PREFILTER_SHORT_CIRCUIT_RATIO.set_function(short_circuit_ratio)
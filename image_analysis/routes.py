@@ -4,28 +4,147 @@ from fastapi.templating import Jinja2Templates
 from auth.database import db
 import traceback
 import datetime
-import shutil
 import uuid
-import time
 import asyncio
-from image_analysis.prediction import model_predict
-from image_analysis.voice_helper import generate_voice, clean_label_for_voice
-from chatbot.app import get_gemini_response
+import zipfile
+import base64
+from bson import ObjectId
+from urllib.parse import urlencode
+from collections import defaultdict
+from typing import List, Optional
+from image_analysis.prediction import model_predict, model_predict_batch, label
+from image_analysis.prefilter import prefilter, rejection_message
+from image_analysis.voice_helper import generate_voice_async, clean_label_for_voice
+from chatbot.app import get_gemini_response_async
+from monitoring.metrics import stage_timer
+from storage.write_behind import write_behind
+from storage.blobs import UPLOAD_IMAGE_DIR as UPLOAD_DIR, store_blob, make_thumbnail, image_extension
 import os
 
-UPLOAD_DIR = "uploadimages"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png"]
+ALLOWED_IMAGE_EXTS = [".jpg", ".jpeg", ".png"]
+ZIP_TYPES = ["application/zip", "application/x-zip-compressed"]
+MAX_BATCH_IMAGES = int(os.getenv("MAX_BATCH_IMAGES", "100"))
+# Uncompressed size limits for survey images (zip members are checked before they are read)
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(15 * 1024 * 1024)))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(300 * 1024 * 1024)))
+
+DASHBOARD_PAGE_SIZE = 12
+DASHBOARD_MAX_PAGE_SIZE = 50
+# Only what image_dashboard.html renders (no cause/cure text, paths or voice files)
+DASHBOARD_PROJECTION = {
+    "filename": 1,
+    "thumbnail": 1,
+    "files_expired": 1,
+    "analysis_result.predicted_class": 1,
+    "analysis_result.confidence": 1,
+    "detailed_info": 1,
+    "timestamp": 1,
+}
+
+# Language mapping for style (force transliteration in English letters)
+PROMPT_LANG_MAP = {
+    'hi': 'Hinglish (write Hindi in English letters, e.g. "dawa lagao, paani do")',
+    'hinglish': 'Hinglish (write Hindi in English letters, not Devanagari)',
+    'en': 'English',
+    'pa': 'Punjabi (write Punjabi in English letters, not Gurmukhi)'
+}
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-async def save_analysis_to_db(analysis_data: dict):
-    """Async helper to save analysis to MongoDB."""
+def save_analysis_to_db(analysis_data: dict):
+    """Queue an analysis for image_analyses (written in batches, off the response path)."""
+    write_behind.enqueue("image_analyses", analysis_data)
+
+def save_analyses_to_db(analyses: list):
+    """Queue a batch of analyses for image_analyses."""
+    for analysis in analyses:
+        write_behind.enqueue("image_analyses", analysis)
+
+def build_disease_prompt(cleaned_result: str, prompt_lang: str) -> str:
+    """Craft the Gemini prompt for a disease description (force transliteration)."""
+    return (
+        f"Briefly describe {cleaned_result} disease in {prompt_lang}. "
+        f"Do not use native Hindi or Punjabi script, only English letters. "
+        f"Explain what it is, treatment, cure, and fertilizer suggestions. "
+        f"Keep it concise, under 80 words."
+    )
+
+def is_allowed_image(filename: str, content_type: str) -> bool:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return content_type in ALLOWED_IMAGE_TYPES or ext in ALLOWED_IMAGE_EXTS
+
+def save_image_bytes(original_name: str, data: bytes, content_type: str = None) -> tuple:
+    """Store an uploaded image content-addressed in UPLOAD_DIR (+ WebP thumbnail).
+
+    Returns (filename, thumbnail); identical uploads share one file.
+    """
+    filename = store_blob(UPLOAD_DIR, data, image_extension(original_name, content_type))
+    return filename, make_thumbnail(filename)
+
+def _too_large(name: str):
+    return HTTPException(status_code=413, detail=f"'{name}' is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+
+def _batch_too_large():
+    return HTTPException(status_code=413, detail=f"A survey can contain at most {MAX_BATCH_BYTES // (1024 * 1024)} MB of images")
+
+def extract_zip_images(upload_name: str, fileobj, budget: int) -> list:
+    """(name, bytes) for the images in a zip, within the per-image and remaining batch byte limits.
+
+    Blocking: run it in a thread. Sizes are checked from the zip directory
+    first and enforced again while reading, since the directory can lie.
+    """
+    images = []
     try:
-        await db["image_analyses"].insert_one(analysis_data)
-        print("✅ Analysis saved to DB")
-    except Exception as e:
-        print(f"❌ DB save error: {e}")
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                    continue
+                if os.path.splitext(name)[1].lower() not in ALLOWED_IMAGE_EXTS:
+                    continue
+                if info.file_size > MAX_IMAGE_BYTES:
+                    raise _too_large(name)
+                if info.file_size > budget:
+                    raise _batch_too_large()
+                with archive.open(info) as member:
+                    data = member.read(MAX_IMAGE_BYTES + 1)
+                if len(data) > MAX_IMAGE_BYTES:
+                    raise _too_large(name)
+                if len(data) > budget:
+                    raise _batch_too_large()
+                budget -= len(data)
+                images.append((os.path.basename(name), data))
+                if len(images) > MAX_BATCH_IMAGES:
+                    break
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"'{upload_name}' is not a valid zip archive")
+    return images
+
+async def read_survey_images(files: List[UploadFile]) -> list:
+    """Collect (original_name, bytes) pairs from multipart images and/or zip archives."""
+    images = []
+    budget = MAX_BATCH_BYTES
+    for upload in files:
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        if upload.content_type in ZIP_TYPES or ext == ".zip":
+            extracted = await asyncio.to_thread(extract_zip_images, upload.filename, upload.file, budget)
+        elif is_allowed_image(upload.filename, upload.content_type):
+            data = await upload.read(MAX_IMAGE_BYTES + 1)
+            if len(data) > MAX_IMAGE_BYTES:
+                raise _too_large(upload.filename)
+            if len(data) > budget:
+                raise _batch_too_large()
+            extracted = [(upload.filename, data)]
+        else:
+            raise HTTPException(status_code=400, detail=f"'{upload.filename}': only JPEG, PNG or zip files are supported")
+
+        images += extracted
+        budget -= sum(len(data) for _, data in extracted)
+        if len(images) > MAX_BATCH_IMAGES:
+            raise HTTPException(status_code=413, detail=f"A survey can contain at most {MAX_BATCH_IMAGES} images")
+    return images
 
 @router.post("/analyze")
 async def analyze_image_endpoint(
@@ -34,47 +153,48 @@ async def analyze_image_endpoint(
     voice: bool = Query(True, description="Generate voice?"), 
     lang: str = Query("hi", description="Language: 'hi' for Hinglish, 'en' for English, 'pa' for Punjabi")
 ):
-    start_time = time.time()
     try:
         # ✅ Fix: Content type + extension check
-        allowed_types = ["image/jpeg", "image/png"]
-        allowed_exts = [".jpg", ".jpeg", ".png"]
-
-        ext = os.path.splitext(file.filename)[1].lower()
-        if (file.content_type not in allowed_types) and (ext not in allowed_exts):
+        if not is_allowed_image(file.filename, file.content_type):
             raise HTTPException(status_code=400, detail="Only JPEG or PNG images are supported")
 
-        filename = f"temp_{uuid.uuid4().hex}_{file.filename}"
-        image_path = os.path.join(UPLOAD_DIR, filename)
+        user_lang = lang.lower()
 
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        upload_end = time.time()
-        print(f"⏱️ Upload time: {upload_end - start_time:.2f}s")
+        contents = await file.read()
+        # Cheap screen first: obvious non-leaf / unusable photos never reach the model
+        with stage_timer("image_analysis", "prefilter"):
+            verdict = await asyncio.to_thread(prefilter, contents)
+        if not verdict["ok"]:
+            raise HTTPException(status_code=422, detail={
+                "reason": verdict["reason"],
+                "message": rejection_message(verdict["reason"], user_lang),
+                "scores": verdict["scores"],
+            })
+
+        with stage_timer("image_analysis", "upload"):
+            filename, thumbnail = await asyncio.to_thread(save_image_bytes, file.filename, contents, file.content_type)
+            image_path = os.path.join(UPLOAD_DIR, filename)
 
         # Run prediction in background thread
-        analysis_start = time.time()
-        analysis_result = await asyncio.to_thread(model_predict, image_path)
-        analysis_end = time.time()
-        print(f"⏱️ Model prediction time: {analysis_end - analysis_start:.2f}s")
+        with stage_timer("image_analysis", "model"):
+            analysis_result = await asyncio.to_thread(model_predict, image_path)
 
         # Check if prediction succeeded
         if 'predicted_class' not in analysis_result:
             raise HTTPException(status_code=400, detail=f"Image analysis failed: {analysis_result.get('cause', 'Unknown error')}")
 
+        # The model itself saw no leaf: skip Gemini and TTS for this photo
+        if analysis_result['predicted_class'] == "Background_without_leaves":
+            raise HTTPException(status_code=422, detail={
+                "reason": "no_leaf",
+                "message": rejection_message("no_leaf", user_lang),
+                "filename": filename,
+            })
+
         # Clean disease name for natural language
         cleaned_result = clean_label_for_voice(analysis_result['predicted_class'])
 
-        # Language mapping for style (force transliteration in English letters)
-        lang_map = {
-            'hi': 'Hinglish (write Hindi in English letters, e.g. "dawa lagao, paani do")',
-            'hinglish': 'Hinglish (write Hindi in English letters, not Devanagari)',
-            'en': 'English',
-            'pa': 'Punjabi (write Punjabi in English letters, not Gurmukhi)'
-        }
-        user_lang = lang.lower()
-        prompt_lang = lang_map.get(user_lang, 'English')
+        prompt_lang = PROMPT_LANG_MAP.get(user_lang, 'English')
 
         # Build summary text (English for reference)
         summary = (
@@ -84,31 +204,21 @@ async def analyze_image_endpoint(
         )
 
         # Craft prompt for Gemini (force transliteration)
-        detailed_prompt = (
-            f"Briefly describe {cleaned_result} disease in {prompt_lang}. "
-            f"Do not use native Hindi or Punjabi script, only English letters. "
-            f"Explain what it is, treatment, cure, and fertilizer suggestions. "
-            f"Keep it concise, under 80 words."
-        )
-        gemini_start = time.time()
-        detailed_info = get_gemini_response(detailed_prompt)
-        gemini_end = time.time()
-        print(f"⏱️ Gemini API time: {gemini_end - gemini_start:.2f}s")
+        detailed_prompt = build_disease_prompt(cleaned_result, prompt_lang)
+        with stage_timer("image_analysis", "gemini"):
+            detailed_info = await get_gemini_response_async(detailed_prompt)
 
         # Generate voice (optional)
         voice_filename = None
         if voice:
-            voice_start = time.time()
-            voice_filename = generate_voice(detailed_info, lang=user_lang)  # Now safe with transliteration
-            voice_end = time.time()
-            print(f"⏱️ Voice generation time: {voice_end - voice_start:.2f}s")
-        else:
-            print("⏱️ Voice generation skipped (voice=false)")
+            with stage_timer("image_analysis", "tts"):
+                voice_filename = await generate_voice_async(detailed_info, lang=user_lang)  # Now safe with transliteration
 
         # Prepare DB data
         analysis_data = {
             "filename": filename,
             "full_path": image_path,
+            "thumbnail": thumbnail,
             "analysis_result": analysis_result,
             "summary_text": summary,
             "detailed_info": detailed_info,
@@ -118,14 +228,12 @@ async def analyze_image_endpoint(
         }
 
         # Save to DB in background
-        asyncio.create_task(save_analysis_to_db(analysis_data))
-
-        total_time = time.time() - start_time
-        print(f"⏱️ Total endpoint time: {total_time:.2f}s")
+        save_analysis_to_db(analysis_data)
 
         return {
             "filename": filename,
             "image_url": f"/uploadimages/{filename}",
+            "thumbnail_url": f"/uploadimages/{thumbnail}" if thumbnail else None,
             "analysis_result": analysis_result,
             "summary_text": summary,
             "detailed_info": detailed_info,
@@ -138,21 +246,236 @@ async def analyze_image_endpoint(
         print(f"Error in /analyze: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@router.post("/analyze-batch")
+async def analyze_field_survey(
+    files: List[UploadFile] = File(..., description="Leaf images (JPEG/PNG) and/or zip archives of them"),
+    voice: bool = Query(True, description="Generate voice?"),
+    lang: str = Query("hi", description="Language: 'hi' for Hinglish, 'en' for English, 'pa' for Punjabi")
+):
+    """Field survey: many images → batched model pass → per-image results + field summary.
+
+    Gemini narrative and voice are generated once per distinct disease found,
+    not once per image.
+    """
+    try:
+        with stage_timer("field_survey", "read"):
+            images = await read_survey_images(files)
+            if not images:
+                raise HTTPException(status_code=400, detail="No JPEG or PNG images found in the upload")
+
+        user_lang = lang.lower()
+        prompt_lang = PROMPT_LANG_MAP.get(user_lang, 'English')
+
+        with stage_timer("field_survey", "prefilter"):
+            verdicts = await asyncio.to_thread(lambda: [prefilter(data) for _, data in images])
+        passed = [i for i, verdict in enumerate(verdicts) if verdict["ok"]]
+
+        with stage_timer("field_survey", "upload"):
+            stored = [(None, None)] * len(images)
+            saved = await asyncio.to_thread(lambda: [save_image_bytes(*images[i]) for i in passed])
+            for i, names in zip(passed, saved):
+                stored[i] = names
+
+        with stage_timer("field_survey", "model"):
+            predicted = await asyncio.to_thread(model_predict_batch, [images[i][1] for i in passed])
+
+        results = [
+            {
+                "prefilter": verdict["reason"],
+                "cause": rejection_message(verdict["reason"], user_lang),
+                "cure": "Image was not sent to the disease model.",
+            }
+            for verdict in verdicts
+        ]
+        for i, result in zip(passed, predicted):
+            results[i] = result
+
+        # Group images by predicted class for the field-level summary
+        by_class = defaultdict(list)
+        for result in results:
+            if 'predicted_class' in result:
+                by_class[result['predicted_class']].append(result['confidence'])
+
+        diseases = [
+            name for name in by_class
+            if "healthy" not in name.lower() and name != "Background_without_leaves"
+        ]
+
+        async def describe(predicted_class: str):
+            detailed_info = await get_gemini_response_async(
+                build_disease_prompt(clean_label_for_voice(predicted_class), prompt_lang)
+            )
+            voice_filename = None
+            if voice:
+                voice_filename = await generate_voice_async(detailed_info, user_lang)
+            return detailed_info, voice_filename
+
+        # One Gemini + TTS call per distinct disease, run concurrently
+        with stage_timer("field_survey", "narratives"):
+            narratives = dict(zip(diseases, await asyncio.gather(*(describe(d) for d in diseases))))
+
+        analyzed = sum(len(v) for v in by_class.values())
+        disease_summary = []
+        for predicted_class in sorted(diseases, key=lambda d: len(by_class[d]), reverse=True):
+            confidences = by_class[predicted_class]
+            sample = next(r for r in results if r.get('predicted_class') == predicted_class)
+            detailed_info, voice_filename = narratives[predicted_class]
+            disease_summary.append({
+                "predicted_class": predicted_class,
+                "name": clean_label_for_voice(predicted_class),
+                "count": len(confidences),
+                "share": round(len(confidences) / analyzed, 3),
+                "mean_confidence": round(sum(confidences) / len(confidences), 4),
+                "cause": sample['cause'],
+                "cure": sample['cure'],
+                "detailed_info": detailed_info,
+                "voice_url": f"/uploadvoices/{voice_filename}" if voice_filename else None,
+            })
+
+        summary = {
+            "total_images": len(images),
+            "analyzed": analyzed,
+            # Passed the prefilter but got no model result; prefiltered images are counted separately
+            "failed": len(passed) - analyzed,
+            "prefiltered": len(images) - len(passed),
+            "healthy": sum(len(v) for k, v in by_class.items() if "healthy" in k.lower()),
+            "non_leaf": len(by_class.get("Background_without_leaves", [])),
+            "diseased": sum(d["count"] for d in disease_summary),
+            "dominant_disease": disease_summary[0]["predicted_class"] if disease_summary else None,
+            "diseases": disease_summary,
+        }
+
+        survey_id = uuid.uuid4().hex
+        now = datetime.datetime.now()
+        per_image = []
+        analysis_docs = []
+        for (original_name, _), (filename, thumbnail), result in zip(images, stored, results):
+            per_image.append({
+                "original_filename": original_name,
+                "filename": filename,
+                "image_url": f"/uploadimages/{filename}" if filename else None,
+                "thumbnail_url": f"/uploadimages/{thumbnail}" if thumbnail else None,
+                "analysis_result": result,
+            })
+            if 'predicted_class' in result:
+                detailed_info, voice_filename = narratives.get(result['predicted_class'], (None, None))
+                analysis_docs.append({
+                    "survey_id": survey_id,
+                    "filename": filename,
+                    "full_path": os.path.join(UPLOAD_DIR, filename),
+                    "thumbnail": thumbnail,
+                    "analysis_result": result,
+                    "detailed_info": detailed_info,
+                    # The storage GC keeps a narrative MP3 only while a document names it
+                    "voice_file": voice_filename,
+                    "user_lang": user_lang,
+                    "timestamp": now
+                })
+
+        # Save to DB in background
+        if analysis_docs:
+            save_analyses_to_db(analysis_docs)
+
+        return {
+            "survey_id": survey_id,
+            "summary": summary,
+            "images": per_image,
+            "timestamp": str(now)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in /analyze-batch: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _thumbnail_url(analysis: dict):
+    """Dashboard thumbnail; older documents without one fall back to the original."""
+    if analysis.get("files_expired"):
+        return None
+    if analysis.get("thumbnail"):
+        return f"/uploadimages/{analysis['thumbnail']}"
+    return f"/uploadimages/{analysis['filename']}"
+
+def encode_cursor(analysis: dict) -> str:
+    raw = f"{analysis['timestamp'].isoformat()}|{analysis['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, oid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(timestamp), ObjectId(oid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/dashboard", response_class=HTMLResponse)
-async def image_analysis_dashboard(request: Request):
+async def image_analysis_dashboard(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1, le=DASHBOARD_MAX_PAGE_SIZE),
+    predicted_class: Optional[str] = Query(None, description="Only show this predicted class"),
+    start_date: Optional[datetime.date] = Query(None, description="From date (inclusive)"),
+    end_date: Optional[datetime.date] = Query(None, description="To date (inclusive)")
+):
+    """Keyset-paginated dashboard on (timestamp, _id).
+
+    Each page is an index range scan (see auth.database.ensure_indexes), so the
+    cost does not grow with the collection size or the page number.
+    """
     try:
-        analyses = await db["image_analyses"].find().sort("timestamp", -1).to_list(length=10)
+        filters = []
+        if predicted_class:
+            filters.append({"analysis_result.predicted_class": predicted_class})
+        if start_date or end_date:
+            time_range = {}
+            if start_date:
+                time_range["$gte"] = datetime.datetime.combine(start_date, datetime.time.min)
+            if end_date:
+                time_range["$lt"] = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min)
+            filters.append({"timestamp": time_range})
+        if cursor:
+            last_timestamp, last_id = decode_cursor(cursor)
+            filters.append({"$or": [
+                {"timestamp": {"$lt": last_timestamp}},
+                {"timestamp": last_timestamp, "_id": {"$lt": last_id}}
+            ]})
+        query = {"$and": filters} if filters else {}
+
+        # Fetch one extra row to know whether there is a next page
+        analyses = await db["image_analyses"].find(query, DASHBOARD_PROJECTION) \
+            .sort([("timestamp", -1), ("_id", -1)]) \
+            .limit(limit + 1) \
+            .to_list(length=limit + 1)
+        next_cursor = encode_cursor(analyses[limit - 1]) if len(analyses) > limit else None
         analyses = [
             {
                 "filename": analysis["filename"],
-                "image_url": f"/uploadimages/{analysis['filename']}",
+                "image_url": None if analysis.get("files_expired") else f"/uploadimages/{analysis['filename']}",
+                "thumbnail_url": _thumbnail_url(analysis),
                 "analysis_result": analysis["analysis_result"],
                 "detailed_info": analysis.get("detailed_info", "No detailed info available"),
                 "timestamp": str(analysis["timestamp"])
             }
-            for analysis in analyses
+            for analysis in analyses[:limit]
         ]
-        return templates.TemplateResponse("image_dashboard.html", {"request": request, "analyses": analyses})
+        filter_params = {
+            "limit": limit,
+            "predicted_class": predicted_class,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+        filter_params = {k: v for k, v in filter_params.items() if v}
+        next_url = f"?{urlencode({**filter_params, 'cursor': next_cursor})}" if next_cursor else None
+        first_url = f"?{urlencode(filter_params)}" if cursor else None
+        return templates.TemplateResponse("image_dashboard.html", {
+            "request": request,
+            "analyses": analyses,
+            "classes": label,
+            "filters": filter_params,
+            "next_url": next_url,
+            "first_url": first_url
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in /dashboard: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
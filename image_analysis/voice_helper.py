@@ -1,10 +1,16 @@
-import uuid
-import os
 from google.cloud import texttospeech
+import asyncio
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache
+from storage.blobs import UPLOAD_VOICE_DIR, store_blob
+from monitoring.metrics import track_upstream, TTS_CACHE_REQUESTS, TTS_CACHE_BYTES
+from replay.google_clients import TextToSpeechStandIn, stand_in
 
-UPLOAD_VOICE_DIR = "uploadvoices"
-os.makedirs(UPLOAD_VOICE_DIR, exist_ok=True)
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "8"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
 
 def clean_label_for_voice(label_text: str) -> str:
     """Clean label text for natural speech (e.g., 'Tomato__Late_blight' -> 'Tomato Late Blight')."""
@@ -12,6 +18,185 @@ def clean_label_for_voice(label_text: str) -> str:
     text = " ".join(text.split())  # Remove extra spaces
     return text
 
+VOICE_MAP = {
+    'hi': {'language_code': 'hi-IN', 'name': 'hi-IN-Wavenet-A', 'ssml_gender': 'FEMALE'},
+    'hinglish': {'language_code': 'hi-IN', 'name': 'hi-IN-Wavenet-A', 'ssml_gender': 'FEMALE'},
+    'en': {'language_code': 'en-IN', 'name': 'en-IN-Wavenet-C', 'ssml_gender': 'FEMALE'},
+    'pa': {'language_code': 'pa-IN', 'name': 'pa-IN-Wavenet-A', 'ssml_gender': 'FEMALE'}
+    # Add more as needed
+}
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?।])\s+')
+
+_async_client = None
+_sync_client = None
+_client_lock = threading.Lock()
+_tts_slots = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+_tts_pool = ThreadPoolExecutor(max_workers=TTS_MAX_CONCURRENCY, thread_name_prefix="tts")
+
+# Sentence audio keyed by (normalized sentence, voice, rate, pitch, ssml), bounded by total MP3 bytes
+_audio_cache = LRUCache(maxsize=TTS_CACHE_MAX_BYTES, getsizeof=len)
+_audio_cache_lock = threading.Lock()  # generate_voice fills it from worker threads
+TTS_CACHE_BYTES.set_function(lambda: _audio_cache.currsize)
+
+def get_async_tts_client():
+    """Shared TextToSpeechAsyncClient, created on first use inside the event loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = stand_in(TextToSpeechStandIn, texttospeech.TextToSpeechAsyncClient)
+    return _async_client
+
+def get_tts_client():
+    """Shared blocking TextToSpeechClient (one gRPC channel for all threads)."""
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None:
+            _sync_client = stand_in(TextToSpeechStandIn, texttospeech.TextToSpeechClient, asynchronous=False)
+    return _sync_client
+
+def clean_text_for_voice(summary_text: str) -> str:
+    cleaned_text = re.sub(r'\\n', ' ', summary_text)  # Replace \n with space
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)  # Normalize multiple spaces
+    cleaned_text = re.sub(r'[^\w\s.,!?]', '', cleaned_text)  # Keep only letters, numbers, and basic punctuation
+    return cleaned_text.strip()  # Remove leading/trailing spaces
+
+def split_sentences(text: str) -> list:
+    """Split a reply into sentences so audio can be produced piece by piece."""
+    return [sentence for sentence in SENTENCE_END_RE.split(text.strip()) if sentence.strip()]
+
+def prosody(lang: str, custom_rate: float = None, custom_pitch: float = None) -> tuple:
+    """(speaking_rate, pitch) for a language, with optional overrides."""
+    base_rate = 0.95 if lang in ['hi', 'hinglish', 'pa'] else 1.0
+    base_pitch = -0.5 if lang in ['hi', 'hinglish', 'pa'] else 0.0
+    return custom_rate or base_rate, custom_pitch or base_pitch
+
+def audio_cache_key(
+    text: str,
+    lang: str = "hi",
+    use_ssml: bool = False,
+    custom_rate: float = None,
+    custom_pitch: float = None
+) -> tuple:
+    voice_config = VOICE_MAP.get(lang, VOICE_MAP['hi'])
+    rate, pitch = prosody(lang, custom_rate, custom_pitch)
+    return (clean_text_for_voice(text), voice_config['name'], rate, pitch, use_ssml)
+
+def _cached_audio(key: tuple):
+    with _audio_cache_lock:
+        audio = _audio_cache.get(key)
+    TTS_CACHE_REQUESTS.inc(result="hit" if audio is not None else "miss")
+    return audio
+
+def _store_audio(key: tuple, audio: bytes):
+    if len(audio) <= TTS_CACHE_MAX_BYTES:
+        with _audio_cache_lock:
+            _audio_cache[key] = audio
+
+def build_synthesis_request(
+    summary_text: str,
+    lang: str = "hi",
+    use_ssml: bool = False,
+    custom_rate: float = None,
+    custom_pitch: float = None
+) -> dict:
+    """Keyword arguments for synthesize_speech (input, voice, audio_config)."""
+    # Map app's lang codes to Google Cloud TTS voice settings
+    voice_config = VOICE_MAP.get(lang, VOICE_MAP['hi'])  # Default to Hindi for Hinglish
+
+    # Clean the text (always, for compatibility)
+    cleaned_text = clean_text_for_voice(summary_text)
+
+    # SSML enhancement (optional)
+    input_text = cleaned_text
+    if use_ssml:
+        ssml_text = f"<speak>{cleaned_text}</speak>"
+        # Add phonetic hints for specific words (language-specific)
+        if lang in ['hi', 'hinglish']:
+            ssml_text = ssml_text.replace("Diplocarpon", "<phoneme alphabet='ipa' ph='dɪploʊˈkɑːrpən'>Diplocarpon</phoneme>")
+            # Add more: e.g., ssml_text = ssml_text.replace("patton", "<phoneme alphabet='ipa' ph='pət̪ən'>patton</phoneme>")
+        elif lang == 'pa':
+            ssml_text = ssml_text.replace("ਸੰਭਾਲ", "<phoneme alphabet='ipa' ph='səmˈbʱaːl'>ਸੰਭਾਲ</phoneme>")
+            # Add more Punjabi words as needed
+        input_text = ssml_text  # Use SSML if enabled
+
+    synthesis_input = texttospeech.SynthesisInput(ssml=input_text) if use_ssml else texttospeech.SynthesisInput(text=cleaned_text)
+
+    voice = texttospeech.VoiceSelectionParams(
+        language_code=voice_config['language_code'],
+        name=voice_config['name'],
+        ssml_gender=texttospeech.SsmlVoiceGender[voice_config['ssml_gender']]
+    )
+
+    # Audio config with optional overrides
+    speaking_rate, pitch = prosody(lang, custom_rate, custom_pitch)
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding.MP3,
+        speaking_rate=speaking_rate,
+        pitch=pitch
+    )
+    return {"input": synthesis_input, "voice": voice, "audio_config": audio_config}
+
+async def synthesize_mp3_async(text: str, lang: str = "hi", **options) -> bytes:
+    """MP3 bytes for one sentence, from the audio cache or TTS, without blocking the event loop."""
+    key = audio_cache_key(text, lang, **options)
+    if not key[0]:
+        return b""
+    audio = _cached_audio(key)
+    if audio is not None:
+        return audio
+    request = build_synthesis_request(text, lang, **options)
+    async with _tts_slots:
+        with track_upstream("tts"):
+            response = await get_async_tts_client().synthesize_speech(**request)
+    _store_audio(key, response.audio_content)
+    return response.audio_content
+
+async def iter_reply_audio(text: str, lang: str = "hi", **options):
+    """Yield MP3 segments in sentence order.
+
+    Every sentence is synthesized concurrently; the first segment is yielded as
+    soon as its own synthesis finishes, while the rest are still in flight.
+    """
+    tasks = [asyncio.create_task(synthesize_mp3_async(s, lang, **options)) for s in split_sentences(text)]
+    try:
+        for task in tasks:
+            try:
+                audio = await task
+            except Exception as e:
+                print(f"❌ TTS failed for sentence: {e}")
+                continue
+            if audio:
+                yield audio
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def generate_voice_async(summary_text: str, lang: str = "hi", **options) -> str:
+    """Async generate_voice: concurrent sentence synthesis, stored as one MP3 in uploadvoices/."""
+    try:
+        audio = b"".join([segment async for segment in iter_reply_audio(summary_text, lang, **options)])
+        if not audio:
+            return None
+        voice_filename = await asyncio.to_thread(store_blob, UPLOAD_VOICE_DIR, audio, ".mp3")
+        print(f"✅ Voice file generated: {UPLOAD_VOICE_DIR}/{voice_filename}")
+        return voice_filename
+    except Exception as e:
+        print(f"❌ TTS failed: {e}")
+        return None
+
+def _synthesize_sentence(text: str, lang: str, options: dict) -> bytes:
+    key = audio_cache_key(text, lang, **options)
+    if not key[0]:
+        return b""
+    audio = _cached_audio(key)
+    if audio is not None:
+        return audio
+    request = build_synthesis_request(text, lang, **options)
+    with track_upstream("tts"):
+        response = get_tts_client().synthesize_speech(**request)
+    _store_audio(key, response.audio_content)
+    return response.audio_content
+
 def generate_voice(
     summary_text: str, 
     lang: str = "hi", 
@@ -23,66 +208,19 @@ def generate_voice(
     
     Backward-compatible: Defaults to plain text (no SSML) and standard config.
     For enhanced pronunciation (e.g., Hindi/Punjabi), set use_ssml=True.
+    Sentences are synthesized in parallel on the shared client and concatenated.
     """
-    voice_filename = f"{uuid.uuid4().hex}.mp3"
-    file_path = os.path.join(UPLOAD_VOICE_DIR, voice_filename)
-
-    # Map app's lang codes to Google Cloud TTS voice settings
-    voice_map = {
-        'hi': {'language_code': 'hi-IN', 'name': 'hi-IN-Wavenet-A', 'ssml_gender': 'FEMALE'},
-        'hinglish': {'language_code': 'hi-IN', 'name': 'hi-IN-Wavenet-A', 'ssml_gender': 'FEMALE'},
-        'en': {'language_code': 'en-IN', 'name': 'en-IN-Wavenet-C', 'ssml_gender': 'FEMALE'},
-        'pa': {'language_code': 'pa-IN', 'name': 'pa-IN-Wavenet-A', 'ssml_gender': 'FEMALE'}
-        # Add more as needed
-    }
-    voice_config = voice_map.get(lang, voice_map['hi'])  # Default to Hindi for Hinglish
-
     try:
-        # Clean the text (always, for compatibility)
-        cleaned_text = re.sub(r'\\n', ' ', summary_text)  # Replace \n with space
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)  # Normalize multiple spaces
-        cleaned_text = re.sub(r'[^\w\s.,!?]', '', cleaned_text)  # Keep only letters, numbers, and basic punctuation
-        cleaned_text = cleaned_text.strip()  # Remove leading/trailing spaces
-
-        # SSML enhancement (optional)
-        input_text = cleaned_text
-        if use_ssml:
-            ssml_text = f"<speak>{cleaned_text}</speak>"
-            # Add phonetic hints for specific words (language-specific)
-            if lang in ['hi', 'hinglish']:
-                ssml_text = ssml_text.replace("Diplocarpon", "<phoneme alphabet='ipa' ph='dɪploʊˈkɑːrpən'>Diplocarpon</phoneme>")
-                # Add more: e.g., ssml_text = ssml_text.replace("patton", "<phoneme alphabet='ipa' ph='pət̪ən'>patton</phoneme>")
-            elif lang == 'pa':
-                ssml_text = ssml_text.replace("ਸੰਭਾਲ", "<phoneme alphabet='ipa' ph='səmˈbʱaːl'>ਸੰਭਾਲ</phoneme>")
-                # Add more Punjabi words as needed
-            input_text = ssml_text  # Use SSML if enabled
-
-        client = texttospeech.TextToSpeechClient()
-        synthesis_input = texttospeech.SynthesisInput(ssml=input_text if use_ssml else cleaned_text)  # SSML or plain
-
-        voice = texttospeech.VoiceSelectionParams(
-            language_code=voice_config['language_code'],
-            name=voice_config['name'],
-            ssml_gender=texttospeech.SsmlVoiceGender[voice_config['ssml_gender']]
-        )
-
-        # Audio config with optional overrides
-        base_rate = 0.95 if lang in ['hi', 'hinglish', 'pa'] else 1.0
-        base_pitch = -0.5 if lang in ['hi', 'hinglish', 'pa'] else 0.0
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3,
-            speaking_rate=custom_rate or base_rate,  # Use custom if provided, else base
-            pitch=custom_pitch or base_pitch        # Use custom if provided, else base
-        )
-
-        response = client.synthesize_speech(
-            input=synthesis_input, voice=voice, audio_config=audio_config
-        )
-
-        with open(file_path, 'wb') as out:
-            out.write(response.audio_content)
-        print(f"✅ Voice file generated: {file_path} (SSML: {use_ssml})")
+        options = {"use_ssml": use_ssml, "custom_rate": custom_rate, "custom_pitch": custom_pitch}
+        sentences = split_sentences(summary_text)
+        audio = b"".join(_tts_pool.map(lambda sentence: _synthesize_sentence(sentence, lang, options), sentences))
+        if not audio:
+            return None
+
+        # Content-addressed: an identical reply reuses the existing file
+        voice_filename = store_blob(UPLOAD_VOICE_DIR, audio, ".mp3")
+        print(f"✅ Voice file generated: {UPLOAD_VOICE_DIR}/{voice_filename} (SSML: {use_ssml})")
         return voice_filename
     except Exception as e:
         print(f"❌ TTS failed: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,166 @@
+"""Build the bundled location data: district_points.json.gz (reverse_geocoder.py)
+and states_districts.json (regions.py).
+
+Source: the India Post office directory with coordinates (data.gov.in,
+redistributed as pins.json.bz2 in the MIT-licensed `indiapins` package),
+one JSON object per line with State, District, Latitude and Longitude.
+
+    python -m location_detector.build_district_index /path/to/pins.json.bz2
+
+states_districts.json lists every state and district in the directory.
+For district_points.json.gz, dropped as source errors: offices without usable coordinates, placeholder
+coordinates shared by offices of different districts (the same point is
+reused for hundreds of offices), offices implausibly far from the rest of
+their district, and offices whose nearest neighbours all belong to other
+districts. The remaining points are thinned to one per district per
+CELL_DEGREES grid cell.
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import re
+from collections import Counter, defaultdict
+import numpy as np
+from scipy.spatial import cKDTree
+
+OUTPUT = os.path.join(os.path.dirname(__file__), "district_points.json.gz")
+REGIONS_OUTPUT = os.path.join(os.path.dirname(__file__), "states_districts.json")
+SOURCE = "India Post office directory (data.gov.in) via indiapins 1.1.0"
+INDIA_BOUNDS = ((6.0, 38.0), (68.0, 98.0))  # (lat range, lon range)
+CELL_DEGREES = 0.02  # ~2 km
+# A coordinate shared by several districts is kept only for one holding this share of its offices
+SHARED_COORD_MAJORITY = 0.8
+# An office further than OUTLIER_MIN_KM + OUTLIER_MEDIAN_FACTOR x the district's
+# median spread from the district's median point is a source error
+OUTLIER_MIN_KM = 20
+OUTLIER_MEDIAN_FACTOR = 3
+# ...and so is one with fewer than this many same-district offices among its 10 nearest
+NEIGHBOUR_CHECK_K = 10
+NEIGHBOUR_MIN_SAME = 2
+SMALL_WORDS = {"and", "of", "the"}
+ACRONYMS = {"NTR"}
+
+
+def _title_word(word: str) -> str:
+    if "." in word or word.upper() in ACRONYMS:
+        return word.upper()  # initials: S.A.S Nagar, Y.S.R., NTR
+    return re.sub(r"[a-z]+", lambda match: match.group().capitalize(), word.lower())
+
+
+def display_name(raw: str) -> str:
+    """'THE DADRA AND NAGAR HAVELI AND DAMAN AND DIU' -> 'Dadra and Nagar Haveli and Daman and Diu'."""
+    words = raw.strip().split()
+    if words and words[0].upper() == "THE":
+        words = words[1:]
+    return " ".join(
+        word.lower() if i and word.lower() in SMALL_WORDS else _title_word(word)
+        for i, word in enumerate(words)
+    )
+
+
+def read_offices(path: str) -> tuple:
+    """({state: set of districts} for all offices,
+    (state, district) -> [(lat, lon)] for offices with usable coordinates inside India)."""
+    (lat_min, lat_max), (lon_min, lon_max) = INDIA_BOUNDS
+    regions = defaultdict(set)
+    offices = []
+    with bz2.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            office = json.loads(line)
+            lat, lon = office.get("Latitude"), office.get("Longitude")
+            state, district = office.get("State"), office.get("District")
+            if not (state and district):
+                continue
+            regions[display_name(state)].add(display_name(district))
+            # A few coordinates are free text ("28.43° N"); they are rare enough to skip
+            if not (isinstance(lat, (int, float)) and isinstance(lon, (int, float))):
+                continue
+            if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
+                offices.append(((lat, lon), (display_name(state), display_name(district))))
+
+    owners = defaultdict(Counter)
+    for point, key in offices:
+        owners[point][key] += 1
+    by_district = defaultdict(list)
+    for point, key in offices:
+        (owner, count), = owners[point].most_common(1)
+        if owner == key and count >= SHARED_COORD_MAJORITY * sum(owners[point].values()):
+            by_district[key].append(point)
+    return regions, by_district
+
+
+def drop_outliers(points: list) -> list:
+    coords = np.array(points)
+    median = np.median(coords, axis=0)
+    km = 111.2 * np.hypot(coords[:, 0] - median[0], (coords[:, 1] - median[1]) * np.cos(np.radians(median[0])))
+    limit = OUTLIER_MIN_KM + OUTLIER_MEDIAN_FACTOR * np.median(km)
+    return [point for point, distance in zip(points, km) if distance <= limit]
+
+
+def drop_isolated(points: list, labels: list) -> tuple:
+    """Drop points with fewer than NEIGHBOUR_MIN_SAME same-label points among their nearest."""
+    coords = np.radians(np.array(points))
+    xyz = np.column_stack((np.cos(coords[:, 0]) * np.cos(coords[:, 1]),
+                           np.cos(coords[:, 0]) * np.sin(coords[:, 1]), np.sin(coords[:, 0])))
+    _, neighbours = cKDTree(xyz).query(xyz, k=NEIGHBOUR_CHECK_K + 1)
+    labels = np.array(labels)
+    same = (labels[neighbours[:, 1:]] == labels[:, None]).sum(axis=1)
+    keep = same >= NEIGHBOUR_MIN_SAME
+    return [point for point, kept in zip(points, keep) if kept], labels[keep].tolist()
+
+
+def build(path: str) -> tuple:
+    """(district points, regions) as written to OUTPUT and REGIONS_OUTPUT."""
+    regions, offices = read_offices(path)
+    states = sorted({state for state, _ in offices})
+    districts = sorted(offices)
+    points, labels = [], []
+    for district_id, key in enumerate(districts):
+        kept = drop_outliers(offices[key])
+        points += kept
+        labels += [district_id] * len(kept)
+    points, labels = drop_isolated(points, labels)
+
+    lat, lon, district_ids = [], [], []
+    cells = set()
+    for (point_lat, point_lon), district_id in zip(points, labels):
+        cell = (district_id, round(point_lat / CELL_DEGREES), round(point_lon / CELL_DEGREES))
+        if cell in cells:
+            continue
+        cells.add(cell)
+        lat.append(round(point_lat * 1e4))
+        lon.append(round(point_lon * 1e4))
+        district_ids.append(district_id)
+    points = {
+        "source": SOURCE,
+        "scale": 1e4,
+        "states": states,
+        "districts": [[states.index(state), district] for state, district in districts],
+        "lat": lat,
+        "lon": lon,
+        "district": district_ids,
+    }
+    return points, {"source": SOURCE, "states": {state: sorted(regions[state]) for state in sorted(regions)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pins", help="path to pins.json.bz2")
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--regions-output", default=REGIONS_OUTPUT)
+    args = parser.parse_args()
+    data, regions = build(args.pins)
+    with gzip.open(args.output, "wt", encoding="utf-8", compresslevel=9) as file:
+        json.dump(data, file, separators=(",", ":"))
+    print(f"✅ {len(data['lat'])} points, {len(data['districts'])} districts, "
+          f"{len(data['states'])} states -> {args.output} ({os.path.getsize(args.output) // 1024} KB)")
+    with open(args.regions_output, "w", encoding="utf-8") as file:
+        json.dump(regions, file, ensure_ascii=False, indent=0)
+    print(f"✅ {sum(map(len, regions['states'].values()))} districts in {len(regions['states'])} states "
+          f"-> {args.regions_output} ({os.path.getsize(args.regions_output) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
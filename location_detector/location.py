@@ -1,19 +1,23 @@
-import requests
+from location_detector.reverse_geocoder import reverse_geocode
+
 
 def get_location_from_coords(lat: float, lon: float) -> dict:
-    url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json"
-    try:
-        resp = requests.get(url, headers={"User-Agent": "farmer-app"})
-        resp.raise_for_status()
-        data = resp.json()
-        address = data.get("address", {})
-        state = address.get("state", "Unknown")
-        district = (
-            address.get("county") or 
-            address.get("state_district") or 
-            "Unknown"
-        )
-        return {"state": state, "district": district}
-    except Exception as e:
-        print("Error fetching location:", str(e))
+    # Offline lookup (see reverse_geocoder.py); no network, no rate limit
+    match = reverse_geocode(lat, lon)
+    if match is None:
         return {"state": "Unknown", "district": "Unknown"}
+    return {"state": match["state"], "district": match["district"]}
+
+
+def with_region(location: dict) -> dict:
+    """A copy of a stored user location with state/district filled in from lat/lon when missing."""
+    location = dict(location or {})
+    if location.get("state") and location.get("district"):
+        return location
+    if location.get("lat") is None or location.get("lon") is None:
+        return location
+    match = reverse_geocode(location["lat"], location["lon"])
+    if match:
+        location["state"] = location.get("state") or match["state"]
+        location["district"] = location.get("district") or match["district"]
+    return location
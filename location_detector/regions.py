@@ -0,0 +1,173 @@
+"""States and districts of India, with a normalized lookup index for validation and autocomplete.
+
+states_districts.json is bundled (built with build_district_index.py from the
+same India Post directory as the reverse geocoder, so names agree); loading
+and indexing it takes about 10 ms at import. Nothing is fetched over the
+network.
+
+Names are matched after normalization: case, punctuation, "&" vs "and" and
+spacing do not matter ("jammu & kashmir" == "Jammu and Kashmir",
+"sas nagar" == "S.A.S Nagar"). Former names, abbreviations and common
+spellings resolve through STATE_ALIASES / DISTRICT_ALIASES ("Orissa",
+"Gurgaon", "UP"). `search` completes prefixes of any word of a name and
+falls back to fuzzy matching for misspelt queries ("ludhyana").
+"""
+import bisect
+import difflib
+import json
+import os
+import re
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "states_districts.json")
+SEARCH_LIMIT = 10
+FUZZY_CUTOFF = 0.8
+FUZZY_MIN_CHARS = 4
+
+STATE_ALIASES = {
+    "orissa": "Odisha", "pondicherry": "Puducherry", "uttaranchal": "Uttarakhand",
+    "nct of delhi": "Delhi", "new delhi": "Delhi", "andhra": "Andhra Pradesh", "bengal": "West Bengal",
+    "kashmir": "Jammu and Kashmir", "jk": "Jammu and Kashmir", "andaman": "Andaman and Nicobar Islands",
+    "up": "Uttar Pradesh", "mp": "Madhya Pradesh", "ap": "Andhra Pradesh", "wb": "West Bengal",
+    "hp": "Himachal Pradesh", "tn": "Tamil Nadu", "uk": "Uttarakhand", "cg": "Chhattisgarh",
+    "dnh": "Dadra and Nagar Haveli and Daman and Diu", "daman and diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "dadra and nagar haveli": "Dadra and Nagar Haveli and Daman and Diu",
+}
+
+# Former names and common spellings -> (state, district) as spelt in the data
+DISTRICT_ALIASES = {
+    "gurgaon": ("Haryana", "Gurugram"), "mewat": ("Haryana", "Nuh"),
+    "mohali": ("Punjab", "S.A.S Nagar"), "sahibzada ajit singh nagar": ("Punjab", "S.A.S Nagar"),
+    "nawanshahr": ("Punjab", "Shahid Bhagat Singh Nagar"), "ropar": ("Punjab", "Rupnagar"),
+    "ferozepur": ("Punjab", "Firozepur"), "firozpur": ("Punjab", "Firozepur"),
+    "allahabad": ("Uttar Pradesh", "Prayagraj"), "faizabad": ("Uttar Pradesh", "Ayodhya"),
+    "kanpur": ("Uttar Pradesh", "Kanpur Nagar"), "sant kabir nagar": ("Uttar Pradesh", "Sant Kabeer Nagar"),
+    "bombay": ("Maharashtra", "Mumbai"), "poona": ("Maharashtra", "Pune"),
+    "ahmedabad": ("Gujarat", "Ahmadabad"), "baroda": ("Gujarat", "Vadodara"),
+    "calcutta": ("West Bengal", "Kolkata"), "north 24 parganas": ("West Bengal", "24 Paraganas North"),
+    "south 24 parganas": ("West Bengal", "24 Paraganas South"),
+    "madras": ("Tamil Nadu", "Chennai"), "trichy": ("Tamil Nadu", "Tiruchirappalli"),
+    "bangalore": ("Karnataka", "Bengaluru Urban"), "bengaluru": ("Karnataka", "Bengaluru Urban"),
+    "mysore": ("Karnataka", "Mysuru"), "belgaum": ("Karnataka", "Belagavi"),
+    "gulbarga": ("Karnataka", "Kalaburagi"), "shimoga": ("Karnataka", "Shivamogga"),
+    "trivandrum": ("Kerala", "Thiruvananthapuram"), "calicut": ("Kerala", "Kozhikode"),
+    "cochin": ("Kerala", "Ernakulam"), "kochi": ("Kerala", "Ernakulam"),
+    "vizag": ("Andhra Pradesh", "Visakhapatanam"), "visakhapatnam": ("Andhra Pradesh", "Visakhapatanam"),
+    "kadapa": ("Andhra Pradesh", "Y.S.R."), "cuddapah": ("Andhra Pradesh", "Y.S.R."),
+    "bhabua": ("Bihar", "Kaimur (Bhabua)"),
+}
+
+
+def normalize(text: str) -> str:
+    """Lowercase, '&' -> 'and', initials joined ('S.A.S' -> 'sas'), other punctuation -> spaces."""
+    text = str(text or "").lower().replace("&", " and ").replace(".", "")
+    return " ".join(re.findall(r"\w+", text))
+
+
+class RegionIndex:
+    def __init__(self, path: str = DATA_FILE):
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        self.states_and_districts = data["states"]  # state -> [districts], both sorted
+        self._states = {}     # normalized name/alias -> state
+        self._districts = {}  # normalized name/alias -> [(state, district)]
+        entries = []          # (normalized word suffix, rank, state, district or None)
+
+        for state, districts in self.states_and_districts.items():
+            self._states[normalize(state)] = state
+            entries += self._suffixes(normalize(state), 0, state, None)
+            for district in districts:
+                self._districts.setdefault(normalize(district), []).append((state, district))
+                entries += self._suffixes(normalize(district), 1, state, district)
+        for alias, state in STATE_ALIASES.items():
+            if state in self.states_and_districts:
+                self._states.setdefault(alias, state)
+                entries += self._suffixes(alias, 0, state, None)
+        for alias, (state, district) in DISTRICT_ALIASES.items():
+            if district in self.states_and_districts.get(state, ()):
+                self._districts.setdefault(alias, []).append((state, district))
+                entries += self._suffixes(alias, 1, state, district)
+
+        entries.sort()
+        self._keys = [entry[0] for entry in entries]
+        self._entries = entries
+
+    @staticmethod
+    def _suffixes(key: str, rank: int, state: str, district):
+        """Index entries for every word start, so 'nagar' completes 'S.A.S Nagar' too."""
+        words = key.split()
+        # Whole-name matches rank ahead of inner-word matches
+        return [(" ".join(words[i:]), rank + 2 * (i > 0), state, district) for i in range(len(words))]
+
+    def states(self) -> list:
+        return list(self.states_and_districts)
+
+    def districts(self, state: str) -> list:
+        state = self.resolve_state(state)
+        return list(self.states_and_districts[state]) if state else []
+
+    def resolve_state(self, name: str):
+        """Canonical state name for a name, alias or near-miss spelling; None if unknown."""
+        key = normalize(name)
+        if key in self._states:
+            return self._states[key]
+        close = difflib.get_close_matches(key, self._states, n=1, cutoff=FUZZY_CUTOFF) if len(key) >= FUZZY_MIN_CHARS else []
+        return self._states[close[0]] if close else None
+
+    def resolve_district(self, name: str, state: str = None):
+        """(state, district) for a district name or alias, None if unknown or ambiguous.
+
+        Names shared by several states (Aurangabad, Bilaspur, ...) need `state`.
+        """
+        key = normalize(name)
+        state = self.resolve_state(state) if state else None
+        matches = self._districts.get(key)
+        if matches is None and len(key) >= FUZZY_MIN_CHARS:
+            close = difflib.get_close_matches(key, self._districts, n=1, cutoff=FUZZY_CUTOFF)
+            matches = self._districts[close[0]] if close else None
+        if state:
+            matches = [match for match in matches or () if match[0] == state]
+        return matches[0] if matches and len(matches) == 1 else None
+
+    def search(self, query: str, state: str = None, limit: int = SEARCH_LIMIT) -> list:
+        """States and districts matching a typed prefix, best first; fuzzy when nothing matches.
+
+        Results: [{"type": "state" | "district", "name", "state"}]. With `state`,
+        only that state's districts are returned.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        if state:
+            state = self.resolve_state(state)
+            if state is None:
+                return []
+
+        start = bisect.bisect_left(self._keys, query)
+        end = bisect.bisect_left(self._keys, query + "\uffff", lo=start)
+        # Whole-name matches first, then shorter names
+        scored = [((entry[1], len(entry[0])), entry) for entry in self._entries[start:end]]
+        if not scored and len(query) >= FUZZY_MIN_CHARS:
+            # Misspelt: compare with a slightly longer prefix of each indexed key
+            matcher = difflib.SequenceMatcher(b=query)
+            for entry in self._entries:
+                matcher.set_seq1(entry[0][:len(query) + 1])
+                if matcher.real_quick_ratio() >= FUZZY_CUTOFF and matcher.quick_ratio() >= FUZZY_CUTOFF:
+                    ratio = matcher.ratio()
+                    if ratio >= FUZZY_CUTOFF:
+                        scored.append(((-ratio, entry[1], len(entry[0])), entry))
+
+        results, seen = [], set()
+        for _, (_, _, entry_state, district) in sorted(scored, key=lambda item: item[0]):
+            if state and (district is None or entry_state != state):
+                continue
+            if (entry_state, district) in seen:
+                continue
+            seen.add((entry_state, district))
+            results.append({"type": "district" if district else "state", "name": district or entry_state,
+                            "state": entry_state})
+            if len(results) >= limit:
+                break
+        return results
+
+
+regions = RegionIndex()
@@ -0,0 +1,95 @@
+"""Offline reverse geocoding of Indian coordinates to (state, district).
+
+district_points.json.gz (see build_district_index.py) holds about 87k post
+office locations labelled with their state and district. They are indexed
+in a KD-tree on unit-sphere coordinates, so chord distance ranks neighbours
+like great-circle distance. A lookup takes a distance-weighted vote among
+the REVERSE_GEOCODE_NEIGHBOURS nearest offices, which smooths out
+mislabelled offices near district borders. No network, and a few tens of
+microseconds per call (repeated coordinates are cached).
+
+Loading the points and building the tree takes a fraction of a second, so
+the app does it at startup (main.py lifespan) through get_geocoder().
+
+Points further than REVERSE_GEOCODE_MAX_KM from any office (outside India,
+offshore) resolve to None.
+"""
+import gzip
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+from functools import lru_cache
+import numpy as np
+from scipy.spatial import cKDTree
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "district_points.json.gz")
+REVERSE_GEOCODE_NEIGHBOURS = int(os.getenv("REVERSE_GEOCODE_NEIGHBOURS", "9"))
+REVERSE_GEOCODE_MAX_KM = float(os.getenv("REVERSE_GEOCODE_MAX_KM", "75"))
+EARTH_RADIUS_KM = 6371.0
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class ReverseGeocoder:
+    def __init__(self, path: str = DATA_FILE):
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            data = json.load(file)
+        scale = data["scale"]
+        self.states = data["states"]
+        self.districts = [(self.states[state], name) for state, name in data["districts"]]
+        self.point_district = np.array(data["district"], dtype=np.int32)
+        self.tree = cKDTree(_unit_vectors(np.array(data["lat"]) / scale, np.array(data["lon"]) / scale))
+        # Chord length on the unit sphere for REVERSE_GEOCODE_MAX_KM of arc
+        self.max_chord = 2 * math.sin(REVERSE_GEOCODE_MAX_KM / EARTH_RADIUS_KM / 2)
+
+    def lookup(self, lat: float, lon: float, k: int = REVERSE_GEOCODE_NEIGHBOURS):
+        """{"state", "district", "distance_km"} for the point, or None outside coverage."""
+        chords, indices = self.tree.query(_unit_vectors(lat, lon)[0], k=k, distance_upper_bound=self.max_chord)
+        chords, indices = np.atleast_1d(chords), np.atleast_1d(indices)
+        found = indices < len(self.point_district)
+        if not found.any():
+            return None
+        votes = defaultdict(float)
+        for chord, index in zip(chords[found], indices[found]):
+            votes[self.point_district[index]] += 1.0 / (chord + 1e-7)
+        state, district = self.districts[max(votes, key=votes.get)]
+        nearest_km = 2 * math.asin(min(1.0, chords[found][0] / 2)) * EARTH_RADIUS_KM
+        return {"state": state, "district": district, "distance_km": round(nearest_km, 2)}
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> ReverseGeocoder:
+    """The shared geocoder, built on first use (blocking; call it from a thread in async code)."""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = ReverseGeocoder()
+                print(f"✅ Reverse geocoder loaded ({len(_geocoder.point_district)} points, {len(_geocoder.districts)} districts)")
+    return _geocoder
+
+
+@lru_cache(maxsize=4096)
+def _cached_lookup(lat: float, lon: float):
+    return get_geocoder().lookup(lat, lon)
+
+
+def reverse_geocode(lat: float, lon: float):
+    """{"state", "district", "distance_km"} for Indian coordinates, None elsewhere or for bad input."""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    # ~11 m grid: nearby repeat lookups (same farm, same user) hit the cache
+    result = _cached_lookup(round(lat, 4), round(lon, 4))
+    return dict(result) if result else None
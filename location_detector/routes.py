@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Query
+from location_detector.regions import regions, SEARCH_LIMIT
+
+router = APIRouter()
+
+
+@router.get("/states")
+async def list_states():
+    return {"states": regions.states()}
+
+
+@router.get("/states/{state}/districts")
+async def list_districts(state: str):
+    """Districts of a state; the state may be given by alias or any casing ("orissa", "UP")."""
+    canonical = regions.resolve_state(state)
+    if canonical is None:
+        raise HTTPException(status_code=404, detail=f"Unknown state: {state}")
+    return {"state": canonical, "districts": regions.districts(canonical)}
+
+
+@router.get("/search")
+async def search_regions(q: str = Query(..., min_length=1, max_length=100), state: str = None,
+                         limit: int = Query(SEARCH_LIMIT, ge=1, le=50)):
+    """Autocomplete over states and districts (prefix of any word, aliases, fuzzy for typos)."""
+    return {"query": q, "results": regions.search(q, state=state, limit=limit)}
+
+
+@router.get("/resolve")
+async def resolve_region(state: str = None, district: str = None):
+    """Canonical spelling of a state and/or district, for validating free-text input."""
+    if not state and not district:
+        raise HTTPException(status_code=400, detail="Give a state, a district or both")
+    canonical_state = regions.resolve_state(state) if state else None
+    if state and canonical_state is None:
+        raise HTTPException(status_code=404, detail=f"Unknown state: {state}")
+    if not district:
+        return {"state": canonical_state, "district": None}
+    match = regions.resolve_district(district, state=canonical_state)
+    if match is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or ambiguous district: {district}")
+    return {"state": match[0], "district": match[1]}
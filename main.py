@@ -1,6 +1,9 @@
 
 
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from auth.routes import router as auth_router
 from chatbot.routes import router as chatbot_router
@@ -12,10 +15,49 @@ from Cart.routes import router as cart_router
 from Crop_management.routes import router as crop_router
 from Market.routes import router as market_router 
 from scan_soilcard.routes import app as soil_card_router
+from storage.retention import retention_loop
+from auth.database import bootstrap_database, connect as connect_database, close as close_database
+from monitoring.routes import router as monitoring_router
+from location_detector.routes import router as location_router
+from monitoring.metrics import HTTP_REQUEST_SECONDS
+from chatbot.gemini_client import gemini_client
+from storage.write_behind import write_behind
+from auth.user_cache import user_cache, AUTH_USER_CACHE_WATCH
+from location_detector.reverse_geocoder import get_geocoder
 
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    connect_database()
+    # Indexes and validators before serving, so the first queries are not collection scans
+    try:
+        await bootstrap_database()
+    except Exception as e:
+        print(f"❌ Database bootstrap failed: {e}")
+    # Build the reverse geocoder's KD-tree now rather than inside the first request that needs a region
+    try:
+        await asyncio.to_thread(get_geocoder)
+    except Exception as e:
+        print(f"❌ Reverse geocoder failed to load: {e}")
+    # Periodic retention GC for uploadimages/, uploadvoices/ and uploadaudio/
+    storage_gc = asyncio.create_task(retention_loop())
+    write_behind.start()
+    # Cross-worker invalidation of cached users (needs a replica set)
+    user_watch = asyncio.create_task(user_cache.watch()) if AUTH_USER_CACHE_WATCH else None
+    try:
+        yield
+    finally:
+        await write_behind.stop()
+        storage_gc.cancel()
+        if user_watch:
+            user_watch.cancel()
+        await gemini_client.aclose()
+        # Last: the write-behind flush above still needs the connection
+        close_database()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.mount("/uploadvoices", StaticFiles(directory="uploadvoices"), name="uploadvoices")
 app.mount("/uploadimages", StaticFiles(directory="uploadimages"), name="uploadimages")
@@ -29,6 +71,25 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (e.g. /auth/profile/{phone}) to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(chatbot_router, prefix="/chat", tags=["chat"])
 app.include_router(weather_router, prefix="/weather", tags=["weather"])
@@ -38,6 +99,8 @@ app.include_router(cart_router, prefix="/cart", tags=["cart"])
 app.include_router(crop_router, prefix="/crop", tags=["crop"])
 app.include_router(market_router, prefix="/farmer", tags=["Farmer Price Tracker"])
 app.include_router(soil_card_router, prefix="/soil-card", tags=["Soil card analysis"])
+app.include_router(location_router, prefix="/locations", tags=["locations"])
+app.include_router(monitoring_router, tags=["monitoring"])
 
 @app.get("/")
 async def root():
@@ -1,7 +1,8 @@
 import numpy as np
 import pandas as pd
-import requests
 from datetime import datetime
+from monitoring.metrics import track_upstream
+from replay.transports import upstream_session
 
 class CropAdvisor:
     def __init__(self):
@@ -59,8 +60,9 @@ class CropAdvisor:
         try:
             # Step 1: Get coordinates from wttr.in
             coord_url = f"http://wttr.in/{location}?format=j1"
-            coord_resp = requests.get(coord_url, timeout=10)
-            coord_resp.raise_for_status()
+            with track_upstream("wttr"):
+                coord_resp = upstream_session.get(coord_url, timeout=10)
+                coord_resp.raise_for_status()
             coord_data = coord_resp.json()
 
             area = coord_data.get("nearest_area", [{}])[0]
@@ -77,8 +79,9 @@ class CropAdvisor:
                 "longitude": lon,
             }
 
-            nasa_resp = requests.get(nasa_url, params=params, timeout=15)
-            nasa_resp.raise_for_status()
+            with track_upstream("nasa_power"):
+                nasa_resp = upstream_session.get(nasa_url, params=params, timeout=15)
+                nasa_resp.raise_for_status()
             nasa_data = nasa_resp.json()
 
             # Step 3: Extract latest values
@@ -0,0 +1,289 @@
+"""Minimal in-process metrics registry rendered in the Prometheus text format.
+
+Kept dependency-free on purpose: counters, gauges and histograms with labels,
+safe to update from request handlers and from worker threads.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def values(self) -> dict:
+        """Snapshot of every label set, keyed by label-value tuple."""
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """Evaluate fn() at scrape time instead of storing a value."""
+        self._functions[self._key(labels)] = fn
+
+    def render(self) -> list:
+        for key, fn in list(self._functions.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            with self._lock:
+                self._values[key] = value
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def summary(self, **labels) -> tuple:
+        """(count, sum) observed so far for one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state["count"], state["sum"]) if state else (0, 0.0)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]})
+                           for key, s in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# Application metrics
+# -------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status")
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds", "Latency of individual pipeline stages.",
+    ("pipeline", "stage")
+)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "upstream_request_duration_seconds", "Duration of calls to external services.",
+    ("upstream",)
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_duration_seconds", "Duration of MongoDB data commands.",
+    ("command", "collection"), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+MONGO_SLOW_QUERIES = Counter(
+    "mongo_slow_queries_total", "MongoDB data commands slower than MONGO_SLOW_QUERY_MS.",
+    ("command", "collection")
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections", "MongoDB pool connections across servers by state (open, in_use, waiting for one).",
+    ("state",)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Failed MongoDB connection checkouts by reason (timeout, connectionError, poolClosed).",
+    ("reason",)
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Failed calls to external services.",
+    ("upstream",)
+)
+MODEL_BATCH_SIZE = Histogram(
+    "model_inference_batch_size", "Number of images per model inference call.",
+    (), buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+CHAT_TTFT_SECONDS = Histogram(
+    "chat_time_to_first_token_seconds", "Time from request to the first streamed chat token.",
+    ("endpoint",)
+)
+ANSWER_CACHE_REQUESTS = Counter(
+    "answer_cache_requests_total", "Chat answer cache lookups by result (hit, similar_hit, miss).",
+    ("result",)
+)
+ANSWER_CACHE_HIT_RATIO = Gauge(
+    "answer_cache_hit_ratio", "Fraction of chat answer cache lookups served from cache."
+)
+TTS_CACHE_REQUESTS = Counter(
+    "tts_cache_requests_total", "Sentence audio cache lookups by result (hit, miss).",
+    ("result",)
+)
+TTS_CACHE_BYTES = Gauge(
+    "tts_cache_bytes", "MP3 bytes held in the sentence audio cache."
+)
+INTENT_ROUTER_REQUESTS = Counter(
+    "intent_router_requests_total", "Chat prompts seen by the intent router, by intent and outcome (answered, missing_slot, engine_error, llm).",
+    ("intent", "outcome")
+)
+INTENT_ROUTER_HIT_RATIO = Gauge(
+    "intent_router_hit_ratio", "Fraction of chat prompts answered by internal engines instead of Gemini."
+)
+INTENT_ROUTER_SECONDS_SAVED = Counter(
+    "intent_router_seconds_saved_total", "Estimated latency saved by the intent router (mean Gemini latency minus router time)."
+)
+AUTH_CACHE_REQUESTS = Counter(
+    "auth_cache_requests_total", "Authentication cache lookups by cache (token, user) and result (hit, miss).",
+    ("cache", "result")
+)
+AUTH_CACHE_INVALIDATIONS = Counter(
+    "auth_cache_invalidations_total", "Cached users dropped because the user document changed, by source (local, change_stream).",
+    ("source",)
+)
+KNOWLEDGE_BASE_LOOKUPS = Counter(
+    "knowledge_base_lookups_total", "Chat prompts looked up in the knowledge base, by outcome (direct, grounded, none).",
+    ("outcome",)
+)
+WRITE_BEHIND_BACKLOG = Gauge(
+    "write_behind_backlog", "Documents queued for a batched MongoDB insert.",
+    ("collection",)
+)
+WRITE_BEHIND_WRITTEN = Counter(
+    "write_behind_written_total", "Documents written by the write-behind buffer.",
+    ("collection",)
+)
+WRITE_BEHIND_DROPPED = Counter(
+    "write_behind_dropped_total", "Documents dropped by the write-behind buffer (overflow or rejected).",
+    ("collection",)
+)
+UPSTREAM_REPLAYS = Counter(
+    "upstream_replays_total", "Upstream calls served in replay mode, by fixture source (exact, endpoint, stub, error).",
+    ("upstream", "source")
+)
+GEMINI_COALESCED = Counter(
+    "gemini_coalesced_requests_total", "Gemini calls served by joining an identical in-flight request."
+)
+PREFILTER_DECISIONS = Counter(
+    "image_prefilter_total", "Images screened before the disease model, by outcome.",
+    ("outcome",)
+)
+PREFILTER_SHORT_CIRCUIT_RATIO = Gauge(
+    "image_prefilter_short_circuit_ratio", "Fraction of screened images rejected before the disease model."
+)
+
+
+@contextmanager
+def track_upstream(upstream: str):
+    """Time a call to an external service and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc(upstream=upstream)
+        raise
+    finally:
+        UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - start, upstream=upstream)
+
+
+def stage_timer(pipeline: str, stage: str):
+    return PIPELINE_STAGE_SECONDS.time(pipeline=pipeline, stage=stage)
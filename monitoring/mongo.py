@@ -0,0 +1,173 @@
+"""MongoDB command timing, slow-query statistics and connection pool usage.
+
+`command_listener` is registered on the Motor client. Every data command is
+timed into mongo_command_duration_seconds. Commands slower than MONGO_SLOW_QUERY_MS
+are also counted per query shape: the filter and sort with their values
+blanked out, so `{"phone": "98..."}` and `{"phone": "97..."}` share a shape.
+The first slow run of a shape is logged, and the totals are served on
+/metrics/slow-queries. A shape that keeps showing up there usually needs an
+index.
+
+`pool_listener` follows the driver's connection pool events to track, per
+server, how many connections are open, checked out and waited for. pymongo
+has no public API for these counts. They feed /health/db and the
+mongo_pool_* gauges.
+"""
+import os
+import threading
+from pymongo import monitoring
+from monitoring.metrics import (
+    MONGO_COMMAND_SECONDS, MONGO_SLOW_QUERIES, MONGO_POOL_CONNECTIONS, MONGO_POOL_CHECKOUT_FAILURES
+)
+
+MONGO_SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+# Distinct slow shapes kept; later new shapes are still counted in mongo_slow_queries_total
+MAX_SLOW_SHAPES = 500
+
+# command name -> where its filter is in the command document
+DATA_COMMANDS = {
+    "find": lambda c: c.get("filter"),
+    "aggregate": lambda c: next((stage["$match"] for stage in c.get("pipeline", []) if "$match" in stage), None),
+    "count": lambda c: c.get("query"),
+    "distinct": lambda c: c.get("query"),
+    "findAndModify": lambda c: c.get("query"),
+    "update": lambda c: (c.get("updates") or [{}])[0].get("q"),
+    "delete": lambda c: (c.get("deletes") or [{}])[0].get("q"),
+    "insert": lambda c: None,
+}
+
+
+def query_shape(value):
+    """`value` with every leaf replaced by 1 (operators and field names kept)."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(item) for item in value[:1]]
+    return 1
+
+
+class CommandListener(monitoring.CommandListener):
+    """Times data commands; called from the driver's threads."""
+
+    def __init__(self):
+        self._started = {}
+        self._lock = threading.Lock()
+        self.slow_shapes = {}  # (collection, command, shape) -> [count, total seconds, max seconds]
+
+    def started(self, event):
+        shape_of = DATA_COMMANDS.get(event.command_name)
+        if shape_of is None:
+            return
+        command = event.command
+        shape = {"filter": query_shape(shape_of(command) or {})}
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+        self._started[(event.connection_id, event.request_id)] = (str(command.get(event.command_name)), repr(shape))
+
+    def succeeded(self, event):
+        started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        collection, shape = started
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_SECONDS.observe(seconds, command=event.command_name, collection=collection)
+        if seconds * 1000 >= MONGO_SLOW_QUERY_MS:
+            self._record_slow(collection, event.command_name, shape, seconds)
+
+    def failed(self, event):
+        self._started.pop((event.connection_id, event.request_id), None)
+
+    def _record_slow(self, collection: str, command: str, shape: str, seconds: float):
+        MONGO_SLOW_QUERIES.inc(command=command, collection=collection)
+        key = (collection, command, shape)
+        with self._lock:
+            stats = self.slow_shapes.get(key)
+            if stats is None:
+                if len(self.slow_shapes) >= MAX_SLOW_SHAPES:
+                    return
+                stats = self.slow_shapes[key] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            first = stats[0] == 1
+        if first:
+            print(f"⚠️ Slow Mongo {command} on {collection} ({seconds * 1000:.0f} ms): {shape}")
+
+    def slow_query_stats(self, limit: int = 50) -> list:
+        """Slow query shapes, by total time spent, worst first."""
+        with self._lock:
+            items = list(self.slow_shapes.items())
+        items.sort(key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                "collection": collection, "command": command, "shape": shape, "count": count,
+                "total_ms": round(total * 1000, 1), "max_ms": round(worst * 1000, 1),
+            }
+            for (collection, command, shape), (count, total, worst) in items[:limit]
+        ]
+
+
+command_listener = CommandListener()
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Per-server connection counts from pool events; called from the driver's threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}  # "host:port" -> {"open", "in_use", "waiting"}
+
+    def _update(self, address, **deltas):
+        server = "%s:%s" % address
+        with self._lock:
+            pool = self._pools.setdefault(server, {"open": 0, "in_use": 0, "waiting": 0})
+            for field, delta in deltas.items():
+                pool[field] = max(0, pool[field] + delta)
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, waiting=-1)
+        MONGO_POOL_CHECKOUT_FAILURES.inc(reason=event.reason)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, waiting=-1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, in_use=-1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {server: dict(pool) for server, pool in self._pools.items()}
+
+    def total(self, field: str) -> int:
+        with self._lock:
+            return sum(pool[field] for pool in self._pools.values())
+
+
+pool_listener = PoolListener()
+for _state in ("open", "in_use", "waiting"):
+    MONGO_POOL_CONNECTIONS.set_function(lambda state=_state: pool_listener.total(state), state=_state)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from auth.database import health as database_health
+from monitoring.metrics import render_metrics
+from monitoring.mongo import command_listener
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/metrics/slow-queries", include_in_schema=False)
+async def slow_queries(limit: int = 50):
+    """MongoDB query shapes slower than MONGO_SLOW_QUERY_MS, by total time spent."""
+    return {"queries": command_listener.slow_query_stats(max(1, min(limit, 500)))}
+
+
+@router.get("/health/db")
+async def db_health():
+    """MongoDB ping latency and connection pool utilization (503 when the ping fails)."""
+    report = await database_health()
+    return JSONResponse(report, status_code=200 if report["status"] == "ok" else 503)
@@ -0,0 +1,105 @@
+"""Record/replay stand-ins for the Google Cloud Text-to-Speech and Speech-to-Text clients.
+
+`stand_in(cls, live_factory)` returns the real client in live mode, a
+recording wrapper around it in record mode and a pure stand-in in replay
+mode. Only the methods the app calls are provided (synthesize_speech,
+recognize); responses are stored as serialized protobuf messages.
+"""
+import asyncio
+import base64
+import hashlib
+import time
+from google.api_core.exceptions import from_http_status
+from replay.stubs import STUB_TRANSCRIPT, silent_mp3
+from replay.upstreams import record, recording, replay, replaying
+
+
+def _call_key(upstream: str, method: str, messages: dict) -> tuple:
+    endpoint = f"grpc {upstream}/{method}"
+    digest = hashlib.sha256(endpoint.encode())
+    for name, message in messages.items():
+        digest.update(name.encode())
+        digest.update(type(message).serialize(message))
+    return endpoint, digest.hexdigest()
+
+
+class GoogleStandIn:
+    upstream = None
+
+    def __init__(self, live=None, asynchronous: bool = True):
+        self._live = live
+        self.asynchronous = asynchronous
+
+    def _call(self, method: str, response_cls, stub, **messages):
+        call = self._acall if self.asynchronous else self._scall
+        return call(method, response_cls, stub, messages)
+
+    def _replay(self, method: str, response_cls, stub, messages: dict) -> tuple:
+        endpoint, key = _call_key(self.upstream, method, messages)
+        delay, fixture, error_status = replay(self.upstream, key, endpoint)
+
+        def result():
+            if error_status:
+                raise from_http_status(error_status, f"replayed {self.upstream} error")
+            if fixture is None:
+                return stub()
+            return response_cls.deserialize(base64.b64decode(fixture["message_b64"]))
+        return delay, result
+
+    def _record(self, method: str, messages: dict, response, latency: float):
+        endpoint, key = _call_key(self.upstream, method, messages)
+        message_b64 = base64.b64encode(type(response).serialize(response)).decode()
+        record(self.upstream, key, endpoint, {"message_b64": message_b64}, latency)
+
+    async def _acall(self, method, response_cls, stub, messages):
+        if self._live is None:
+            delay, result = self._replay(method, response_cls, stub, messages)
+            await asyncio.sleep(delay)
+            return result()
+        start = time.perf_counter()
+        response = await getattr(self._live, method)(**messages)
+        self._record(method, messages, response, time.perf_counter() - start)
+        return response
+
+    def _scall(self, method, response_cls, stub, messages):
+        if self._live is None:
+            delay, result = self._replay(method, response_cls, stub, messages)
+            time.sleep(delay)
+            return result()
+        start = time.perf_counter()
+        response = getattr(self._live, method)(**messages)
+        self._record(method, messages, response, time.perf_counter() - start)
+        return response
+
+
+class TextToSpeechStandIn(GoogleStandIn):
+    upstream = "tts"
+
+    def synthesize_speech(self, input, voice, audio_config):
+        from google.cloud import texttospeech
+        return self._call(
+            "synthesize_speech", texttospeech.SynthesizeSpeechResponse,
+            lambda: texttospeech.SynthesizeSpeechResponse(audio_content=silent_mp3(input.text or input.ssml)),
+            input=input, voice=voice, audio_config=audio_config,
+        )
+
+
+class SpeechStandIn(GoogleStandIn):
+    upstream = "stt"
+
+    def recognize(self, config, audio):
+        from google.cloud import speech_v1p1beta1 as speech
+
+        def stub():
+            alternative = speech.SpeechRecognitionAlternative(transcript=STUB_TRANSCRIPT, confidence=0.92)
+            result = speech.SpeechRecognitionResult(alternatives=[alternative], language_code="hi-in")
+            return speech.RecognizeResponse(results=[result])
+        return self._call("recognize", speech.RecognizeResponse, stub, config=config, audio=audio)
+
+
+def stand_in(cls, live_factory, asynchronous: bool = True):
+    """The client to use for the current UPSTREAM_MODE."""
+    if replaying():
+        return cls(None, asynchronous)
+    live = live_factory()
+    return cls(live, asynchronous) if recording() else live
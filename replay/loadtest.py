@@ -0,0 +1,84 @@
+"""Closed-loop load test against a running server, for use with UPSTREAM_MODE=replay.
+
+Start the app with upstreams replayed, then drive it:
+
+    UPSTREAM_MODE=replay REPLAY_SEED=1 uvicorn main:app --port 8000
+    python -m replay.loadtest --scenario chat --concurrency 32 --requests 2000
+
+Each worker sends its next request as soon as the previous one returns.
+Reports throughput, the latency percentiles seen by the client and the
+status codes. Compare the percentiles with the server's
+upstream_request_seconds histogram on /metrics to separate our own overhead
+from the (replayed) upstream time.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+PROMPTS = [
+    "Gehun mein peele patte kyon ho rahe hain?",
+    "What fertilizer should I use for paddy at tillering stage?",
+    "टमाटर में झुलसा रोग का इलाज क्या है?",
+    "Kapas mein safed makhi ka control kaise karein?",
+    "How much water does sugarcane need in summer?",
+    "ਕਣਕ ਦੀ ਬਿਜਾਈ ਦਾ ਸਹੀ ਸਮਾਂ ਕੀ ਹੈ?",
+]
+
+SCENARIOS = {
+    "chat": lambda i: ("POST", "/chat/general", {"json": {"prompt": PROMPTS[i % len(PROMPTS)] + f" ({i})"}}),
+    "chat_cached": lambda i: ("POST", "/chat/general", {"json": {"prompt": PROMPTS[i % len(PROMPTS)]}}),
+    "weather": lambda i: ("GET", f"/weather/{['Delhi', 'Ludhiana', 'Nagpur', 'Patna'][i % 4]}", {}),
+    "mandi": lambda i: ("POST", "/farmer/fetch-price", {"json": {"state": "Punjab", "crop": "Wheat"}}),
+    "advice": lambda i: ("POST", "/micro-calculator/get_advice",
+                         {"json": {"crop_type": "wheat", "growth_stage": "mid", "state": "punjab"}}),
+}
+
+
+async def worker(client: httpx.AsyncClient, scenario, counter, total: int, latencies: list, statuses: Counter):
+    for i in counter:
+        if i >= total:
+            return
+        method, path, kwargs = scenario(i)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(base_url: str, scenario_name: str, concurrency: int, total: int, timeout: float):
+    scenario = SCENARIOS[scenario_name]
+    latencies, statuses = [], Counter()
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, scenario, counter, total, latencies, statuses) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    print(f"{scenario_name}: {len(ms)} requests, concurrency {concurrency}, {len(ms) / elapsed:.1f} req/s")
+    print("latency ms  " + "  ".join(f"p{p} {np.percentile(ms, p):8.1f}" for p in (50, 90, 95, 99)) + f"  max {ms.max():8.1f}")
+    print("status:", dict(statuses.most_common()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="chat")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.scenario, args.concurrency, args.requests, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
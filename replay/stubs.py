@@ -0,0 +1,92 @@
+"""Built-in responses for replay mode when no recording matches.
+
+Just enough of each upstream's schema for the endpoints to run their normal
+parsing code, so a load test works on a fresh checkout with no fixtures.
+"""
+import json
+from datetime import date, timedelta
+
+STUB_ANSWER = (
+    "Gehun ki fasal mein peele patte aksar nitrogen ki kami ya peela ratua rog ki wajah se hote hain. "
+    "Khet ka nirikshan karein aur zarurat ho to 25 kg urea prati acre dalein. "
+    "Rog ke lakshan dikhein to propiconazole 0.1% ka chhidkav karein."
+)
+
+STUB_TRANSCRIPT = "मेरी गेहूं की फसल में पत्ते पीले हो रहे हैं क्या करूं"
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, ~26 ms)
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+SPOKEN_WORDS_PER_SECOND = 2.5
+
+
+def silent_mp3(text: str) -> bytes:
+    """Silence lasting about as long as `text` takes to speak (realistic payload size)."""
+    seconds = max(1, len((text or "").split())) / SPOKEN_WORDS_PER_SECOND
+    return SILENT_MP3_FRAME * max(1, int(seconds / 0.026))
+
+
+def _gemini_chunk(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+
+def _days(n: int = 7) -> list:
+    return [(date.today() + timedelta(days=i)).isoformat() for i in range(n)]
+
+
+def _open_meteo() -> dict:
+    days = _days()
+    return {
+        "current": {"temperature_2m": 29.4, "relative_humidity_2m": 62, "wind_speed_10m": 8.3, "weather_code": 2},
+        "hourly": {"time": [f"{days[0]}T{h:02d}:00" for h in range(24)], "temperature_2m": [24 + h % 12 * 0.6 for h in range(24)]},
+        "daily": {"time": days, "temperature_2m_max": [33.1, 32.8, 31.9, 32.5, 33.4, 34.0, 33.2],
+                  "temperature_2m_min": [22.3, 22.0, 21.7, 21.9, 22.6, 23.1, 22.8]},
+    }
+
+
+def _wttr() -> dict:
+    return {
+        "current_condition": [{"temp_C": "29", "temp_F": "84", "weatherDesc": [{"value": "Partly cloudy"}],
+                               "humidity": "62", "windspeedKmph": "9", "FeelsLikeC": "31"}],
+        "nearest_area": [{"latitude": "28.610", "longitude": "77.230", "areaName": [{"value": "New Delhi"}]}],
+    }
+
+
+def _nasa_power() -> dict:
+    days = [d.replace("-", "") for d in _days()]
+    series = {"T2M": 27.8, "RH2M": 61.5, "WS2M": 2.4, "ALLSKY_SFC_SW_DWN": 19.6, "PRECTOTCORR": 1.2}
+    return {"properties": {"parameter": {name: {d: value for d in days} for name, value in series.items()}}}
+
+
+def _data_gov_in() -> dict:
+    today = date.today().strftime("%d/%m/%Y")
+    records = [
+        {"state": "Punjab", "district": "Ludhiana", "market": "Khanna", "commodity": "Wheat", "variety": "Dara",
+         "arrival_date": today, "min_price": "2275", "max_price": "2425", "modal_price": "2350"},
+        {"state": "Punjab", "district": "Patiala", "market": "Rajpura", "commodity": "Paddy(Dhan)(Common)",
+         "variety": "Common", "arrival_date": today, "min_price": "2183", "max_price": "2320", "modal_price": "2250"},
+    ]
+    return {"status": "ok", "total": len(records), "count": len(records), "records": records}
+
+
+def http_stub(upstream: str, endpoint: str) -> tuple:
+    """(status, content type, body bytes) standing in for `endpoint` of `upstream`."""
+    if upstream == "gemini":
+        if endpoint.endswith(":streamGenerateContent"):
+            sentences = STUB_ANSWER.split(". ")
+            events = [
+                f"data: {json.dumps(_gemini_chunk(s + ('. ' if i < len(sentences) - 1 else '')))}\r\n\r\n"
+                for i, s in enumerate(sentences)
+            ]
+            return 200, "text/event-stream", "".join(events).encode()
+        body = _gemini_chunk(STUB_ANSWER)
+    elif upstream == "open_meteo":
+        body = _open_meteo()
+    elif upstream == "wttr":
+        body = _wttr()
+    elif upstream == "nasa_power":
+        body = _nasa_power()
+    elif upstream == "data_gov_in":
+        body = _data_gov_in()
+    else:
+        return 404, "application/json", b'{"error": "no stub"}'
+    return 200, "application/json", json.dumps(body).encode()
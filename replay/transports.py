@@ -0,0 +1,125 @@
+"""HTTP plumbing for replay/upstreams.py.
+
+`upstream_session` is the requests.Session the blocking call sites use; in
+record/replay mode its adapter intercepts the covered hosts. Gemini's httpx
+client takes its transport from `async_transport`. Requests to any other
+host pass through untouched.
+"""
+import asyncio
+import base64
+import time
+from http.client import responses as REASONS
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from replay.stubs import http_stub
+from replay.upstreams import (
+    UPSTREAM_MODE, record, recording, redact_url, replay, replaying, request_key, upstream_for_url
+)
+
+
+def _as_bytes(body) -> bytes:
+    if body is None:
+        return b""
+    return body.encode() if isinstance(body, str) else bytes(body)
+
+
+def _fixture(url: str, status: int, content_type: str, content: bytes) -> dict:
+    fixture = {"url": redact_url(url), "status": status, "content_type": content_type}
+    try:
+        fixture["body"] = content.decode("utf-8")
+    except UnicodeDecodeError:
+        fixture["body_b64"] = base64.b64encode(content).decode()
+    return fixture
+
+
+def _replayed(upstream: str, method: str, url: str, body: bytes) -> tuple:
+    """(delay, status, content type, content) for a replayed HTTP call."""
+    endpoint, key = request_key(method, url, body)
+    delay, fixture, error_status = replay(upstream, key, endpoint)
+    if error_status:
+        return delay, error_status, "application/json", b'{"error": {"message": "replayed upstream error"}}'
+    if fixture is None:
+        return (delay, *http_stub(upstream, endpoint))
+    content = fixture["body"].encode("utf-8") if "body" in fixture else base64.b64decode(fixture["body_b64"])
+    return delay, fixture["status"], fixture.get("content_type") or "application/json", content
+
+
+class ReplayAdapter(HTTPAdapter):
+    """requests adapter that records or replays calls to the covered upstreams."""
+
+    def send(self, request, **kwargs):
+        upstream = upstream_for_url(request.url)
+        if upstream is None:
+            return super().send(request, **kwargs)
+        body = _as_bytes(request.body)
+
+        if replaying():
+            delay, status, content_type, content = _replayed(upstream, request.method, request.url, body)
+            time.sleep(delay)
+            response = requests.Response()
+            response.status_code = status
+            response.reason = REASONS.get(status, "")
+            response.headers = CaseInsensitiveDict({"Content-Type": content_type})
+            response._content = content
+            response.encoding = "utf-8"
+            response.url = request.url
+            response.request = request
+            return response
+
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        if recording():
+            endpoint, key = request_key(request.method, request.url, body)
+            record(upstream, key, endpoint,
+                   _fixture(request.url, response.status_code, response.headers.get("Content-Type"), response.content),
+                   time.perf_counter() - start)
+        return response
+
+
+class ReplayAsyncTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records or replays calls to the covered upstreams."""
+
+    def __init__(self, live: httpx.AsyncBaseTransport):
+        self._live = live
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        upstream = upstream_for_url(url)
+        if upstream is None:
+            return await self._live.handle_async_request(request)
+        body = await request.aread()
+
+        if replaying():
+            delay, status, content_type, content = _replayed(upstream, request.method, url, body)
+            await asyncio.sleep(delay)
+            return httpx.Response(status, headers={"Content-Type": content_type}, content=content, request=request)
+
+        start = time.perf_counter()
+        response = await self._live.handle_async_request(request)
+        content = await response.aread()  # decoded, so drop the encoding headers below
+        await response.aclose()
+        endpoint, key = request_key(request.method, url, body)
+        content_type = response.headers.get("Content-Type")
+        record(upstream, key, endpoint, _fixture(url, response.status_code, content_type, content),
+               time.perf_counter() - start)
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self):
+        await self._live.aclose()
+
+
+def async_transport(limits: httpx.Limits):
+    """Transport for an httpx.AsyncClient: None (httpx's default) in live mode."""
+    if UPSTREAM_MODE == "live":
+        return None
+    return ReplayAsyncTransport(httpx.AsyncHTTPTransport(limits=limits))
+
+
+upstream_session = requests.Session()
+if UPSTREAM_MODE != "live":
+    upstream_session.mount("http://", ReplayAdapter())
+    upstream_session.mount("https://", ReplayAdapter())
@@ -0,0 +1,209 @@
+"""Record/replay stand-ins for the third-party services behind the hot endpoints.
+
+UPSTREAM_MODE selects how calls to Gemini, Google TTS/STT, Open-Meteo,
+wttr.in, NASA POWER and data.gov.in are served:
+
+    live     (default) straight to the real service
+    record   to the real service, saving every response and how long it took
+             under UPSTREAM_FIXTURES_DIR/<upstream>/
+    replay   nothing leaves the box: the recording of the same request, else
+             any recording of the same endpoint, else a built-in stub
+             (replay/stubs.py), after a delay drawn from the upstream's
+             latency profile and failing at its configured error rate
+
+Profiles default to DEFAULT_PROFILES; UPSTREAM_PROFILE_FILE points at a JSON
+object overriding them per upstream, e.g.
+
+    {"gemini": {"latency": {"dist": "lognormal", "median": 2.0, "p95": 6.0},
+                "error_rate": 0.05, "error_status": 429},
+     "wttr":   {"latency": {"dist": "recorded"}}}
+
+Latency distributions: fixed (seconds), uniform (low, high), lognormal
+(median, p95) and recorded (the latency measured when the fixture was
+recorded). REPLAY_SEED makes latency and error draws reproducible.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from monitoring.metrics import UPSTREAM_REPLAYS
+
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").lower()
+UPSTREAM_FIXTURES_DIR = os.getenv("UPSTREAM_FIXTURES_DIR", os.path.join(os.path.dirname(__file__), "fixtures"))
+UPSTREAM_PROFILE_FILE = os.getenv("UPSTREAM_PROFILE_FILE")
+REPLAY_SEED = os.getenv("REPLAY_SEED")
+
+if UPSTREAM_MODE not in ("live", "record", "replay"):
+    raise ValueError(f"UPSTREAM_MODE must be live, record or replay, not {UPSTREAM_MODE!r}")
+
+UPSTREAM_HOSTS = {
+    "generativelanguage.googleapis.com": "gemini",
+    "api.open-meteo.com": "open_meteo",
+    "wttr.in": "wttr",
+    "power.larc.nasa.gov": "nasa_power",
+    "api.data.gov.in": "data_gov_in",
+}
+
+# Query parameters carrying credentials: left out of fixture keys and files
+SECRET_PARAMS = {"key", "api-key", "api_key"}
+
+# Rough shapes of each service seen from India; record real traffic and use
+# {"dist": "recorded"} when the exact tail matters.
+DEFAULT_PROFILES = {
+    "gemini": {"latency": {"dist": "lognormal", "median": 1.2, "p95": 3.5}, "error_rate": 0.01, "error_status": 503},
+    "tts": {"latency": {"dist": "lognormal", "median": 0.35, "p95": 0.9}, "error_rate": 0.005, "error_status": 503},
+    "stt": {"latency": {"dist": "lognormal", "median": 0.8, "p95": 2.0}, "error_rate": 0.005, "error_status": 503},
+    "open_meteo": {"latency": {"dist": "lognormal", "median": 0.15, "p95": 0.5}, "error_rate": 0.005, "error_status": 503},
+    "wttr": {"latency": {"dist": "lognormal", "median": 0.6, "p95": 2.5}, "error_rate": 0.02, "error_status": 503},
+    "nasa_power": {"latency": {"dist": "lognormal", "median": 1.5, "p95": 5.0}, "error_rate": 0.02, "error_status": 503},
+    "data_gov_in": {"latency": {"dist": "lognormal", "median": 1.0, "p95": 4.0}, "error_rate": 0.03, "error_status": 503},
+}
+
+
+def recording() -> bool:
+    return UPSTREAM_MODE == "record"
+
+
+def replaying() -> bool:
+    return UPSTREAM_MODE == "replay"
+
+
+def upstream_for_url(url: str):
+    """Upstream name for a URL on one of the covered hosts, else None."""
+    return UPSTREAM_HOSTS.get(urlsplit(url).hostname or "")
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if k not in SECRET_PARAMS])
+    return parts._replace(query=query).geturl()
+
+
+def request_key(method: str, url: str, body: bytes = b"") -> tuple:
+    """(endpoint, key): endpoint groups requests to the same path, key identifies this exact request."""
+    parts = urlsplit(url)
+    endpoint = f"{method.upper()} {parts.hostname}{parts.path}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k not in SECRET_PARAMS)
+    digest = hashlib.sha256(endpoint.encode())
+    digest.update(urlencode(query).encode())
+    digest.update(body or b"")
+    return endpoint, digest.hexdigest()
+
+
+class FixtureStore:
+    """Recorded responses on disk, one JSON file per request, indexed on first use."""
+
+    def __init__(self, root: str = UPSTREAM_FIXTURES_DIR, seed=REPLAY_SEED):
+        self.root = root
+        self._by_key = {}
+        self._by_endpoint = {}
+        self._loaded = set()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def _load(self, upstream: str):
+        if upstream in self._loaded:
+            return
+        self._loaded.add(upstream)
+        folder = os.path.join(self.root, upstream)
+        if not os.path.isdir(folder):
+            return
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".json"):
+                with open(os.path.join(folder, name), encoding="utf-8") as f:
+                    self._index(upstream, json.load(f))
+
+    def _index(self, upstream: str, fixture: dict):
+        self._by_key[(upstream, fixture["key"])] = fixture
+        self._by_endpoint.setdefault((upstream, fixture["endpoint"]), []).append(fixture)
+
+    def find(self, upstream: str, key: str, endpoint: str) -> tuple:
+        """(fixture, source) with source exact, endpoint or stub (fixture None)."""
+        with self._lock:
+            self._load(upstream)
+            fixture = self._by_key.get((upstream, key))
+            if fixture is not None:
+                return fixture, "exact"
+            same_endpoint = self._by_endpoint.get((upstream, endpoint))
+            if same_endpoint:
+                return self._rng.choice(same_endpoint), "endpoint"
+        return None, "stub"
+
+    def save(self, upstream: str, key: str, endpoint: str, fixture: dict):
+        fixture = dict(fixture, key=key, endpoint=endpoint)
+        folder = os.path.join(self.root, upstream)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{key[:24]}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._load(upstream)
+            self._index(upstream, fixture)
+
+
+class Profiles:
+    """Per-upstream latency distribution and error injection."""
+
+    def __init__(self, overrides: dict = None, seed=REPLAY_SEED):
+        self.profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+        for name, profile in (overrides or {}).items():
+            self.profiles[name] = {**self.profiles.get(name, {}), **profile}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self, upstream: str, recorded: float = None) -> float:
+        spec = self.profiles.get(upstream, {}).get("latency", {"dist": "fixed", "seconds": 0})
+        dist = spec.get("dist", "fixed")
+        with self._lock:
+            if dist == "fixed":
+                return float(spec.get("seconds", 0))
+            if dist == "uniform":
+                return self._rng.uniform(spec["low"], spec["high"])
+            if dist == "lognormal":
+                # sigma from the ratio of p95 to median (z(0.95) = 1.645)
+                sigma = math.log(spec["p95"] / spec["median"]) / 1.645
+                return self._rng.lognormvariate(math.log(spec["median"]), sigma)
+            if dist == "recorded":
+                return recorded if recorded is not None else float(spec.get("seconds", 0))
+        raise ValueError(f"Unknown latency distribution {dist!r} for {upstream}")
+
+    def error_status(self, upstream: str):
+        """HTTP status to fail this call with, or None."""
+        profile = self.profiles.get(upstream, {})
+        with self._lock:
+            failed = self._rng.random() < profile.get("error_rate", 0)
+        return profile.get("error_status", 503) if failed else None
+
+
+def _load_profile_overrides() -> dict:
+    if not UPSTREAM_PROFILE_FILE:
+        return {}
+    with open(UPSTREAM_PROFILE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+fixtures = FixtureStore()
+profiles = Profiles(_load_profile_overrides() if replaying() else None)
+
+if UPSTREAM_MODE != "live":
+    print(f"✅ Upstreams in {UPSTREAM_MODE} mode (fixtures: {UPSTREAM_FIXTURES_DIR})")
+
+
+def replay(upstream: str, key: str, endpoint: str) -> tuple:
+    """(delay seconds, fixture or None for the stub, injected error status or None) for one call."""
+    fixture, source = fixtures.find(upstream, key, endpoint)
+    delay = profiles.latency(upstream, fixture.get("latency") if fixture else None)
+    status = profiles.error_status(upstream)
+    UPSTREAM_REPLAYS.inc(upstream=upstream, source="error" if status else source)
+    return delay, fixture, status
+
+
+def record(upstream: str, key: str, endpoint: str, fixture: dict, latency: float):
+    try:
+        fixtures.save(upstream, key, endpoint, dict(fixture, latency=round(latency, 4)))
+    except OSError as e:
+        print(f"❌ Could not record {upstream} fixture: {e}")
@@ -1,7 +1,7 @@
 
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from scan_soilcard.Untitled11 import run_ocr_and_analyze 
-from auth.database import soil_data
+from storage.write_behind import write_behind
 
 app = APIRouter()
 
@@ -29,7 +29,7 @@ async def analyze_soil_card(file: UploadFile = File(...)):
         if "error" in result:
              raise HTTPException(status_code=500, detail=result['error'])
         
-        soil_data.insert_one(result)
+        write_behind.enqueue("soil_data", result)
 
         return {
             "filename": file.filename,
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import tempfile
+from PIL import Image
+
+UPLOAD_IMAGE_DIR = "uploadimages"
+UPLOAD_VOICE_DIR = "uploadvoices"
+UPLOAD_AUDIO_DIR = "uploadaudio"
+THUMBNAIL_DIR = os.path.join(UPLOAD_IMAGE_DIR, "thumbs")
+
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_QUALITY = 70
+
+for _directory in (UPLOAD_IMAGE_DIR, UPLOAD_VOICE_DIR, UPLOAD_AUDIO_DIR, THUMBNAIL_DIR):
+    os.makedirs(_directory, exist_ok=True)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def store_blob(directory: str, data: bytes, ext: str) -> str:
+    """Store bytes under their SHA-256 and return the filename (relative to directory).
+
+    Identical uploads map to the same file, so they are written once. Re-storing
+    an existing blob refreshes its mtime, which the retention GC uses as the
+    "last seen" time for files that no document references yet.
+    """
+    filename = f"{content_hash(data)}{ext.lower()}"
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        os.utime(path, None)
+        return filename
+
+    # Write to a temp file first so concurrent readers never see a partial blob
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+
+def thumbnail_name(image_filename: str) -> str:
+    """Thumbnail path (relative to UPLOAD_IMAGE_DIR) for a stored image."""
+    stem = os.path.splitext(os.path.basename(image_filename))[0]
+    return f"thumbs/{stem}.webp"
+
+
+def make_thumbnail(image_filename: str) -> str | None:
+    """Create (once) a small WebP thumbnail for an image in UPLOAD_IMAGE_DIR."""
+    name = thumbnail_name(image_filename)
+    path = os.path.join(UPLOAD_IMAGE_DIR, name)
+    if os.path.exists(path):
+        os.utime(path, None)
+        return name
+    # Unique temp file: concurrent uploads of the same image must not share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_", suffix=".webp")
+    try:
+        with os.fdopen(fd, "wb") as out, Image.open(os.path.join(UPLOAD_IMAGE_DIR, image_filename)) as img:
+            img = img.convert("RGB")
+            img.thumbnail(THUMBNAIL_SIZE)
+            img.save(out, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+        os.replace(tmp_path, path)
+        return name
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"❌ Thumbnail generation failed for {image_filename}: {e}")
+        return None
+
+
+def image_extension(filename: str, content_type: str | None = None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".jpeg":
+        return ".jpg"
+    if ext in (".jpg", ".png"):
+        return ext
+    return ".png" if content_type == "image/png" else ".jpg"
@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+import os
+import time
+from auth.database import db
+from storage.blobs import UPLOAD_IMAGE_DIR, UPLOAD_VOICE_DIR, UPLOAD_AUDIO_DIR, THUMBNAIL_DIR
+
+# Retention policy (days / seconds), overridable per deployment
+IMAGE_RETENTION_DAYS = int(os.getenv("IMAGE_RETENTION_DAYS", "90"))
+VOICE_RETENTION_DAYS = int(os.getenv("VOICE_RETENTION_DAYS", "30"))
+AUDIO_TEMP_TTL_SECONDS = int(os.getenv("AUDIO_TEMP_TTL_SECONDS", "3600"))
+# Files younger than this are never treated as orphans: their DB insert may still be in flight
+ORPHAN_GRACE_SECONDS = int(os.getenv("ORPHAN_GRACE_SECONDS", "3600"))
+GC_INTERVAL_HOURS = float(os.getenv("STORAGE_GC_INTERVAL_HOURS", "6"))
+
+REF_CHUNK = 500
+
+
+def _list_files(directory: str, now: float, min_age: float = ORPHAN_GRACE_SECONDS):
+    """Yield (name, path) for regular files older than min_age seconds (the orphan grace period)."""
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if not entry.is_file() or entry.name.startswith("."):
+            continue
+        if now - entry.stat().st_mtime < min_age:
+            continue
+        yield entry.name, entry.path
+
+
+async def _live_references(collection: str, field: str, names: list, cutoff: datetime.datetime) -> set:
+    """Subset of names still referenced by a non-expired document."""
+    live = set()
+    for i in range(0, len(names), REF_CHUNK):
+        chunk = names[i:i + REF_CHUNK]
+        live.update(await db[collection].distinct(field, {field: {"$in": chunk}, "timestamp": {"$gte": cutoff}}))
+    return live
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def collect_garbage() -> dict:
+    """Delete expired and orphaned upload files and flag the affected documents.
+
+    A file survives only while a document newer than the retention cutoff
+    references it (deduplicated blobs can be shared by several documents).
+    Documents older than the cutoff are kept for history but marked with
+    ``files_expired`` so nothing links to files that are gone.
+    """
+    now = time.time()
+    stats = {"images": 0, "thumbnails": 0, "voices": 0, "audio": 0, "expired_documents": 0}
+
+    # Images (+ their thumbnails)
+    image_cutoff = datetime.datetime.now() - datetime.timedelta(days=IMAGE_RETENTION_DAYS)
+    images = dict(_list_files(UPLOAD_IMAGE_DIR, now))
+    live_images = await _live_references("image_analyses", "filename", list(images), image_cutoff)
+    for name, path in images.items():
+        if name not in live_images and _remove(path):
+            stats["images"] += 1
+
+    live_stems = {os.path.splitext(name)[0] for name in live_images}
+    for name, path in _list_files(THUMBNAIL_DIR, now):
+        if os.path.splitext(name)[0] not in live_stems and _remove(path):
+            stats["thumbnails"] += 1
+
+    # Voice replies (referenced from image analyses and voice chats)
+    voice_cutoff = datetime.datetime.now() - datetime.timedelta(days=VOICE_RETENTION_DAYS)
+    voices = dict(_list_files(UPLOAD_VOICE_DIR, now))
+    names = list(voices)
+    live_voices = await _live_references("image_analyses", "voice_file", names, voice_cutoff)
+    live_voices |= await _live_references("chat_history", "voice_file", names, voice_cutoff)
+    for name, path in voices.items():
+        if name not in live_voices and _remove(path):
+            stats["voices"] += 1
+
+    # Uploaded audio is only needed while a request is running
+    for _, path in _list_files(UPLOAD_AUDIO_DIR, now, AUDIO_TEMP_TTL_SECONDS):
+        if _remove(path):
+            stats["audio"] += 1
+
+    # Keep documents consistent with what is left on disk
+    result = await db["image_analyses"].update_many(
+        {"timestamp": {"$lt": image_cutoff}, "files_expired": {"$ne": True}},
+        {"$set": {"files_expired": True}, "$unset": {"thumbnail": ""}}
+    )
+    stats["expired_documents"] += result.modified_count
+    await db["image_analyses"].update_many(
+        {"timestamp": {"$lt": voice_cutoff}, "voice_file": {"$ne": None}},
+        {"$set": {"voice_file": None}}
+    )
+    await db["chat_history"].update_many(
+        {"timestamp": {"$lt": voice_cutoff}, "voice_file": {"$ne": None}},
+        {"$set": {"voice_file": None}}
+    )
+    return stats
+
+
+async def retention_loop():
+    """Run collect_garbage every STORAGE_GC_INTERVAL_HOURS (0 disables it)."""
+    if GC_INTERVAL_HOURS <= 0:
+        return
+    while True:
+        try:
+            stats = await collect_garbage()
+            print(f"🧹 Storage GC: {stats}")
+        except Exception as e:
+            print(f"❌ Storage GC failed: {e}")
+        await asyncio.sleep(GC_INTERVAL_HOURS * 3600)
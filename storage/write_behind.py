@@ -0,0 +1,131 @@
+"""Write-behind buffer for log-style MongoDB inserts.
+
+Request handlers enqueue documents (chat turns, image analyses, soil card
+results) and return immediately; a background task writes them with one
+unordered insert_many per collection whenever WRITE_BEHIND_BATCH_SIZE
+documents are waiting or WRITE_BEHIND_FLUSH_SECONDS have passed. Memory is
+bounded by WRITE_BEHIND_MAX_PENDING: past that, the oldest documents are
+dropped (and counted) rather than growing without limit. Everything still
+queued is flushed on shutdown.
+"""
+import asyncio
+import os
+from collections import deque
+from pymongo.errors import BulkWriteError
+from auth.database import db
+from monitoring.metrics import WRITE_BEHIND_BACKLOG, WRITE_BEHIND_WRITTEN, WRITE_BEHIND_DROPPED
+
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "1.0"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+
+
+def _matches(doc: dict, match: dict) -> bool:
+    return all(doc.get(field) == value for field, value in match.items())
+
+
+class WriteBehindBuffer:
+    def __init__(self, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_seconds: float = WRITE_BEHIND_FLUSH_SECONDS,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._queues = {}
+        self._size = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stopping = False
+
+    def backlog(self, collection: str = None) -> int:
+        if collection is None:
+            return self._size
+        return len(self._queues.get(collection, ()))
+
+    def enqueue(self, collection: str, document: dict):
+        """Queue one document for insertion; never blocks the caller."""
+        queue = self._queues.get(collection)
+        if queue is None:
+            queue = self._queues[collection] = deque()
+            WRITE_BEHIND_BACKLOG.set_function(lambda c=collection: self.backlog(c), collection=collection)
+        queue.append(dict(document))  # copy: insert_many adds _id in place
+        self._size += 1
+
+        while self._size > self.max_pending:
+            # Shed the oldest document of the largest backlog
+            name, longest = max(self._queues.items(), key=lambda item: len(item[1]))
+            longest.popleft()
+            self._size -= 1
+            WRITE_BEHIND_DROPPED.inc(collection=name)
+
+        if self._size >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self, collection: str, match: dict) -> list:
+        """Queued (not yet written) documents of `collection` whose fields equal `match`."""
+        return [doc for doc in self._queues.get(collection, ()) if _matches(doc, match)]
+
+    async def update_one(self, collection: str, match: dict, fields: dict):
+        """$set `fields` on a document whether it is still queued or already written."""
+        for doc in self._queues.get(collection, ()):
+            if _matches(doc, match):
+                doc.update(fields)
+                return
+        # Wait out an in-flight batch that may contain it, then update in MongoDB
+        async with self._flush_lock:
+            await db[collection].update_one(match, {"$set": fields})
+
+    async def flush(self):
+        async with self._flush_lock:
+            for collection, queue in list(self._queues.items()):
+                while queue:
+                    batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                    self._size -= len(batch)
+                    try:
+                        await db[collection].insert_many(batch, ordered=False)
+                        WRITE_BEHIND_WRITTEN.inc(len(batch), collection=collection)
+                    except BulkWriteError as e:
+                        # Unordered: everything except the rejected documents was written
+                        failed = len(e.details.get("writeErrors", []))
+                        WRITE_BEHIND_WRITTEN.inc(len(batch) - failed, collection=collection)
+                        WRITE_BEHIND_DROPPED.inc(failed, collection=collection)
+                        print(f"❌ {failed} {collection} documents rejected: {e.details.get('writeErrors', [])[:1]}")
+                    except Exception as e:
+                        # Transient (e.g. MongoDB unreachable): put the batch back and retry next round
+                        print(f"❌ Write-behind flush to {collection} failed, will retry: {e}")
+                        queue.extendleft(reversed(batch))
+                        self._size += len(batch)
+                        break
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Write-behind flush error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write whatever is still queued."""
+        if self._task is not None:
+            # Let the loop finish its current batch instead of cancelling it mid-write
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._size:
+            print(f"❌ Write-behind: {self._size} documents could not be written before shutdown")
+
+
+write_behind = WriteBehindBuffer()
@@ -6,6 +6,7 @@ import requests
 import feedparser
 from auth.database import users_collection
 from chatbot.models import DashboardResponse
+from location_detector.location import with_region
 
 router = APIRouter()
 
@@ -35,7 +36,7 @@ async def dashboard(phone: str):
         raise HTTPException(status_code=404, detail="User not found")
 
     name = user.get("name")
-    location = user.get("location") or {}
+    location = with_region(user.get("location"))
     lat = location.get("lat")
     lon = location.get("lon")
 
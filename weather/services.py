@@ -1,9 +1,13 @@
 import requests
+from monitoring.metrics import track_upstream
+from replay.transports import upstream_session
+
 def fetch_weather(location: str) -> dict:
     url = f"http://wttr.in/{location}?format=j1"
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
+        with track_upstream("wttr"):
+            resp = upstream_session.get(url, timeout=10)
+            resp.raise_for_status()
         data = resp.json()
         current = data.get("current_condition", [{}])[0]
         return {
@@ -38,8 +42,9 @@ def fetch_weather_by_coords(lat: float, lon: float) -> dict:
             "daily": ["temperature_2m_max", "temperature_2m_min"],
             "timezone": "auto",
         }
-        resp = requests.get(base, params=params, timeout=10)
-        resp.raise_for_status()
+        with track_upstream("open_meteo"):
+            resp = upstream_session.get(base, params=params, timeout=10)
+            resp.raise_for_status()
         data = resp.json()
 
         current = data.get("current", {})